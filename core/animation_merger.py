@@ -1,5 +1,3 @@
-from PIL import Image
-import numpy as np
 from core.image_processor import ImageProcessor
 
 class AnimationMerger:
@@ -8,32 +6,17 @@ class AnimationMerger:
         self.current_frame_index = 0
         self.image_processor = ImageProcessor()
         
-    def parse_animation_frames(self, frames_dict, frame_names):
-        """解析指定动画序列的帧"""
-        frames = []
-        for frame_name in frame_names:
-            try:
-                frame_data = frames_dict[frame_name]
-                frame_dict = {}
-                
-                # 直接使用已经转换好的数据
-                frame_dict['rect'] = frame_data.get('rect', [0, 0, 1, 1])
-                frame_dict['rotated'] = frame_data.get('rotated', False)
-                frame_dict['source_size'] = frame_data.get('source_size', [500, 500])
-                frame_dict['offset'] = frame_data.get('offset', [0, 0])
-                
-                frames.append(frame_dict)
-                
-            except Exception as e:
-                print(f"Warning: Using default values for frame {frame_name}")
-                frames.append({
-                    'source_size': [500, 500],
-                    'offset': [0, 0],
-                    'rotated': False,
-                    'rect': [0, 0, 1, 1]
-                })
+    def parse_animation_frames(self, frame_table, frame_rows):
+        """取出指定动画序列的帧
         
-        return frames
+        frame_rows为行号数组（或帧名列表），返回帧表中对应记录组成的结构化数组，
+        每条记录可以像原来的帧字典一样用 frame['rect'] 访问。
+        """
+        try:
+            return frame_table.frames(frame_rows)
+        except Exception as e:
+            print(f"Error parsing animation frames: {str(e)}")
+            return frame_table.records[:0]
     
     def merge_animation_frames(self, frame_data, sprite_sheet):
         """合并动画帧"""
@@ -42,4 +25,32 @@ class AnimationMerger:
             pass
         except Exception as e:
             print(f"Error merging frames: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    def find_changed_frames(self, old_table, old_sheet, new_table, new_sheet):
+        """比较两次加载的结果，返回发生变化的帧名（包括新增和删除的帧）"""
+        old_names = set(old_table.keys())
+        new_names = set(new_table.keys())
+        changed = old_names ^ new_names
+        
+        # 元数据整列比较
+        common = sorted(old_names & new_names)
+        if not common:
+            return changed
+        old_records = old_table.frames(common)
+        new_records = new_table.frames(common)
+        meta_changed = old_records != new_records
+        changed.update(name for name, flag in zip(common, meta_changed) if flag)
+        
+        # 元数据相同的帧，再比较图集中对应区域的像素
+        same_rows = new_table.rows_for([name for name, flag in zip(common, meta_changed) if not flag])
+        sheet_rects = new_table.sheet_rects()
+        for row in same_rows:
+            box = tuple(int(v) for v in sheet_rects[row])
+            try:
+                if old_sheet.crop(box).tobytes() != new_sheet.crop(box).tobytes():
+                    changed.add(new_table.names[row])
+            except Exception as e:
+                print(f"Error comparing frame {new_table.names[row]}: {str(e)}")
+                changed.add(new_table.names[row])
+        return changed
@@ -0,0 +1,377 @@
+"""不依赖Qt的图集读取接口，可用于脚本、构建流水线和工作进程
+
+    atlas = Atlas.open('effects/hero.plist')      # 只解析plist，不解码像素
+    for name in atlas.group_names:
+        print(name, len(atlas.group(name)))
+    for image in atlas.group('walk').frames(size=256):
+        image.save(...)                           # 按需逐帧合成
+
+Atlas对象可以被pickle传给其他进程，像素在进程中首次使用时才解码。
+"""
+import os
+import plistlib
+import threading
+from core.perf_stats import perf_stats
+from core.tracing import tracer
+
+# 支持的贴图文件后缀，同名的多个贴图按这个顺序选择
+TEXTURE_EXTENSION = '.png'
+TEXTURE_EXTENSIONS = (TEXTURE_EXTENSION, '.pvr.ccz', '.ccz', '.pvr')
+
+
+def texture_name_for(plist_name, names):
+    """在文件名集合names中找到plist对应的贴图文件名，没有时返回None"""
+    base_name = plist_name[:-len('.plist')]
+    for extension in TEXTURE_EXTENSIONS:
+        if base_name + extension in names:
+            return base_name + extension
+    return None
+
+
+def texture_path_for(plist_path):
+    """plist对应的贴图路径（没有找到贴图时为同名的.png）"""
+    base_path = plist_path[:-len('.plist')] if plist_path.endswith('.plist') else plist_path
+    for extension in TEXTURE_EXTENSIONS:
+        if os.path.exists(base_path + extension):
+            return base_path + extension
+    return base_path + TEXTURE_EXTENSION
+
+
+def group_name_for(frame_name):
+    """帧名对应的动画序列名（去掉后缀和最后一个下划线之后的序号）"""
+    base_name = frame_name.rsplit('.', 1)[0]
+    return '_'.join(base_name.split('_')[:-1])
+
+
+def is_pvr_texture(texture_path):
+    return texture_path.endswith(TEXTURE_EXTENSIONS[1:])
+
+
+def parse_plist_frames(plist_data):
+    """解析plist数据，支持新旧两种格式
+    
+    返回FrameTable：所有帧的数据按列存放在一个结构化数组中，
+    动画组为按帧序号排好的行号数组
+    """
+    import numpy as np
+    from core.frame_table import FrameTable, DEFAULT_FRAME
+    
+    # 解析plist数据
+    frames_dict = plist_data.get('frames', {})
+
+    # 按动画序列分组（组名 -> [(帧名, 行号)]）
+    animation_groups = {}
+    names = []
+    rects, rotated, source_sizes, offsets = [], [], [], []
+
+    def add_row(frame_name, frame_dict):
+        names.append(frame_name)
+        rects.append(frame_dict['rect'])
+        rotated.append(bool(frame_dict['rotated']))
+        source_sizes.append(frame_dict['source_size'])
+        offsets.append(frame_dict['offset'])
+        return len(names) - 1
+
+    for frame_name, frame_data in frames_dict.items():
+        try:
+            # 基本帧数据
+            frame_dict = {
+                'source_size': [500, 500],  # 默认值
+                'offset': [0, 0],           # 默认值
+                'rotated': False,           # 默认值
+                'rect': [0, 0, 1, 1]        # 默认值
+            }
+
+            # 检测是否是新版格式
+            is_new_format = 'textureRect' in frame_data or 'spriteSize' in frame_data
+
+            if is_new_format:
+                # 新版格式解析
+                # 解析源尺寸 (spriteSourceSize 或 spriteSize)
+                size_str = None
+                if 'spriteSourceSize' in frame_data:
+                    size_str = frame_data['spriteSourceSize']
+                elif 'spriteSize' in frame_data:
+                    size_str = frame_data['spriteSize']
+
+                if size_str and isinstance(size_str, str):
+                    size_str = size_str.replace('{', '').replace('}', '')
+                    parts = [x.strip() for x in size_str.split(',')]
+                    if len(parts) == 2 and all(parts):
+                        try:
+                            frame_dict['source_size'] = [int(float(x)) for x in parts]
+                        except ValueError:
+                            pass
+
+                # 解析偏移 (spriteOffset)
+                if 'spriteOffset' in frame_data:
+                    offset_str = frame_data['spriteOffset']
+                    if offset_str and isinstance(offset_str, str):
+                        offset_str = offset_str.replace('{', '').replace('}', '')
+                        parts = [x.strip() for x in offset_str.split(',')]
+                        if len(parts) == 2 and all(parts):
+                            try:
+                                frame_dict['offset'] = [int(float(x)) for x in parts]
+                            except ValueError:
+                                pass
+
+                # 解析矩形区域 (textureRect)
+                if 'textureRect' in frame_data:
+                    rect_str = frame_data['textureRect']
+                    if rect_str and isinstance(rect_str, str):
+                        rect_str = rect_str.replace('{{', '').replace('}}', '').replace('},{', ',')
+                        parts = [x.strip() for x in rect_str.split(',')]
+                        if len(parts) == 4 and all(parts):
+                            try:
+                                frame_dict['rect'] = [int(float(x)) for x in parts]
+                            except ValueError:
+                                pass
+
+                # 解析旋转 (textureRotated)
+                if 'textureRotated' in frame_data:
+                    frame_dict['rotated'] = bool(frame_data['textureRotated'])
+
+            else:
+                # 旧版格式解析
+                # 解析frame
+                frame_str = frame_data.get('frame', '')
+                if isinstance(frame_str, str):
+                    frame_str = frame_str.replace('{', '').replace('}', '')
+                    parts = [x.strip() for x in frame_str.split(',')]
+                    if len(parts) == 4 and all(parts):
+                        try:
+                            frame_dict['rect'] = [int(float(x)) for x in parts]
+                        except ValueError:
+                            pass
+
+                # 解析源尺寸
+                source_size = frame_data.get('sourceSize', '')
+                if isinstance(source_size, str):
+                    source_size = source_size.replace('{', '').replace('}', '')
+                    parts = [x.strip() for x in source_size.split(',')]
+                    if len(parts) == 2 and all(parts):
+                        try:
+                            frame_dict['source_size'] = [int(float(x)) for x in parts]
+                        except ValueError:
+                            pass
+
+                # 解析偏移
+                offset = frame_data.get('offset', '')
+                if isinstance(offset, str):
+                    offset = offset.replace('{', '').replace('}', '')
+                    parts = [x.strip() for x in offset.split(',')]
+                    if len(parts) == 2 and all(parts):
+                        try:
+                            frame_dict['offset'] = [int(float(x)) for x in parts]
+                        except ValueError:
+                            pass
+
+                # 解析旋转
+                frame_dict['rotated'] = frame_data.get('rotated', False)
+
+            row = add_row(frame_name, frame_dict)
+
+            # 添加到动画组
+            base_name = group_name_for(frame_name)
+            if base_name not in animation_groups:
+                animation_groups[base_name] = []
+            animation_groups[base_name].append((frame_name, row))
+
+        except Exception as e:
+            print(f"Warning: Using default values for frame {frame_name}")
+            rect, is_rotated, source_size, offset = DEFAULT_FRAME
+            add_row(frame_name, {'rect': rect, 'rotated': is_rotated,
+                                 'source_size': source_size, 'offset': offset})
+
+    # 对每个动画组内的帧按序号排序，转换为行号数组
+    groups = {}
+    for base_name, group in animation_groups.items():
+        group.sort(key=lambda x: int(x[0].split('_')[-1].split('.')[0]))
+        groups[base_name] = np.array([row for _, row in group], dtype=np.int32)
+    
+    return FrameTable.from_columns(names, rects, rotated, source_sizes, offsets, groups)
+
+
+@perf_stats.timed('decode')
+@tracer.traced('png_decode', 'io')
+def load_sprite_sheet(texture_path):
+    """解码贴图为RGBA图像（PNG或cocos的PVR/CCZ贴图）"""
+    if is_pvr_texture(texture_path):
+        from core.pvr_decoder import load_pvr
+        return load_pvr(texture_path)
+    from PIL import Image
+    return Image.open(texture_path).convert('RGBA')
+
+
+class Frame:
+    """一帧的元数据（帧表中的一行），合成后的图像按需生成"""
+    
+    __slots__ = ('atlas', 'row', 'name', 'rect', 'rotated', 'source_size', 'offset')
+    
+    def __init__(self, atlas, row):
+        record = atlas.table.records[row]
+        self.atlas = atlas
+        self.row = int(row)
+        self.name = atlas.table.names[row]
+        self.rect = tuple(int(v) for v in record['rect'])
+        self.rotated = bool(record['rotated'])
+        self.source_size = tuple(int(v) for v in record['source_size'])
+        self.offset = tuple(int(v) for v in record['offset'])
+    
+    def __getitem__(self, key):
+        # 兼容按字典方式访问帧数据的代码
+        return getattr(self, key)
+    
+    def __repr__(self):
+        return f"Frame({self.name!r}, rect={self.rect}, source_size={self.source_size})"
+    
+    def image(self, size=None):
+        """合成这一帧，size为整数或(宽, 高)时按比例缩放到该大小以内"""
+        from core.image_processor import ImageProcessor
+        image = ImageProcessor.process_frame(self, self.atlas.sprite_sheet)
+        if image is not None and size:
+            if isinstance(size, int):
+                size = (size, size)
+            image = ImageProcessor.scale_image(image, size)
+        return image
+    
+    def array(self, size=None):
+        """合成这一帧并返回 高x宽x4 的numpy数组"""
+        import numpy as np
+        image = self.image(size)
+        return None if image is None else np.asarray(image)
+
+
+class AnimationGroup:
+    """一个动画序列（按帧名前缀分组），rows为帧表中的行号"""
+    
+    def __init__(self, atlas, name, rows):
+        self.atlas = atlas
+        self.name = name
+        self.rows = rows
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __iter__(self):
+        """遍历帧的元数据（不解码像素）"""
+        for row in self.rows:
+            yield Frame(self.atlas, row)
+    
+    def __getitem__(self, index):
+        return Frame(self.atlas, self.rows[index])
+    
+    def __repr__(self):
+        return f"AnimationGroup({self.name!r}, frames={len(self)})"
+    
+    @property
+    def frame_names(self):
+        return [self.atlas.table.names[row] for row in self.rows]
+    
+    @property
+    def records(self):
+        """这个序列所有帧的记录（结构化数组）"""
+        return self.atlas.table.records[self.rows]
+    
+    @property
+    def source_size(self):
+        """第一帧的原始尺寸"""
+        return self[0].source_size if len(self.rows) else (0, 0)
+    
+    def frames(self, size=None, start=0, stop=None, step=1):
+        """逐帧合成的生成器，每次只在内存中保留一帧"""
+        for row in self.rows[start:stop:step]:
+            yield Frame(self.atlas, row).image(size)
+    
+    def frame_arrays(self, size=None, start=0, stop=None, step=1):
+        """与frames相同，但产出numpy数组"""
+        for row in self.rows[start:stop:step]:
+            yield Frame(self.atlas, row).array(size)
+
+
+class Atlas:
+    """一对plist/png图集，帧数据保存在FrameTable中"""
+    
+    def __init__(self, plist_path, table, metadata=None):
+        self.plist_path = plist_path
+        self.texture_path = texture_path_for(plist_path)
+        self.table = table
+        self.metadata = metadata or {}
+        self._sheet = None
+        self._sheet_lock = threading.Lock()
+    
+    @classmethod
+    def open(cls, plist_path):
+        """读取plist元数据，不解码贴图"""
+        with perf_stats.stage('parse'), tracer.span('plist_parse', 'io', path=plist_path):
+            with open(plist_path, 'rb') as f:
+                plist_data = plistlib.load(f)
+            table = parse_plist_frames(plist_data)
+        return cls(plist_path, table, plist_data.get('metadata'))
+    
+    def __repr__(self):
+        return f"Atlas({self.plist_path!r}, groups={len(self.table.groups)}, frames={len(self.table)})"
+    
+    def __getstate__(self):
+        # 解码后的像素和锁不随对象传给其他进程
+        state = self.__dict__.copy()
+        state['_sheet'] = None
+        del state['_sheet_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sheet_lock = threading.Lock()
+    
+    @property
+    def name(self):
+        return os.path.basename(self.plist_path)
+    
+    @property
+    def frames_dict(self):
+        """按帧名访问的帧数据（FrameTable本身支持 table[name]）"""
+        return self.table
+    
+    @property
+    def animation_groups(self):
+        """动画序列名 -> 行号数组"""
+        return self.table.groups
+    
+    @property
+    def group_names(self):
+        return sorted(self.table.groups.keys())
+    
+    @property
+    def frame_count(self):
+        return len(self.table)
+    
+    @property
+    def sprite_sheet(self):
+        """解码后的贴图（首次访问时解码，线程安全）"""
+        if self._sheet is None:
+            with self._sheet_lock:
+                if self._sheet is None:
+                    self._sheet = load_sprite_sheet(self.texture_path)
+        return self._sheet
+    
+    def set_sprite_sheet(self, sprite_sheet):
+        """使用已经解码好的贴图"""
+        self._sheet = sprite_sheet
+    
+    @property
+    def is_decoded(self):
+        return self._sheet is not None
+    
+    def close(self):
+        """释放解码后的像素"""
+        self._sheet = None
+    
+    def frame(self, frame_name):
+        return Frame(self, self.table.row_index()[frame_name])
+    
+    def group(self, name):
+        return AnimationGroup(self, name, self.table.groups[name])
+    
+    def groups(self):
+        for name in self.group_names:
+            yield self.group(name)
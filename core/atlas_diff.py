@@ -0,0 +1,266 @@
+"""比较同一个图集的两个版本，找出有变化的帧
+
+按帧名对应两个版本的帧，把两边都合成到相同大小的画布上逐像素比较：
+    changed   像素不同
+    moved     像素相同，但在贴图中的位置、旋转或裁剪方式不同（例如重新打包）
+    unchanged 像素和位置都相同
+    added / removed  只在新版本 / 旧版本中存在
+
+合成直接在numpy数组上进行（从贴图中切片、旋转后放到画布上），同样大小的画布堆叠成一个数组，
+先把每个像素当作一个uint32整体比较，只对有不同像素的帧逐通道求差，
+几百帧的比较在贴图解码后只需要很短的时间。
+
+    result = diff_atlas_files('backup/hero.plist', 'hero.plist')
+    for frame in result['frames']:
+        if frame['status'] == STATUS_CHANGED:
+            print(frame['name'], frame['changed_pixels'])
+"""
+import os
+import time
+import numpy as np
+from core.file_manager import FileManager
+
+STATUS_CHANGED = 'changed'
+STATUS_MOVED = 'moved'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_ADDED = 'added'
+STATUS_REMOVED = 'removed'
+STATUSES = (STATUS_CHANGED, STATUS_ADDED, STATUS_REMOVED, STATUS_MOVED, STATUS_UNCHANGED)
+
+# 每次一起比较的画布像素总数上限（两边各一个数组，约 4 * 2 * 该值 字节，放得进CPU缓存时最快）
+CHUNK_PIXELS = 1024 * 1024
+
+
+def sheet_array(sprite_sheet):
+    """贴图转换为 高x宽x4 的uint8数组"""
+    if sprite_sheet.mode != 'RGBA':
+        sprite_sheet = sprite_sheet.convert('RGBA')
+    return np.asarray(sprite_sheet)
+
+
+def frame_pixels(frame_data, sheet):
+    """从贴图数组中取出一帧（旋转的帧已转正），返回数组视图或副本"""
+    x, y, w, h = (int(v) for v in frame_data['rect'])
+    if frame_data['rotated']:
+        # 与 ImageProcessor.process_frame 相同：存放时顺时针旋转，取出后逆时针转回
+        return np.rot90(sheet[y:y + w, x:x + h])
+    return sheet[y:y + h, x:x + w]
+
+
+def place_frame(canvas, frame_data, sheet):
+    """把一帧放到画布中央对应的位置（与 ImageProcessor.process_frame 的取整方式相同）
+
+    画布可以比帧的原始尺寸大，这时原始尺寸的区域居中；超出画布的部分被裁掉。
+    """
+    pixels = frame_pixels(frame_data, sheet)
+    canvas_h, canvas_w = canvas.shape[:2]
+    source_w, source_h = (int(v) for v in frame_data['source_size'])
+    offset_x, offset_y = (int(v) for v in frame_data['offset'])
+    frame_h, frame_w = pixels.shape[:2]
+    left = (canvas_w - source_w) // 2 + int((source_w - frame_w) / 2 + offset_x)
+    top = (canvas_h - source_h) // 2 + int((source_h - frame_h) / 2 - offset_y)
+    x0, y0 = max(0, left), max(0, top)
+    x1, y1 = min(canvas_w, left + frame_w), min(canvas_h, top + frame_h)
+    if x1 > x0 and y1 > y0:
+        canvas[y0:y1, x0:x1] = pixels[y0 - top:y1 - top, x0 - left:x1 - left]
+    return canvas
+
+
+def frame_canvas(frame_data, sheet, canvas_size=None):
+    """把一帧合成到 canvas_size（默认为帧的原始尺寸）的透明画布上，返回 高x宽x4 数组"""
+    if canvas_size is None:
+        canvas_size = tuple(int(v) for v in frame_data['source_size'])
+    canvas = np.zeros((canvas_size[1], canvas_size[0], 4), dtype=np.uint8)
+    return place_frame(canvas, frame_data, sheet)
+
+
+def canvas_size_for(old_data, new_data):
+    """两个版本共用的画布大小（两边原始尺寸的较大值）"""
+    return (max(int(old_data['source_size'][0]), int(new_data['source_size'][0])),
+            max(int(old_data['source_size'][1]), int(new_data['source_size'][1])))
+
+
+def clear_transparent(canvases):
+    """完全透明的像素置零，颜色不同但看不见的像素不算变化"""
+    pixels = canvases.view(np.uint32)[..., 0]
+    pixels *= canvases[..., 3] != 0
+
+
+def frames_differ(old_stack, new_stack):
+    """按整个像素（uint32）比较一组画布，返回每帧是否有不同的像素（两边都完全透明的不算）"""
+    differs = old_stack.view(np.uint32)[..., 0] != new_stack.view(np.uint32)[..., 0]
+    differs &= (old_stack[..., 3] | new_stack[..., 3]) != 0
+    return differs.any(axis=(1, 2))
+
+
+def same_placement(old_data, new_data):
+    for key in ('rect', 'rotated', 'source_size', 'offset'):
+        if not np.array_equal(old_data[key], new_data[key]):
+            return False
+    return True
+
+
+def channel_difference(old_stack, new_stack):
+    """每个像素各通道差值的最大值，old_stack/new_stack 为 N x 高 x 宽 x 4，返回 N x 高 x 宽"""
+    difference = np.maximum(old_stack, new_stack)
+    difference -= np.minimum(old_stack, new_stack)
+    result = np.maximum(difference[..., 0], difference[..., 1])
+    np.maximum(result, difference[..., 2], out=result)
+    np.maximum(result, difference[..., 3], out=result)
+    return result
+
+
+def changed_bounds(changed):
+    """变化像素的外接矩形 (x0, y0, x1, y1)"""
+    rows = np.flatnonzero(changed.any(axis=1))
+    columns = np.flatnonzero(changed.any(axis=0))
+    return (int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1)
+
+
+def diff_frames(old_frames, old_sheet, new_frames, new_sheet, tolerance=0):
+    """比较两个版本的帧（帧数据和贴图来自 FileManager.load_animation_file）
+
+    tolerance 为每个通道允许的差值，差值不超过它的像素不算变化。
+    返回 {'frames': [...], 'counts': {状态: 帧数}, 'heatmaps': {帧名: 差值数组}, 'seconds'}；
+    frames 中每项为 {'name', 'status', 'canvas_size', 'changed_pixels', 'changed_ratio',
+    'max_diff', 'bounds'}，按帧名排序；只有 changed 的帧有差值数组（画布大小的uint8数组）。
+    """
+    started = time.perf_counter()
+    old_array = sheet_array(old_sheet)
+    new_array = sheet_array(new_sheet)
+    old_names = set(old_frames.keys())
+    new_names = set(new_frames.keys())
+
+    results = {}
+    for name in old_names - new_names:
+        results[name] = {'name': name, 'status': STATUS_REMOVED,
+                         'canvas_size': tuple(int(v) for v in old_frames[name]['source_size'])}
+    for name in new_names - old_names:
+        results[name] = {'name': name, 'status': STATUS_ADDED,
+                         'canvas_size': tuple(int(v) for v in new_frames[name]['source_size'])}
+
+    # 画布大小相同的帧一起比较
+    buckets = {}
+    for name in old_names & new_names:
+        size = canvas_size_for(old_frames[name], new_frames[name])
+        buckets.setdefault(size, []).append(name)
+
+    heatmaps = {}
+    for (width, height), names in buckets.items():
+        names.sort()
+        chunk = min(len(names), max(1, CHUNK_PIXELS // max(1, width * height)))
+        old_buffer = np.empty((chunk, height, width, 4), dtype=np.uint8)
+        new_buffer = np.empty_like(old_buffer)
+        for start in range(0, len(names), chunk):
+            chunk_names = names[start:start + chunk]
+            old_stack = old_buffer[:len(chunk_names)]
+            new_stack = new_buffer[:len(chunk_names)]
+            old_stack.fill(0)
+            new_stack.fill(0)
+            for i, name in enumerate(chunk_names):
+                place_frame(old_stack[i], old_frames[name], old_array)
+                place_frame(new_stack[i], new_frames[name], new_array)
+            # 先按整个像素比较，只对有不同像素的帧逐通道求差
+            differing = np.flatnonzero(frames_differ(old_stack, new_stack))
+            details = {}
+            if len(differing):
+                old_changed = old_stack[differing]
+                new_changed = new_stack[differing]
+                clear_transparent(old_changed)
+                clear_transparent(new_changed)
+                details = dict(zip(differing.tolist(), channel_difference(old_changed, new_changed)))
+            for i, name in enumerate(chunk_names):
+                result = {
+                    'name': name,
+                    'canvas_size': (width, height),
+                    'changed_pixels': 0,
+                    'changed_ratio': 0.0,
+                    'max_diff': 0,
+                    'bounds': None
+                }
+                difference = details.get(i)
+                if difference is not None:
+                    changed = difference > tolerance
+                    changed_pixels = int(np.count_nonzero(changed))
+                    result['max_diff'] = int(difference.max())
+                    if changed_pixels:
+                        result['changed_pixels'] = changed_pixels
+                        result['changed_ratio'] = changed_pixels / (width * height)
+                        result['bounds'] = changed_bounds(changed)
+                        heatmaps[name] = difference
+                if result['changed_pixels']:
+                    result['status'] = STATUS_CHANGED
+                elif same_placement(old_frames[name], new_frames[name]):
+                    result['status'] = STATUS_UNCHANGED
+                else:
+                    result['status'] = STATUS_MOVED
+                results[name] = result
+
+    frames = [results[name] for name in sorted(results)]
+    counts = {status: 0 for status in STATUSES}
+    for frame in frames:
+        counts[frame['status']] += 1
+    return {
+        'frames': frames,
+        'counts': counts,
+        'heatmaps': heatmaps,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def diff_atlas_files(old_plist, new_plist, tolerance=0, file_manager=None):
+    """加载并比较两个plist/png图集，结果在 diff_frames 的基础上增加 'old_path'、'new_path'"""
+    file_manager = file_manager or FileManager()
+    old_frames, old_sheet, _ = file_manager.load_animation_file(old_plist)
+    if old_frames is None:
+        raise ValueError(f"Cannot load atlas: {old_plist}")
+    new_frames, new_sheet, _ = file_manager.load_animation_file(new_plist)
+    if new_frames is None:
+        raise ValueError(f"Cannot load atlas: {new_plist}")
+    result = diff_frames(old_frames, old_sheet, new_frames, new_sheet, tolerance)
+    result['old_path'] = old_plist
+    result['new_path'] = new_plist
+    return result
+
+
+def pair_atlas_paths(old_path, new_path):
+    """两边的图集按文件名配对，返回 [(旧plist或None, 新plist或None), ...]
+
+    两边都是文件夹时比较其中的同名图集；一边是文件、另一边是文件夹时使用文件夹中的同名文件。
+    """
+    if os.path.isdir(old_path) and os.path.isdir(new_path):
+        file_manager = FileManager()
+        old_names = set(file_manager.get_animation_files(old_path))
+        new_names = set(file_manager.get_animation_files(new_path))
+        return [(os.path.join(old_path, name) if name in old_names else None,
+                 os.path.join(new_path, name) if name in new_names else None)
+                for name in sorted(old_names | new_names)]
+    if os.path.isdir(old_path):
+        old_path = os.path.join(old_path, os.path.basename(new_path))
+    elif os.path.isdir(new_path):
+        new_path = os.path.join(new_path, os.path.basename(old_path))
+    return [(old_path if os.path.exists(old_path) else None,
+             new_path if os.path.exists(new_path) else None)]
+
+
+def heatmap_image(difference, base=None, tolerance=0):
+    """差值数组画成热力图（PIL RGBA）：变化越大越接近黄色
+
+    base为同样大小的画布数组时，先画变暗的灰度底图，热力图叠加在上面。
+    """
+    from PIL import Image
+    height, width = difference.shape
+    output = np.zeros((height, width, 4), dtype=np.uint8)
+    if base is not None:
+        gray = base[..., :3].mean(axis=2) * 0.5
+        output[..., 0] = output[..., 1] = output[..., 2] = gray.astype(np.uint8)
+        output[..., 3] = base[..., 3] // 2
+    changed = difference > tolerance
+    if changed.any():
+        peak = max(1, int(difference.max()))
+        level = difference.astype(np.float32) / peak
+        output[changed, 0] = 255
+        output[changed, 1] = (level[changed] * 255).astype(np.uint8)
+        output[changed, 2] = 0
+        output[changed, 3] = (96 + level[changed] * 159).astype(np.uint8)
+    return Image.fromarray(output, 'RGBA')
@@ -0,0 +1,206 @@
+"""把一个文件夹中所有图集的动画序列画成总览图（contact sheet）
+
+每个动画序列占一行：左边是序列名、图集名和帧数，右边是均匀选取的几帧关键帧。
+行按图集名和序列名排序，每 rows_per_tile 行保存为一张PNG。
+
+先只读取plist中的帧名排好所有的行（不解码贴图），再把每张图分给进程池：
+每个工作进程解码自己需要的图集，画完一张图就直接保存，主进程只收到文件名，
+所以内存占用与文件夹大小无关，解码和PNG编码都是并行的。
+
+    for report in render_contact_sheets('effects', 'effects/contact_sheets'):
+        print(report['path'], report['rows'])
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core.atlas import group_name_for
+from core.file_manager import FileManager
+from core.probe import read_frame_names
+
+# 每个动画序列默认选取的关键帧数
+DEFAULT_FRAMES = 6
+# 每一帧缩放到的单元格边长（像素）
+DEFAULT_CELL_SIZE = 96
+# 每张图的行数
+DEFAULT_ROWS_PER_TILE = 40
+# 左侧文字区域的宽度和各处的间距（像素）
+LABEL_WIDTH = 220
+PADDING = 4
+FONT_SIZE = 13
+
+BACKGROUND = (43, 43, 43)
+CELL_BACKGROUND = (58, 58, 58)
+TEXT_COLOR = (230, 230, 230)
+DETAIL_COLOR = (150, 150, 150)
+ERROR_COLOR = (217, 83, 79)
+
+
+def key_frame_indices(frame_count, count):
+    """在 frame_count 帧中均匀选取 count 帧（包括第一帧和最后一帧），帧数不够时全部选取"""
+    if frame_count <= count:
+        return list(range(frame_count))
+    if count == 1:
+        return [0]
+    return [round(i * (frame_count - 1) / (count - 1)) for i in range(count)]
+
+
+def plan_rows(plist_paths):
+    """只读取帧名，列出所有的行 [(plist路径, 序列名, 帧数), ...]，读取失败的图集占一行（序列名为None）"""
+    rows = []
+    for plist_path in plist_paths:
+        try:
+            frame_names = read_frame_names(plist_path)
+        except Exception as e:
+            print(f"Error reading {plist_path}: {str(e)}")
+            rows.append((plist_path, None, 0))
+            continue
+        counts = {}
+        for frame_name in frame_names:
+            group_name = group_name_for(frame_name)
+            counts[group_name] = counts.get(group_name, 0) + 1
+        rows.extend((plist_path, group_name, counts[group_name]) for group_name in sorted(counts))
+    return rows
+
+
+def tile_size(rows, frames, cell_size):
+    width = LABEL_WIDTH + frames * (cell_size + PADDING) + PADDING
+    return width, rows * (cell_size + PADDING) + PADDING
+
+
+def label_font():
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(FONT_SIZE)
+    except TypeError:
+        # 旧版本的Pillow只有固定大小的点阵字体
+        return ImageFont.load_default()
+
+
+def draw_text(draw, position, text, font, fill, max_width):
+    """画一行文字，超出宽度时截断；字体不支持的字符用?代替"""
+    while text and draw.textlength(text, font=font) > max_width:
+        text = text[:-2] + '…' if len(text) > 2 else ''
+    try:
+        draw.text(position, text, font=font, fill=fill)
+    except UnicodeEncodeError:
+        draw.text(position, text.encode('latin-1', 'replace').decode('latin-1'), font=font, fill=fill)
+
+
+def render_tile(rows, output_path, frames=DEFAULT_FRAMES, cell_size=DEFAULT_CELL_SIZE, root=None):
+    """在工作进程中画一张总览图并保存，返回 {'path', 'rows', 'atlases', 'errors'}
+
+    相邻的行来自同一个图集时只解码一次；图集无法加载时在对应的行中显示错误信息。
+    root不为None时图集名显示为相对于root的路径。
+    """
+    from PIL import Image, ImageDraw
+    from core.atlas import Atlas
+    tile = Image.new('RGB', tile_size(len(rows), frames, cell_size), BACKGROUND)
+    draw = ImageDraw.Draw(tile)
+    font = label_font()
+    text_width = LABEL_WIDTH - 2 * PADDING
+    line_height = FONT_SIZE + 4
+
+    current_path = None
+    atlas = None
+    atlas_error = None
+    errors = []
+    for index, (plist_path, group_name, frame_count) in enumerate(rows):
+        top = PADDING + index * (cell_size + PADDING)
+        first_row = plist_path != current_path
+        if first_row:
+            if atlas is not None:
+                atlas.close()
+            current_path = plist_path
+            atlas = None
+            atlas_error = None
+            try:
+                if group_name is None:
+                    raise ValueError("Unreadable plist")
+                atlas = Atlas.open(plist_path)
+                atlas.sprite_sheet
+            except Exception as e:
+                atlas = None
+                atlas_error = f"{type(e).__name__}: {str(e)}"
+                errors.append({'plist_path': plist_path, 'error': atlas_error})
+
+        draw_text(draw, (PADDING, top), group_name or "", font, TEXT_COLOR, text_width)
+        atlas_name = os.path.relpath(plist_path, root) if root else os.path.basename(plist_path)
+        draw_text(draw, (PADDING, top + line_height), atlas_name, font, DETAIL_COLOR, text_width)
+        draw_text(draw, (PADDING, top + 2 * line_height), f"{frame_count} frames", font,
+                  DETAIL_COLOR, text_width)
+        if atlas is None:
+            # 错误信息只在图集的第一行显示
+            if first_row:
+                draw_text(draw, (LABEL_WIDTH + PADDING, top), atlas_error, font, ERROR_COLOR,
+                          tile.width - LABEL_WIDTH - 2 * PADDING)
+            continue
+
+        group = atlas.group(group_name) if group_name in atlas.animation_groups else None
+        if group is None:
+            continue
+        for column, frame_index in enumerate(key_frame_indices(len(group), frames)):
+            left = LABEL_WIDTH + PADDING + column * (cell_size + PADDING)
+            draw.rectangle((left, top, left + cell_size - 1, top + cell_size - 1), fill=CELL_BACKGROUND)
+            image = group[frame_index].image(cell_size)
+            if image is None:
+                continue
+            tile.paste(image, (left + (cell_size - image.width) // 2,
+                               top + (cell_size - image.height) // 2), image)
+    if atlas is not None:
+        atlas.close()
+
+    tile.save(output_path, compress_level=1)
+    atlases = len({plist_path for plist_path, group_name, frame_count in rows})
+    return {'path': output_path, 'rows': len(rows), 'atlases': atlases, 'errors': errors}
+
+
+def render_tile_safely(rows, output_path, frames, cell_size, root):
+    """工作进程的入口，保存失败等错误放在结果中返回"""
+    try:
+        return render_tile(rows, output_path, frames, cell_size, root)
+    except Exception as e:
+        return {'path': None, 'rows': len(rows), 'atlases': 0,
+                'errors': [{'plist_path': output_path, 'error': str(e)}]}
+
+
+def find_plist_paths(folder_path, recursive=False):
+    """文件夹中所有有贴图的plist文件（recursive时包括子文件夹），按路径排序"""
+    if recursive:
+        return list(FileManager.walk_animation_files(folder_path))
+    plist_files = FileManager().get_animation_files(folder_path)
+    return [os.path.join(folder_path, name) for name in plist_files]
+
+
+def render_contact_sheets(folder_path, output_dir, frames=DEFAULT_FRAMES, cell_size=DEFAULT_CELL_SIZE,
+                          rows_per_tile=DEFAULT_ROWS_PER_TILE, recursive=False, max_workers=None,
+                          progress=None):
+    """为文件夹中的所有图集生成总览图，按完成的顺序产出每张图的结果
+
+    输出文件为 output_dir 中的 <文件夹名>_001.png, _002.png, ...；
+    progress(已完成的图数, 总图数) 在每张图完成后调用。
+    """
+    plist_paths = find_plist_paths(folder_path, recursive)
+    rows = plan_rows(plist_paths)
+    if not rows:
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    base_name = os.path.basename(os.path.normpath(folder_path)) or 'contact'
+    tiles = [rows[start:start + rows_per_tile] for start in range(0, len(rows), rows_per_tile)]
+    digits = max(3, len(str(len(tiles))))
+
+    # spawn方式启动工作进程，在GUI中调用时也不复制GUI进程的状态
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(render_tile_safely, tile_rows,
+                                   os.path.join(output_dir, f"{base_name}_{index + 1:0{digits}d}.png"),
+                                   frames, cell_size, folder_path if recursive else None)
+                   for index, tile_rows in enumerate(tiles)]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                if progress is not None:
+                    progress(done, len(futures))
+                yield future.result()
+        finally:
+            # 调用者提前停止时不再开始剩下的图
+            for future in futures:
+                future.cancel()
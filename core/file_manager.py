@@ -1,239 +1,181 @@
-from PyQt5.QtWidgets import QTreeView, QFileSystemModel
-from PyQt5.QtCore import QDir, QModelIndex
 import os
 import json
-import plistlib
-from PIL import Image
+from core.atlas import Atlas, texture_path_for, texture_name_for
+from core.probe import probe_atlas
+from core.tracing import tracer
 
 class FileManager:
     def __init__(self):
-        self.folder_model = QFileSystemModel()
-        self.setup_model()
-        self.tree = None
-        self.config_file = os.path.join(os.path.dirname(__file__), 'config.json')
+        # 环境变量 ANIPREVIEW_CONFIG 可以指定其他配置文件（例如自动测试时不修改用户的配置）
+        self.config_file = os.environ.get('ANIPREVIEW_CONFIG') or \
+            os.path.join(os.path.dirname(__file__), 'config.json')
+        # 文件夹扫描结果缓存 {(路径, 深度): (修改时间, 结果)}
+        self.folder_scan_cache = {}
+        # 图集文件头信息缓存 {plist路径: (文件标记, 信息)}
+        self.probe_cache = {}
+        # 预加载的图集缓存（WarmPool），未开启预加载时为None
+        self.atlas_cache = None
+        # 在独立进程中加载图集（SafeLoader），为None时在当前线程中加载
+        self.safe_loader = None
+        # 最近一次加载失败的原因 {plist路径: 错误信息}
+        self.load_errors = {}
         
-    def setup_model(self):
-        """设置文件系统模型"""
-        root_dir = QDir.rootPath()
-        self.folder_model.setRootPath(root_dir)
-        
-    def create_folder_tree(self):
-        """创建文件夹树视图"""
-        self.tree = QTreeView()
-        self.tree.setModel(self.folder_model)
-        
-        # 设置根目录
-        root_dir = QDir.rootPath()
-        self.tree.setRootIndex(self.folder_model.index(root_dir))
-        
-        # 设置列宽和显示
-        self.tree.setColumnWidth(0, 300)
-        self.tree.setMinimumWidth(350)
-        
-        # 只显示文件夹名称列
-        self.tree.setColumnHidden(1, True)
-        self.tree.setColumnHidden(2, True)
-        self.tree.setColumnHidden(3, True)
+    def folder_has_animations(self, folder_path, depth=0):
+        """检查文件夹（以及depth层以内的子文件夹）中是否有动画文件"""
+        try:
+            mtime = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return False
+        key = (folder_path, depth)
+        cached = self.folder_scan_cache.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
         
-        # 恢复上次的位置
-        last_path = self.load_last_position()
-        if last_path and os.path.exists(last_path):
-            index = self.folder_model.index(last_path)
-            self.tree.setCurrentIndex(index)
-            self.tree.scrollTo(index)
-            # 展开到当前位置的路径
-            parent = index.parent()
-            while parent.isValid():
-                self.tree.expand(parent)
-                parent = parent.parent()
+        result = False
+        subfolders = []
+        try:
+            with os.scandir(folder_path) as entries:
+                names = set()
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subfolders.append(entry.path)
+                    else:
+                        names.add(entry.name)
+            result = any(name.endswith('.plist') and texture_name_for(name, names)
+                         for name in names)
+            if not result and depth > 0:
+                result = any(self.folder_has_animations(sub, depth - 1) for sub in subfolders)
+        except OSError:
+            result = False
         
-        return self.tree
+        self.folder_scan_cache[key] = (mtime, result)
+        return result
     
-    def load_last_position(self):
-        """加载上次的位置"""
+    def load_config(self):
+        """加载配置"""
         try:
-            if os.path.exists(self.config_file):
+            if os.path.exists(self.config_file) and os.path.getsize(self.config_file) > 0:
                 with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    return config.get('last_position')
+                    return json.load(f)
         except Exception as e:
-            print(f"Error loading last position: {str(e)}")
-        return None
+            print(f"Error loading config: {str(e)}")
+        return {}
     
-    def save_last_position(self, path):
-        """保存当前位置"""
+    def save_config(self, **values):
+        """保存配置（只更新传入的项）"""
         try:
-            config = {'last_position': path}
+            config = self.load_config()
+            config.update(values)
             with open(self.config_file, 'w') as f:
                 json.dump(config, f)
         except Exception as e:
-            print(f"Error saving last position: {str(e)}")
+            print(f"Error saving config: {str(e)}")
+    
+    def load_last_position(self):
+        """加载上次的位置"""
+        return self.load_config().get('last_position')
+    
+    def save_last_position(self, path):
+        """保存当前位置"""
+        self.save_config(last_position=path)
     
     def get_animation_files(self, folder_path):
         """获取文件夹中的动画文件"""
         try:
-            files = os.listdir(folder_path)
+            files = set(os.listdir(folder_path))
             plist_files = []
             
-            # 检查每个plist文件是否有对应的png文件
+            # 检查每个plist文件是否有对应的贴图文件（png、pvr.ccz、ccz或pvr）
             for f in files:
-                if f.endswith('.plist'):
-                    png_file = f.replace('.plist', '.png')
-                    if png_file in files:
-                        plist_files.append(f)
+                if f.endswith('.plist') and texture_name_for(f, files):
+                    plist_files.append(f)
             
             return sorted(plist_files)
         except Exception as e:
             print(f"Error getting animation files: {str(e)}")
             return []
     
+    @staticmethod
+    def walk_animation_files(root):
+        """递归产出root下所有有贴图的plist文件路径（跳过隐藏文件夹）"""
+        for folder_path, folder_names, file_names in os.walk(root):
+            folder_names[:] = sorted(name for name in folder_names if not name.startswith('.'))
+            names = set(file_names)
+            for name in sorted(file_names):
+                if name.endswith('.plist') and texture_name_for(name, names):
+                    yield os.path.join(folder_path, name)
+    
+    def get_file_stamp(self, plist_path):
+        """获取plist和png文件的修改时间和大小，用于判断文件是否变化"""
+        try:
+            png_path = texture_path_for(plist_path)
+            plist_stat = os.stat(plist_path)
+            png_stat = os.stat(png_path)
+            return (plist_stat.st_mtime_ns, plist_stat.st_size,
+                    png_stat.st_mtime_ns, png_stat.st_size)
+        except OSError:
+            return None
+    
+    def probe_animation_file(self, plist_path):
+        """读取图集的尺寸、帧数和解码后大小，不解码贴图（文件未变化时使用缓存）"""
+        file_stamp = self.get_file_stamp(plist_path)
+        if file_stamp is None:
+            return None
+        cached = self.probe_cache.get(plist_path)
+        if cached and cached[0] == file_stamp:
+            return cached[1]
+        info = probe_atlas(plist_path)
+        self.probe_cache[plist_path] = (file_stamp, info)
+        return info
+    
+    def enable_safe_loading(self, idle=None):
+        """之后的加载在独立进程中进行，限制从配置读取；返回SafeLoader"""
+        if self.safe_loader is None:
+            from core.safe_loader import SafeLoader, limits_from_config
+            self.safe_loader = SafeLoader(limits_from_config(self.load_config()), idle)
+        return self.safe_loader
+    
+    def open_atlas(self, plist_path):
+        """打开图集（已预加载时直接使用预加载的图集）
+        
+        开启了独立进程加载时先按文件头检查限制，再在工作进程中解码；
+        否则只读取元数据，像素在首次使用时解码
+        """
+        if self.atlas_cache is not None:
+            atlas = self.atlas_cache.get(plist_path, self.get_file_stamp(plist_path))
+            if atlas is not None:
+                return atlas
+        if self.safe_loader is not None:
+            return self.safe_loader.load(plist_path, self.probe_animation_file(plist_path))
+        return Atlas.open(plist_path)
+    
+    @tracer.traced('load_animation_file', 'io')
     def load_animation_file(self, plist_path):
         """加载动画文件，支持新旧两种格式"""
         try:
-            png_path = plist_path.replace('.plist', '.png')
+            png_path = texture_path_for(plist_path)
             
             # 检查文件是否存在
             if not os.path.exists(plist_path) or not os.path.exists(png_path):
                 return None, None, None
             
-            # 加载plist文件
-            with open(plist_path, 'rb') as f:
-                plist_data = plistlib.load(f)
-            
-            # 加载PNG文件
-            sprite_sheet = Image.open(png_path).convert('RGBA')
-            
-            # 解析plist数据
-            frames_dict = plist_data.get('frames', {})
-            
-            # 按动画序列分组
-            animation_groups = {}
-            converted_frames = {}
-            
-            for frame_name, frame_data in frames_dict.items():
-                try:
-                    # 基本帧数据
-                    frame_dict = {
-                        'source_size': [500, 500],  # 默认值
-                        'offset': [0, 0],           # 默认值
-                        'rotated': False,           # 默认值
-                        'rect': [0, 0, 1, 1]        # 默认值
-                    }
-                    
-                    # 检测是否是新版格式
-                    is_new_format = 'textureRect' in frame_data or 'spriteSize' in frame_data
-                    
-                    if is_new_format:
-                        # 新版格式解析
-                        # 解析源尺寸 (spriteSourceSize 或 spriteSize)
-                        size_str = None
-                        if 'spriteSourceSize' in frame_data:
-                            size_str = frame_data['spriteSourceSize']
-                        elif 'spriteSize' in frame_data:
-                            size_str = frame_data['spriteSize']
-                            
-                        if size_str and isinstance(size_str, str):
-                            size_str = size_str.replace('{', '').replace('}', '')
-                            parts = [x.strip() for x in size_str.split(',')]
-                            if len(parts) == 2 and all(parts):
-                                try:
-                                    frame_dict['source_size'] = [int(float(x)) for x in parts]
-                                except ValueError:
-                                    pass
-                        
-                        # 解析偏移 (spriteOffset)
-                        if 'spriteOffset' in frame_data:
-                            offset_str = frame_data['spriteOffset']
-                            if offset_str and isinstance(offset_str, str):
-                                offset_str = offset_str.replace('{', '').replace('}', '')
-                                parts = [x.strip() for x in offset_str.split(',')]
-                                if len(parts) == 2 and all(parts):
-                                    try:
-                                        frame_dict['offset'] = [int(float(x)) for x in parts]
-                                    except ValueError:
-                                        pass
-                        
-                        # 解析矩形区域 (textureRect)
-                        if 'textureRect' in frame_data:
-                            rect_str = frame_data['textureRect']
-                            if rect_str and isinstance(rect_str, str):
-                                rect_str = rect_str.replace('{{', '').replace('}}', '').replace('},{', ',')
-                                parts = [x.strip() for x in rect_str.split(',')]
-                                if len(parts) == 4 and all(parts):
-                                    try:
-                                        frame_dict['rect'] = [int(float(x)) for x in parts]
-                                    except ValueError:
-                                        pass
-                        
-                        # 解析旋转 (textureRotated)
-                        if 'textureRotated' in frame_data:
-                            frame_dict['rotated'] = bool(frame_data['textureRotated'])
-                    
-                    else:
-                        # 旧版格式解析
-                        # 解析frame
-                        frame_str = frame_data.get('frame', '')
-                        if isinstance(frame_str, str):
-                            frame_str = frame_str.replace('{', '').replace('}', '')
-                            parts = [x.strip() for x in frame_str.split(',')]
-                            if len(parts) == 4 and all(parts):
-                                try:
-                                    frame_dict['rect'] = [int(float(x)) for x in parts]
-                                except ValueError:
-                                    pass
-                        
-                        # 解析源尺寸
-                        source_size = frame_data.get('sourceSize', '')
-                        if isinstance(source_size, str):
-                            source_size = source_size.replace('{', '').replace('}', '')
-                            parts = [x.strip() for x in source_size.split(',')]
-                            if len(parts) == 2 and all(parts):
-                                try:
-                                    frame_dict['source_size'] = [int(float(x)) for x in parts]
-                                except ValueError:
-                                    pass
-                        
-                        # 解析偏移
-                        offset = frame_data.get('offset', '')
-                        if isinstance(offset, str):
-                            offset = offset.replace('{', '').replace('}', '')
-                            parts = [x.strip() for x in offset.split(',')]
-                            if len(parts) == 2 and all(parts):
-                                try:
-                                    frame_dict['offset'] = [int(float(x)) for x in parts]
-                                except ValueError:
-                                    pass
-                        
-                        # 解析旋转
-                        frame_dict['rotated'] = frame_data.get('rotated', False)
-                    
-                    converted_frames[frame_name] = frame_dict
-                    
-                    # 添加到动画组
-                    base_name = frame_name.rsplit('.', 1)[0]
-                    base_name = '_'.join(base_name.split('_')[:-1])
-                    if base_name not in animation_groups:
-                        animation_groups[base_name] = []
-                    animation_groups[base_name].append(frame_name)
-                    
-                except Exception as e:
-                    print(f"Warning: Using default values for frame {frame_name}")
-                    converted_frames[frame_name] = {
-                        'source_size': [500, 500],
-                        'offset': [0, 0],
-                        'rotated': False,
-                        'rect': [0, 0, 1, 1]
-                    }
-            
-            # 对每个动画组内的帧按序号排序
-            for group in animation_groups.values():
-                group.sort(key=lambda x: int(x.split('_')[-1].split('.')[0]))
-            
-            return converted_frames, sprite_sheet, animation_groups
+            atlas = self.open_atlas(plist_path)
+            result = atlas.frames_dict, atlas.sprite_sheet, atlas.animation_groups
+            self.load_errors.pop(plist_path, None)
+            return result
             
         except Exception as e:
+            from core.safe_loader import LoadError, LoaderBusy
+            if isinstance(e, LoaderBusy):
+                # 不是图集本身的问题，不记录为加载失败
+                print(f"Skipped loading {plist_path}: {str(e)}")
+                return None, None, None
+            # 失败原因会显示在列表中
+            self.load_errors[plist_path] = str(e)
             print(f"Error loading animation file: {str(e)}")
             print(f"File path: {plist_path}")
-            import traceback
-            traceback.print_exc()
-            return None, None, None
\ No newline at end of file
+            if not isinstance(e, LoadError):
+                # 超出限制、超时和加载进程崩溃不需要调用栈
+                import traceback
+                traceback.print_exc()
+            return None, None, None
@@ -0,0 +1,117 @@
+import sys
+import numpy as np
+
+# 每帧一条记录，字段名与原来的帧字典相同，所以 frame['rect'][0] 这类代码不用修改
+FRAME_DTYPE = np.dtype([
+    ('rect', np.int32, 4),          # 图集中的位置和大小 [x, y, w, h]（w/h为未旋转时的大小）
+    ('rotated', np.bool_),          # 是否旋转90度存放
+    ('source_size', np.int32, 2),   # 原始尺寸 [w, h]
+    ('offset', np.int32, 2)         # 偏移 [x, y]
+])
+
+# 解析失败时使用的默认值
+DEFAULT_FRAME = ([0, 0, 1, 1], False, [500, 500], [0, 0])
+
+
+class FrameTable:
+    """一个图集的所有帧数据，按列存放在一个结构化数组中
+
+    names[i] 是第 i 条记录的帧名，groups 把动画序列名映射到按帧序号排好的行号数组。
+    同时提供按帧名访问的接口（table[name]、keys()），可以替代原来的帧字典。
+    """
+
+    def __init__(self, names, records, groups):
+        self.names = names
+        self.records = records
+        self.groups = groups
+        self._rows = None
+
+    @classmethod
+    def from_columns(cls, names, rects, rotated, source_sizes, offsets, groups):
+        """由逐列收集的数据创建"""
+        records = np.empty(len(names), dtype=FRAME_DTYPE)
+        if len(names):
+            records['rect'] = rects
+            records['rotated'] = rotated
+            records['source_size'] = source_sizes
+            records['offset'] = offsets
+        return cls(names, records, groups)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, frame_name):
+        return frame_name in self.row_index()
+
+    def __getitem__(self, frame_name):
+        return self.records[self.row_index()[frame_name]]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def keys(self):
+        return self.names
+
+    def row_index(self):
+        """帧名到行号的映射（首次按名字访问时才建立）"""
+        if self._rows is None:
+            self._rows = {name: row for row, name in enumerate(self.names)}
+        return self._rows
+
+    def rows_for(self, frame_names):
+        """帧名列表转换为行号数组，传入的已经是行号时原样返回"""
+        if isinstance(frame_names, np.ndarray):
+            return frame_names
+        row_index = self.row_index()
+        return np.array([row_index[name] for name in frame_names], dtype=np.int32)
+
+    def frames(self, rows):
+        """取出若干帧的记录（结构化数组）"""
+        return self.records[self.rows_for(rows)]
+
+    def group_names(self, group_name):
+        """动画序列中各帧的帧名"""
+        return [self.names[row] for row in self.groups[group_name]]
+
+    def group_ids(self):
+        """每一行所属的动画序列，返回 (序列名列表, 行号对应的序列下标数组)，不属于任何序列的为-1"""
+        group_names = sorted(self.groups)
+        ids = np.full(len(self.names), -1, dtype=np.int32)
+        for group_id, group_name in enumerate(group_names):
+            ids[self.groups[group_name]] = group_id
+        return group_names, ids
+
+    def sheet_rects(self):
+        """各帧在图集中实际占用的区域 (x0, y0, x1, y1)，旋转的帧宽高互换"""
+        rect = self.records['rect']
+        rotated = self.records['rotated']
+        width = np.where(rotated, rect[:, 3], rect[:, 2])
+        height = np.where(rotated, rect[:, 2], rect[:, 3])
+        return np.stack([rect[:, 0], rect[:, 1], rect[:, 0] + width, rect[:, 1] + height], axis=1)
+
+    def validate(self, sheet_size):
+        """返回不合法的帧的掩码：大小不为正，或超出图集范围"""
+        sheet_w, sheet_h = sheet_size
+        rects = self.sheet_rects()
+        bad = (rects[:, 2] <= rects[:, 0]) | (rects[:, 3] <= rects[:, 1])
+        bad |= (rects[:, 0] < 0) | (rects[:, 1] < 0)
+        bad |= (rects[:, 2] > sheet_w) | (rects[:, 3] > sheet_h)
+        bad |= (self.records['source_size'] <= 0).any(axis=1)
+        return bad
+
+    def bounds(self, rows=None):
+        """若干帧在图集中的外接矩形 (x0, y0, x1, y1)"""
+        rects = self.sheet_rects()
+        if rows is not None:
+            rects = rects[self.rows_for(rows)]
+        if not len(rects):
+            return (0, 0, 0, 0)
+        return (int(rects[:, 0].min()), int(rects[:, 1].min()),
+                int(rects[:, 2].max()), int(rects[:, 3].max()))
+
+    def memory_usage(self):
+        """估算帧数据占用的内存（字节），包括帧名和分组数组"""
+        total = self.records.nbytes + sys.getsizeof(self.names)
+        total += sum(sys.getsizeof(name) for name in self.names)
+        total += sum(rows.nbytes for rows in self.groups.values())
+        return total
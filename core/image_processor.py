@@ -1,36 +1,82 @@
-from PIL import Image
-import numpy as np
-from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import Qt
+import threading
+from core.perf_stats import perf_stats
+from core.tracing import tracer
+
+class AllocationStats:
+    """统计每帧处理和转换过程中分配的图像缓冲区"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """清零所有计数"""
+        with self.lock:
+            self.frames = 0
+            self.conversions = 0
+            self.allocations = 0
+            self.allocated_bytes = 0
+    
+    def record_frame(self):
+        with self.lock:
+            self.frames += 1
+    
+    def record_conversion(self):
+        with self.lock:
+            self.conversions += 1
+    
+    def record_allocation(self, width, height, channels=4):
+        with self.lock:
+            self.allocations += 1
+            self.allocated_bytes += width * height * channels
+    
+    def snapshot(self):
+        """返回当前计数以及每帧的平均分配次数和字节数"""
+        with self.lock:
+            frames = max(1, self.frames)
+            return {
+                'frames': self.frames,
+                'conversions': self.conversions,
+                'allocations': self.allocations,
+                'allocated_bytes': self.allocated_bytes,
+                'allocations_per_frame': self.allocations / frames,
+                'bytes_per_frame': self.allocated_bytes / frames
+            }
+
 
 class ImageProcessor:
+    # 所有实例共享的分配统计和各阶段耗时统计
+    allocation_stats = AllocationStats()
+    perf_stats = perf_stats
+    
     @staticmethod
+    @perf_stats.timed('composite')
+    @tracer.traced('process_frame', 'render')
     def process_frame(frame_data, sprite_sheet):
         """处理单个动画帧"""
+        from PIL import Image
         try:
+            # 帧数据可能来自帧表中的记录，先转换为Python整数
+            x, y, w, h = (int(v) for v in frame_data['rect'])
+            
             # 从sprite sheet中裁剪出当前帧
             if frame_data['rotated']:
-                frame_image = sprite_sheet.crop((
-                    frame_data['rect'][0],
-                    frame_data['rect'][1],
-                    frame_data['rect'][0] + frame_data['rect'][3],
-                    frame_data['rect'][1] + frame_data['rect'][2]
-                ))
+                frame_image = sprite_sheet.crop((x, y, x + h, y + w))
                 frame_image = frame_image.transpose(Image.ROTATE_90)
+                ImageProcessor.allocation_stats.record_allocation(frame_image.width, frame_image.height)
             else:
-                frame_image = sprite_sheet.crop((
-                    frame_data['rect'][0],
-                    frame_data['rect'][1],
-                    frame_data['rect'][0] + frame_data['rect'][2],
-                    frame_data['rect'][1] + frame_data['rect'][3]
-                ))
+                frame_image = sprite_sheet.crop((x, y, x + w, y + h))
+            
+            ImageProcessor.allocation_stats.record_allocation(frame_image.width, frame_image.height)
             
             # 创建目标图像
-            source_w, source_h = frame_data['source_size']
+            source_w, source_h = (int(v) for v in frame_data['source_size'])
             final_image = Image.new('RGBA', (source_w, source_h), (0, 0, 0, 0))
+            ImageProcessor.allocation_stats.record_allocation(source_w, source_h)
+            ImageProcessor.allocation_stats.record_frame()
             
             # 计算粘贴位置
-            offset_x, offset_y = frame_data['offset']
+            offset_x, offset_y = (int(v) for v in frame_data['offset'])
             paste_x = int((source_w - frame_image.width) / 2 + offset_x)
             paste_y = int((source_h - frame_image.height) / 2 - offset_y)
             
@@ -44,34 +90,81 @@ class ImageProcessor:
             return None
     
     @staticmethod
-    def pil_to_pixmap(pil_image, target_size=None):
-        """将PIL图像转换为QPixmap"""
+    @perf_stats.timed('composite')
+    @tracer.traced('process_region', 'render')
+    def process_region(frame_data, sprite_sheet, region, output_size, zoom):
+        """只合成帧的一部分，直接从图集中的子区域缩放到输出大小
+        
+        region: 帧坐标中的可见区域 (x0, y0, x1, y1)，可以是小数
+        output_size: 输出图像大小（宽, 高），zoom为每个帧像素对应的输出像素数
+        放大时使用最近邻采样，便于检查边缘像素；耗时只和输出大小有关，与帧的大小无关
+        """
+        from PIL import Image
         try:
-            if pil_image is None:
-                return None
-                
-            # 转换为numpy数组
-            frame_array = np.array(pil_image)
-            height, width, channel = frame_array.shape
-            bytes_per_line = channel * width
+            x, y, w, h = (int(v) for v in frame_data['rect'])
+            source_w, source_h = (int(v) for v in frame_data['source_size'])
+            offset_x, offset_y = (int(v) for v in frame_data['offset'])
+            # 与process_frame相同的粘贴位置
+            paste_x = int((source_w - w) / 2 + offset_x)
+            paste_y = int((source_h - h) / 2 - offset_y)
             
-            # 转换为QImage
-            q_image = QImage(frame_array.data, width, height, bytes_per_line, 
-                           QImage.Format_RGBA8888)
+            output = Image.new('RGBA', output_size, (0, 0, 0, 0))
+            ImageProcessor.allocation_stats.record_allocation(*output_size)
             
-            # 创建QPixmap
-            pixmap = QPixmap.fromImage(q_image)
+            # 可见区域与帧中实际有像素的部分的交集
+            rx0, ry0, rx1, ry1 = region
+            ix0, iy0 = max(rx0, paste_x), max(ry0, paste_y)
+            ix1, iy1 = min(rx1, paste_x + w), min(ry1, paste_y + h)
+            if ix1 <= ix0 or iy1 <= iy0:
+                return output
             
-            # 如果指定了目标大小，进行缩放
-            if target_size:
-                pixmap = pixmap.scaled(
-                    target_size,
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
+            # 交集在输出图像中的位置和大小
+            dest_x = round((ix0 - rx0) * zoom)
+            dest_y = round((iy0 - ry0) * zoom)
+            dest_w = max(1, round((ix1 - rx0) * zoom) - dest_x)
+            dest_h = max(1, round((iy1 - ry0) * zoom) - dest_y)
             
-            return pixmap
+            # 交集在裁剪后的帧中的坐标
+            u0, v0, u1, v1 = ix0 - paste_x, iy0 - paste_y, ix1 - paste_x, iy1 - paste_y
+            if frame_data['rotated']:
+                # 图集中存放的是逆时针旋转前的图像（宽h高w），换算到旋转前的坐标
+                box = (x + h - v1, y + u0, x + h - v0, y + u1)
+                part_size = (dest_h, dest_w)
+            else:
+                box = (x + u0, y + v0, x + u1, y + v1)
+                part_size = (dest_w, dest_h)
+            if zoom >= 1:
+                part = sprite_sheet.resize(part_size, Image.NEAREST, box=box)
+            else:
+                # 缩小时在大图集上做双线性缩放要读取整个区域，
+                # 改为最近邻采样到两倍大小后再2x2平均，耗时只和输出大小有关
+                part = sprite_sheet.resize((part_size[0] * 2, part_size[1] * 2), Image.NEAREST, box=box)
+                part = part.reduce(2)
+            if frame_data['rotated']:
+                part = part.transpose(Image.ROTATE_90)
+            ImageProcessor.allocation_stats.record_allocation(dest_w, dest_h)
+            ImageProcessor.allocation_stats.record_frame()
             
+            output.paste(part, (dest_x, dest_y), part)
+            return output
+        
         except Exception as e:
-            print(f"Error converting image: {str(e)}")
-            return None 
\ No newline at end of file
+            print(f"Error processing frame region: {str(e)}")
+            return None
+    
+    @staticmethod
+    @perf_stats.timed('scale')
+    def scale_image(pil_image, target_size, resample='bilinear'):
+        """按比例缩放PIL图像，使其完整放入目标大小（宽, 高）
+        
+        resample: 'bilinear' 或 'nearest'（更快，画质调节器在负载高时使用）
+        """
+        from PIL import Image
+        target_w, target_h = target_size
+        ratio = min(target_w / pil_image.width, target_h / pil_image.height)
+        new_size = (max(1, round(pil_image.width * ratio)),
+                    max(1, round(pil_image.height * ratio)))
+        if new_size == pil_image.size:
+            return pil_image
+        ImageProcessor.allocation_stats.record_allocation(*new_size)
+        return pil_image.resize(new_size, Image.NEAREST if resample == 'nearest' else Image.BILINEAR)
@@ -0,0 +1,174 @@
+"""整个目录树中帧名和动画序列名的索引，用于按名称查找图集
+
+每个图集只保存帧名列表和plist的修改时间，更新时只重新读取修改过的plist。
+查询使用不可变的快照：所有名称（帧名和由帧名得到的动画序列名）转为小写后排序，
+前缀查询用二分查找；子串查询在所有名称用换行连接成的一个字符串上用 str.find 查找，
+再用二分查找把位置换算回名称。两者都不逐个遍历名称，百万个名称时也只需要几毫秒。
+"""
+import os
+import bisect
+import threading
+from itertools import accumulate
+from core.atlas import group_name_for
+from core.file_manager import FileManager
+from core.probe import read_frame_names
+
+# 命中的种类
+HIT_GROUP = 'group'
+HIT_FRAME = 'frame'
+
+# 默认最多返回的结果数
+DEFAULT_LIMIT = 200
+
+
+class IndexSnapshot:
+    """某一时刻的索引内容，建立后不再修改，可以在其他线程更新索引时查询
+
+    keys: 排序后的小写名称；hits: 与keys对应的 (种类, 名称, 图集序号)；
+    text: keys用换行连接成的字符串，starts: 每个名称在text中的起始位置
+    """
+
+    def __init__(self, atlases=None):
+        self.plist_paths = sorted(atlases or {})
+        entries = []
+        for path_id, plist_path in enumerate(self.plist_paths):
+            group_names = set()
+            for frame_name in atlases[plist_path]['frames']:
+                entries.append((frame_name.lower(), HIT_FRAME, frame_name, path_id))
+                group_names.add(group_name_for(frame_name))
+            entries.extend((group_name.lower(), HIT_GROUP, group_name, path_id)
+                           for group_name in group_names if group_name)
+        # 同名时动画序列排在帧前面
+        entries.sort(key=lambda entry: (entry[0], entry[1] != HIT_GROUP, entry[3]))
+        self.keys = [entry[0] for entry in entries]
+        self.hits = [entry[1:] for entry in entries]
+        self.text = '\n'.join(self.keys)
+        self.starts = [0] + list(accumulate(len(key) + 1 for key in self.keys))[:-1]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix_rows(self, query, limit):
+        """名称以query开头的行号"""
+        rows = []
+        row = bisect.bisect_left(self.keys, query)
+        while row < len(self.keys) and len(rows) < limit and self.keys[row].startswith(query):
+            rows.append(row)
+            row += 1
+        return rows
+
+    def substring_rows(self, query, limit, exclude=()):
+        """名称中包含query的行号（按名称顺序），exclude中的行号不计入"""
+        rows = []
+        position = self.text.find(query)
+        while position >= 0 and len(rows) < limit:
+            row = bisect.bisect_right(self.starts, position) - 1
+            if row not in exclude:
+                rows.append(row)
+            # 从下一个名称开始继续查找
+            if row + 1 >= len(self.starts):
+                break
+            position = self.text.find(query, self.starts[row + 1])
+        return rows
+
+    def hit(self, row):
+        kind, name, path_id = self.hits[row]
+        return {
+            'kind': kind,
+            'name': name,
+            'group': name if kind == HIT_GROUP else group_name_for(name),
+            'plist_path': self.plist_paths[path_id]
+        }
+
+
+class NameIndex:
+    """目录树中所有图集的名称索引
+
+    atlases 保存 {plist路径: {'stamp': (修改时间, 大小), 'frames': 帧名列表}}，
+    只在 update() 中修改；查询只读取 snapshot，两者可以在不同线程中进行。
+    """
+
+    def __init__(self):
+        self.root = None
+        self.atlases = {}
+        self.snapshot = IndexSnapshot()
+        self.update_lock = threading.Lock()
+
+    def set_root(self, root):
+        """更换索引的根目录，清空原来的索引（下一次 update() 时重新建立）"""
+        root = os.path.realpath(root) if root else None
+        if root != self.root:
+            self.root = root
+            self.atlases = {}
+            self.snapshot = IndexSnapshot()
+
+    def find_plist_files(self, root):
+        """目录树中所有有贴图的plist文件，返回 {plist路径: (修改时间, 大小)}"""
+        result = {}
+        for plist_path in FileManager.walk_animation_files(root):
+            if self.root != root:
+                # 根目录已更换，放弃本次扫描
+                return None
+            try:
+                stat = os.stat(plist_path)
+            except OSError:
+                continue
+            result[plist_path] = (stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def update(self):
+        """扫描根目录，重新读取新增和修改过的plist并删除不存在的图集
+
+        在后台线程中调用。返回发生变化的图集数，没有变化时不重建快照。
+        """
+        with self.update_lock:
+            root = self.root
+            if root is None:
+                return 0
+            plist_files = self.find_plist_files(root)
+            if plist_files is None:
+                return 0
+            atlases = dict(self.atlases)
+            changed = 0
+            for plist_path in set(atlases) - set(plist_files):
+                del atlases[plist_path]
+                changed += 1
+            for plist_path, stamp in plist_files.items():
+                entry = atlases.get(plist_path)
+                if entry is not None and entry['stamp'] == stamp:
+                    continue
+                try:
+                    frame_names = read_frame_names(plist_path)
+                except Exception as e:
+                    print(f"Error indexing {plist_path}: {str(e)}")
+                    frame_names = []
+                atlases[plist_path] = {'stamp': stamp, 'frames': frame_names}
+                changed += 1
+                if self.root != root:
+                    return 0
+            if changed and self.root == root:
+                snapshot = IndexSnapshot(atlases)
+                self.atlases = atlases
+                self.snapshot = snapshot
+            return changed
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """按名称查找（不区分大小写），名称以query开头的排在前面，其次是包含query的
+
+        返回 [{'kind', 'name', 'group', 'plist_path'}, ...]
+        """
+        query = query.strip().lower()
+        snapshot = self.snapshot
+        if not query or '\n' in query:
+            return []
+        rows = snapshot.prefix_rows(query, limit)
+        if len(rows) < limit:
+            rows += snapshot.substring_rows(query, limit - len(rows), set(rows))
+        return [snapshot.hit(row) for row in rows]
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            'atlases': len(snapshot.plist_paths),
+            'names': len(snapshot)
+        }
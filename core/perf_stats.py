@@ -0,0 +1,111 @@
+import time
+import threading
+import functools
+
+# 直方图的桶上限（毫秒），最后一个桶收集更慢的记录
+HISTOGRAM_BOUNDS = (1, 2, 4, 8, 16, 33, 66)
+
+
+class StageTimer:
+    """一个处理阶段的耗时统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def record(self, elapsed_ms):
+        self.count += 1
+        self.total += elapsed_ms
+        self.max = max(self.max, elapsed_ms)
+        for i, bound in enumerate(HISTOGRAM_BOUNDS):
+            if elapsed_ms < bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avg_ms': self.total / self.count if self.count else 0.0,
+            'max_ms': self.max,
+            'histogram': list(self.histogram)
+        }
+
+
+class _NullStage:
+    """统计关闭时使用的空上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Stage:
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class PerfStats:
+    """各处理阶段（解析、解码、合成、缩放、转换、显示）的耗时统计
+
+    默认关闭，关闭时 stage() 只返回一个共享的空上下文，几乎没有开销。
+    性能面板显示时才打开。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.null_stage = _NullStage()
+
+    def stage(self, name):
+        """用于 with 语句的计时上下文"""
+        if not self.enabled:
+            return self.null_stage
+        return _Stage(self, name)
+
+    def timed(self, name):
+        """整个函数计时的装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Stage(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, elapsed_ms):
+        with self.lock:
+            timer = self.stages.get(name)
+            if timer is None:
+                timer = self.stages[name] = StageTimer()
+            timer.record(elapsed_ms)
+
+    def snapshot(self):
+        """返回各阶段统计的副本"""
+        with self.lock:
+            return {name: timer.snapshot() for name, timer in self.stages.items()}
+
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+
+
+# 全局共享的统计对象
+perf_stats = PerfStats()
@@ -0,0 +1,334 @@
+"""动画序列的感知哈希和相似度索引，用于查找图集之间重复导出或相近的特效
+
+每个动画序列按时间均匀取 REPRESENTATIVE_FRAMES 帧，每帧合成后裁掉透明边缘，
+按alpha预乘后缩小为32x32灰度图，做二维DCT，取左上角8x8低频系数与中位数比较得到64位哈希。
+一个序列的特征码为这几帧哈希拼成的192位，距离为汉明距离。一批帧的DCT用numpy矩阵乘法一次算完。
+
+索引使用多索引哈希（multi-index hashing）：把192位分成 CHUNKS 段16位，每段按值排序。
+两个特征码的距离不超过r时，至少有一段的距离不超过 r // CHUNKS（抽屉原理），
+所以只需在每段中查找与查询值相差不超过这么多位的值，再对候选逐个计算准确距离。
+五万个动画时一次查询也只需几毫秒。索引按文件标记增量更新，并保存到缓存文件中。
+"""
+import os
+import json
+import hashlib
+import threading
+from core.file_manager import FileManager
+
+# 每个序列取的帧数、缩小后的边长和保留的低频系数边长
+REPRESENTATIVE_FRAMES = 3
+SAMPLE_SIZE = 32
+HASH_SIZE = 8
+CODE_BITS = REPRESENTATIVE_FRAMES * HASH_SIZE * HASH_SIZE
+
+# 多索引哈希的分段数（每段16位）
+CHUNKS = CODE_BITS // 16
+
+# 默认的最大距离和结果数
+DEFAULT_MAX_DISTANCE = 40
+DEFAULT_LIMIT = 50
+
+# 更新索引时每处理这么多个图集保存一次缓存
+SAVE_INTERVAL = 200
+
+_dct_matrices = {}
+
+
+def dct_matrix(n):
+    """n点DCT-II的正交变换矩阵"""
+    import numpy as np
+    if n not in _dct_matrices:
+        k = np.arange(n)[:, None]
+        x = np.arange(n)[None, :]
+        matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        matrix[0] /= np.sqrt(2.0)
+        _dct_matrices[n] = matrix.astype(np.float32)
+    return _dct_matrices[n]
+
+
+def popcount(values):
+    """uint64数组中每个数的1的位数"""
+    import numpy as np
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    bytes_view = values.view(np.uint8).reshape(values.shape + (8,))
+    return np.unpackbits(bytes_view, axis=-1).sum(axis=-1)
+
+
+def frame_sample(frame_image):
+    """合成后的帧 -> 32x32灰度数组（裁掉透明边缘，颜色按alpha预乘，透明处为0）"""
+    import numpy as np
+    from PIL import Image
+    bounds = frame_image.getchannel('A').getbbox()
+    if bounds is None:
+        return np.zeros((SAMPLE_SIZE, SAMPLE_SIZE), dtype=np.float32)
+    image = frame_image.crop(bounds).convert('RGBa').resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BOX)
+    pixels = np.asarray(image, dtype=np.float32)
+    return pixels[..., 0] * 0.299 + pixels[..., 1] * 0.587 + pixels[..., 2] * 0.114
+
+
+def hash_samples(samples):
+    """一批 N x 32 x 32 的灰度数组 -> N个64位哈希（uint64数组）"""
+    import numpy as np
+    matrix = dct_matrix(SAMPLE_SIZE)
+    coefficients = matrix @ samples @ matrix.T
+    low = coefficients[:, :HASH_SIZE, :HASH_SIZE].reshape(len(samples), -1)
+    # 直流分量只反映整体亮度，不参与中位数
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    bits = np.packbits(low > median, axis=1)
+    return bits.view('>u8').astype(np.uint64).ravel()
+
+
+def representative_indices(frame_count):
+    """按时间均匀分布的代表帧序号（帧数不足时重复使用）"""
+    if frame_count <= 1:
+        return [0] * REPRESENTATIVE_FRAMES
+    return [round(i * (frame_count - 1) / (REPRESENTATIVE_FRAMES - 1))
+            for i in range(REPRESENTATIVE_FRAMES)]
+
+
+def group_samples(frames, sprite_sheet):
+    """一个序列的代表帧的灰度数组，frames为帧数据列表（帧表记录）"""
+    from core.image_processor import ImageProcessor
+    samples = []
+    for index in representative_indices(len(frames)):
+        image = ImageProcessor.process_frame(frames[index], sprite_sheet)
+        if image is None:
+            raise ValueError("Failed to composite frame")
+        samples.append(frame_sample(image))
+    return samples
+
+
+def group_code(frames, sprite_sheet):
+    """一个序列的192位特征码（REPRESENTATIVE_FRAMES个uint64）"""
+    import numpy as np
+    return hash_samples(np.stack(group_samples(frames, sprite_sheet)))
+
+
+def atlas_codes(atlas):
+    """图集中每个序列的特征码，返回 [(序列名, [64位整数, ...]), ...]"""
+    import numpy as np
+    names, samples = [], []
+    for group_name in atlas.group_names:
+        frames = atlas.table.frames(atlas.animation_groups[group_name])
+        if not len(frames):
+            continue
+        samples.extend(group_samples(frames, atlas.sprite_sheet))
+        names.append(group_name)
+    if not names:
+        return []
+    codes = hash_samples(np.stack(samples)).reshape(len(names), REPRESENTATIVE_FRAMES)
+    return [(name, [int(value) for value in code]) for name, code in zip(names, codes)]
+
+
+def cache_path_for(root):
+    """索引缓存文件的路径（ANIPREVIEW_CACHE 或 ~/.cache/anipreview 下，按根目录区分）"""
+    cache_dir = os.environ.get('ANIPREVIEW_CACHE') or \
+        os.path.join(os.path.expanduser('~'), '.cache', 'anipreview')
+    digest = hashlib.sha1(root.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f'similarity_{digest}.json')
+
+
+class CodeTable:
+    """某一时刻所有序列的特征码和多索引哈希表，建立后不再修改
+
+    codes: N x REPRESENTATIVE_FRAMES 的uint64数组；names: 与codes对应的 (plist路径, 序列名)；
+    orders[j] / sorted_chunks[j]: 按第j段的值排序后的行号和值
+    """
+
+    def __init__(self, atlases=None):
+        import numpy as np
+        self.names = []
+        rows = []
+        for plist_path in sorted(atlases or {}):
+            for group_name, code in atlases[plist_path]['groups']:
+                self.names.append((plist_path, group_name))
+                rows.append(code)
+        self.codes = np.array(rows, dtype=np.uint64).reshape(-1, REPRESENTATIVE_FRAMES)
+        chunks = self.chunks_of(self.codes)
+        self.orders = [np.argsort(chunks[:, j], kind='stable') for j in range(CHUNKS)]
+        self.sorted_chunks = [chunks[order, j] for j, order in enumerate(self.orders)]
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def chunks_of(codes):
+        import numpy as np
+        return np.ascontiguousarray(codes).view(np.uint16).reshape(len(codes), CHUNKS)
+
+    def distances(self, code, rows=None):
+        """查询特征码与rows（默认全部）中每个特征码的汉明距离"""
+        codes = self.codes if rows is None else self.codes[rows]
+        return popcount(codes ^ code).sum(axis=1)
+
+    def candidates(self, code, radius):
+        """可能在radius以内的行号：某一段与查询相差不超过 radius // CHUNKS 位"""
+        import numpy as np
+        query_chunks = self.chunks_of(code.reshape(1, -1))[0]
+        masks = chunk_masks(radius // CHUNKS)
+        found = []
+        for j in range(CHUNKS):
+            values = np.sort(query_chunks[j] ^ masks)
+            left = np.searchsorted(self.sorted_chunks[j], values, 'left')
+            right = np.searchsorted(self.sorted_chunks[j], values, 'right')
+            lengths = right - left
+            total = int(lengths.sum())
+            if total:
+                # 把每个值对应的 [left, right) 区间展开为位置
+                starts = np.repeat(left - np.cumsum(lengths) + lengths, lengths)
+                found.append(self.orders[j][starts + np.arange(total)])
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        return np.unique(np.concatenate(found))
+
+    def search(self, code, max_distance=DEFAULT_MAX_DISTANCE, limit=DEFAULT_LIMIT):
+        """距离不超过max_distance的序列，按距离排序，返回 [(距离, 行号), ...]"""
+        import numpy as np
+        if not len(self):
+            return []
+        code = np.asarray(code, dtype=np.uint64)
+        rows = self.candidates(code, max_distance)
+        distances = self.distances(code, rows)
+        keep = distances <= max_distance
+        rows, distances = rows[keep], distances[keep]
+        order = np.lexsort((rows, distances))[:limit]
+        return [(int(distances[i]), int(rows[i])) for i in order]
+
+
+_chunk_masks = {}
+
+
+def chunk_masks(bits):
+    """所有1的位数不超过bits的16位掩码"""
+    import numpy as np
+    if bits not in _chunk_masks:
+        values = np.arange(1 << 16, dtype=np.uint16)
+        counts = popcount(values.astype(np.uint64))
+        _chunk_masks[bits] = values[counts <= bits]
+    return _chunk_masks[bits]
+
+
+class SimilarityIndex:
+    """目录树中所有动画序列的特征码索引
+
+    atlases 保存 {plist路径: {'stamp': 文件标记, 'groups': [(序列名, 特征码), ...]}}，
+    只在 update() 中修改；查询只读取 table，两者可以在不同线程中进行。
+    """
+
+    def __init__(self, cache_path=None):
+        self.root = None
+        self.cache_path = cache_path
+        self.atlases = {}
+        self.table = CodeTable()
+        self.file_manager = FileManager()
+        self.update_lock = threading.Lock()
+
+    def set_root(self, root):
+        """更换根目录，读取该目录的缓存"""
+        root = os.path.realpath(root) if root else None
+        if root == self.root:
+            return
+        self.root = root
+        self.atlases = {}
+        if root is not None:
+            self.cache_path = cache_path_for(root)
+            self.load()
+        self.table = CodeTable(self.atlases)
+
+    def load(self):
+        try:
+            if self.cache_path and os.path.exists(self.cache_path):
+                with open(self.cache_path, 'r') as f:
+                    data = json.load(f)
+                if data.get('root') == self.root and data.get('bits') == CODE_BITS:
+                    self.atlases = {
+                        plist_path: {'stamp': tuple(entry['stamp']),
+                                     'groups': [tuple(group) for group in entry['groups']]}
+                        for plist_path, entry in data['atlases'].items()
+                    }
+        except Exception as e:
+            print(f"Error loading similarity index: {str(e)}")
+            self.atlases = {}
+
+    def save(self, atlases):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump({'root': self.root, 'bits': CODE_BITS, 'atlases': atlases}, f)
+            os.replace(temp_path, self.cache_path)
+        except Exception as e:
+            print(f"Error saving similarity index: {str(e)}")
+
+    def update(self, progress=None):
+        """扫描根目录，为新增和修改过的图集计算特征码并删除不存在的图集
+
+        在后台线程中调用，progress(已处理数, 需要处理的总数) 报告进度。返回发生变化的图集数。
+        """
+        from core.atlas import Atlas
+        with self.update_lock:
+            root = self.root
+            if root is None:
+                return 0
+            atlases = dict(self.atlases)
+            stamps = {}
+            for plist_path in self.file_manager.walk_animation_files(root):
+                if self.root != root:
+                    return 0
+                stamps[plist_path] = self.file_manager.get_file_stamp(plist_path)
+            changed = 0
+            for plist_path in set(atlases) - set(stamps):
+                del atlases[plist_path]
+                changed += 1
+            pending = [plist_path for plist_path, stamp in stamps.items()
+                       if stamp is not None and atlases.get(plist_path, {}).get('stamp') != stamp]
+            for done, plist_path in enumerate(pending):
+                if self.root != root:
+                    return 0
+                if progress is not None:
+                    progress(done, len(pending))
+                try:
+                    atlas = Atlas.open(plist_path)
+                    groups = atlas_codes(atlas)
+                    atlas.close()
+                except Exception as e:
+                    print(f"Error hashing {plist_path}: {str(e)}")
+                    groups = []
+                atlases[plist_path] = {'stamp': stamps[plist_path], 'groups': groups}
+                changed += 1
+                # 计算这个图集期间根目录可能已经改变，旧根目录的结果不能写入新根目录的缓存
+                if self.root != root:
+                    return 0
+                if (done + 1) % SAVE_INTERVAL == 0:
+                    # 中途也更新查询表和缓存，长时间建立索引时可以先用已完成的部分
+                    self.atlases = dict(atlases)
+                    self.table = CodeTable(self.atlases)
+                    self.save(self.atlases)
+            if progress is not None:
+                progress(len(pending), len(pending))
+            if changed and self.root == root:
+                self.atlases = atlases
+                self.table = CodeTable(atlases)
+                self.save(atlases)
+            return changed
+
+    def search(self, code, max_distance=DEFAULT_MAX_DISTANCE, limit=DEFAULT_LIMIT):
+        """与特征码相近的序列，返回 [{'plist_path', 'group', 'distance', 'similarity'}, ...]"""
+        table = self.table
+        results = []
+        for distance, row in table.search(code, max_distance, limit):
+            plist_path, group_name = table.names[row]
+            results.append({
+                'plist_path': plist_path,
+                'group': group_name,
+                'distance': distance,
+                'similarity': 1.0 - distance / CODE_BITS
+            })
+        return results
+
+    def stats(self):
+        return {
+            'atlases': len(self.atlases),
+            'animations': len(self.table)
+        }
@@ -0,0 +1,479 @@
+"""不依赖PyQt的HTTP预览服务，用浏览器查看动画
+
+只使用标准库的 http.server，复用 core 中的图集加载和帧合成。提供：
+    /                   根目录的网页
+    /browse?path=目录    文件夹网页：子文件夹和图集
+    /view?path=plist     图集网页：每个动画序列的动图
+    /api/list?path=目录  文件夹内容（JSON）
+    /api/atlas?path=plist  图集信息和动画序列（JSON）
+    /frame?path=plist&group=序列&index=帧号[&size=边长]  合成后的单帧（PNG）
+    /animation?path=plist&group=序列[&fps=帧率&size=边长&format=webp|gif]  动图
+路径都是相对于根目录的路径，解析后不能超出根目录。
+
+响应按 (请求, 文件标记) 缓存在LRU中，ETag由文件标记和请求参数计算，
+带 If-None-Match 的请求在文件未变化时直接返回304，不需要加载图集。
+同一个图集同时被多个请求使用时只解码一次，同一个响应也只生成一次（single-flight）。
+"""
+import os
+import json
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+from core.atlas import Atlas, texture_path_for
+from core.file_manager import FileManager
+
+# 默认的响应缓存和图集缓存大小（字节）
+DEFAULT_RESPONSE_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_ATLAS_CACHE_BYTES = 1024 * 1024 * 1024
+
+# 预览尺寸和帧率的范围
+DEFAULT_PREVIEW_SIZE = 256
+MAX_PREVIEW_SIZE = 2048
+DEFAULT_FPS = 12
+MAX_FPS = 60
+
+CONTENT_TYPES = {
+    'json': 'application/json; charset=utf-8',
+    'html': 'text/html; charset=utf-8',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+
+
+class RequestError(Exception):
+    """返回给客户端的错误，status为HTTP状态码"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SingleFlight:
+    """同一个键同时只执行一次，其余调用者等待并共享结果（或异常）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key, function):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = {'done': threading.Event(), 'result': None, 'error': None}
+                self.flights[key] = flight
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result']
+        try:
+            flight['result'] = function()
+            return flight['result']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight['done'].set()
+
+
+class LRUCache:
+    """按字节数限制大小的LRU缓存，size_of(值)返回一个值占用的字节数"""
+
+    def __init__(self, max_bytes, size_of):
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.size_of(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= self.size_of(old)
+            self.entries[key] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= self.size_of(evicted)
+
+
+def int_param(params, name, default, low, high):
+    """读取整数参数并限制在[low, high]之内"""
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"Invalid {name}: {value}")
+    return min(max(value, low), high)
+
+
+class PreviewService:
+    """处理预览请求，与HTTP无关，handle() 返回 (状态码, 内容类型, ETag, 内容)"""
+
+    def __init__(self, root, response_cache_bytes=DEFAULT_RESPONSE_CACHE_BYTES,
+                 atlas_cache_bytes=DEFAULT_ATLAS_CACHE_BYTES):
+        self.root = os.path.realpath(root)
+        self.file_manager = FileManager()
+        # 响应缓存 {(路由, 参数, 文件标记): (内容类型, ETag, 内容)}
+        self.responses = LRUCache(response_cache_bytes, lambda value: len(value[2]))
+        # 已解码的图集 {plist路径: (文件标记, Atlas, 贴图字节数)}
+        self.atlases = LRUCache(atlas_cache_bytes, lambda value: value[2])
+        self.flights = SingleFlight()
+        self.decodes = 0
+        self.webp = None
+        self.routes = {
+            '/': self.page_browse,
+            '/browse': self.page_browse,
+            '/view': self.page_view,
+            '/api/list': self.api_list,
+            '/api/atlas': self.api_atlas,
+            '/frame': self.render_frame,
+            '/animation': self.render_animation
+        }
+
+    def resolve(self, relative_path):
+        """把相对于根目录的路径转换为绝对路径，超出根目录时拒绝"""
+        path = os.path.realpath(os.path.join(self.root, (relative_path or '').lstrip('/\\')))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise RequestError(403, "Path outside of root")
+        return path
+
+    def relative(self, path):
+        relative_path = os.path.relpath(path, self.root)
+        return '' if relative_path == '.' else relative_path.replace(os.sep, '/')
+
+    def resolve_folder(self, params):
+        path = self.resolve(params.get('path'))
+        if not os.path.isdir(path):
+            raise RequestError(404, "Folder not found")
+        return path
+
+    def resolve_atlas(self, params):
+        """解析plist路径，返回 (路径, 文件标记)"""
+        path = self.resolve(params.get('path'))
+        if not path.endswith('.plist'):
+            raise RequestError(400, "Not a plist file")
+        file_stamp = self.file_manager.get_file_stamp(path)
+        if file_stamp is None:
+            raise RequestError(404, "Atlas not found")
+        return path, file_stamp
+
+    def folder_stamp(self, folder_path):
+        """文件夹的修改时间加上其中每个图集的文件标记（图集被原地覆盖时文件夹的修改时间不变）"""
+        try:
+            mtime = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            raise RequestError(404, "Folder not found")
+        return (mtime, tuple(self.file_manager.get_file_stamp(os.path.join(folder_path, name))
+                             for name in self.file_manager.get_animation_files(folder_path)))
+
+    def handle(self, route, params, if_none_match=None):
+        """处理一个请求；文件标记不变时先用ETag判断，再查缓存，最后才生成内容"""
+        handler = self.routes.get(route)
+        if handler is None:
+            raise RequestError(404, "Not found")
+        stamp, build = handler(params)
+        key = (route, tuple(sorted(params.items())), stamp)
+        etag = '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20] + '"'
+        if if_none_match and (if_none_match.strip() == '*' or
+                              etag in [tag.strip() for tag in if_none_match.split(',')]):
+            return 304, None, etag, b''
+        cached = self.responses.get(key)
+        if cached is None:
+            cached = self.flights.do(('response', key), lambda: self.build_response(key, etag, build))
+        content_type, etag, body = cached
+        return 200, content_type, etag, body
+
+    def build_response(self, key, etag, build):
+        cached = self.responses.get(key)
+        if cached is None:
+            kind, body = build()
+            cached = (CONTENT_TYPES[kind], etag, body)
+            self.responses.put(key, cached)
+        return cached
+
+    def open_atlas(self, plist_path, file_stamp):
+        """取出解码好的图集，多个请求同时需要同一个图集时只解码一次"""
+        cached = self.atlases.get(plist_path)
+        if cached is not None and cached[0] == file_stamp:
+            return cached[1]
+        return self.flights.do(('atlas', plist_path, file_stamp),
+                               lambda: self.decode_atlas(plist_path, file_stamp))
+
+    def decode_atlas(self, plist_path, file_stamp):
+        cached = self.atlases.get(plist_path)
+        if cached is not None and cached[0] == file_stamp:
+            return cached[1]
+        atlas = Atlas.open(plist_path)
+        width, height = atlas.sprite_sheet.size
+        self.decodes += 1
+        # 文件变化后旧版本的响应因为文件标记不同不会再被使用，随LRU淘汰
+        self.atlases.put(plist_path, (file_stamp, atlas, width * height * 4))
+        return atlas
+
+    def group_for(self, atlas, params):
+        name = params.get('group')
+        if name not in atlas.animation_groups:
+            raise RequestError(404, f"Animation not found: {name}")
+        return atlas.group(name)
+
+    # 以下每个路由返回 (文件标记, 生成函数)，生成函数返回 (内容种类, 内容)
+
+    def api_list(self, params):
+        folder_path = self.resolve_folder(params)
+        return self.folder_stamp(folder_path), lambda: ('json', self.to_json(self.list_folder(folder_path)))
+
+    def list_folder(self, folder_path):
+        folders = []
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                    folders.append({
+                        'name': entry.name,
+                        'path': self.relative(entry.path),
+                        'has_animations': self.file_manager.folder_has_animations(entry.path, 1)
+                    })
+        atlases = []
+        for name in self.file_manager.get_animation_files(folder_path):
+            plist_path = os.path.join(folder_path, name)
+            info = self.file_manager.probe_animation_file(plist_path) or {}
+            atlases.append({
+                'name': name,
+                'path': self.relative(plist_path),
+                'width': info.get('width'),
+                'height': info.get('height'),
+                'frame_count': info.get('frame_count'),
+                'texture': os.path.basename(texture_path_for(plist_path)),
+                'error': info.get('error')
+            })
+        return {
+            'path': self.relative(folder_path),
+            'parent': None if folder_path == self.root else self.relative(os.path.dirname(folder_path)),
+            'folders': sorted(folders, key=lambda folder: folder['name']),
+            'atlases': atlases
+        }
+
+    def api_atlas(self, params):
+        plist_path, file_stamp = self.resolve_atlas(params)
+        return file_stamp, lambda: ('json', self.to_json(self.describe_atlas(plist_path, file_stamp)))
+
+    def describe_atlas(self, plist_path, file_stamp):
+        # 只需要元数据，不解码贴图
+        cached = self.atlases.get(plist_path)
+        atlas = cached[1] if cached is not None and cached[0] == file_stamp else Atlas.open(plist_path)
+        info = self.file_manager.probe_animation_file(plist_path) or {}
+        groups = []
+        for group in atlas.groups():
+            groups.append({
+                'name': group.name,
+                'frame_count': len(group),
+                'source_size': list(group.source_size),
+                'frames': group.frame_names
+            })
+        return {
+            'path': self.relative(plist_path),
+            'texture': os.path.basename(atlas.texture_path),
+            'width': info.get('width'),
+            'height': info.get('height'),
+            'frame_count': atlas.frame_count,
+            'groups': groups
+        }
+
+    def render_frame(self, params):
+        plist_path, file_stamp = self.resolve_atlas(params)
+        size = int_param(params, 'size', 0, 0, MAX_PREVIEW_SIZE)
+
+        def build():
+            import io
+            group = self.group_for(self.open_atlas(plist_path, file_stamp), params)
+            index = int_param(params, 'index', 0, -len(group), len(group) - 1)
+            image = group[index].image(size or None)
+            if image is None:
+                raise RequestError(500, "Failed to composite frame")
+            output = io.BytesIO()
+            image.save(output, 'PNG')
+            return 'png', output.getvalue()
+        return file_stamp, build
+
+    def render_animation(self, params):
+        plist_path, file_stamp = self.resolve_atlas(params)
+        size = int_param(params, 'size', DEFAULT_PREVIEW_SIZE, 1, MAX_PREVIEW_SIZE)
+        fps = int_param(params, 'fps', DEFAULT_FPS, 1, MAX_FPS)
+        image_format = params.get('format') or ('webp' if self.supports_webp() else 'gif')
+        if image_format not in ('webp', 'gif'):
+            raise RequestError(400, f"Unsupported format: {image_format}")
+
+        def build():
+            group = self.group_for(self.open_atlas(plist_path, file_stamp), params)
+            return image_format, self.encode_animation(group, size, fps, image_format)
+        return file_stamp, build
+
+    def encode_animation(self, group, size, fps, image_format):
+        """合成一个序列的所有帧并编码为动图，尺寸不同的帧居中放在同样大小的画布上"""
+        import io
+        from PIL import Image
+        frames = [image for image in group.frames(size) if image is not None]
+        if not frames:
+            raise RequestError(500, "Failed to composite frames")
+        width = max(image.width for image in frames)
+        height = max(image.height for image in frames)
+        canvases = []
+        for image in frames:
+            if image.size != (width, height):
+                canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+                canvas.paste(image, ((width - image.width) // 2, (height - image.height) // 2))
+                image = canvas
+            canvases.append(image)
+        output = io.BytesIO()
+        options = {'save_all': True, 'append_images': canvases[1:],
+                   'duration': round(1000 / fps), 'loop': 0}
+        if image_format == 'webp':
+            canvases[0].save(output, 'WEBP', lossless=True, method=0, **options)
+        else:
+            # GIF只有1位透明度，每帧重新绘制，避免透明区域残留上一帧
+            canvases[0].save(output, 'GIF', disposal=2, **options)
+        return output.getvalue()
+
+    def supports_webp(self):
+        if self.webp is None:
+            from PIL import features
+            self.webp = features.check('webp')
+        return self.webp
+
+    def page_browse(self, params):
+        folder_path = self.resolve_folder(params)
+        return self.folder_stamp(folder_path), lambda: ('html', self.browse_html(folder_path))
+
+    def browse_html(self, folder_path):
+        listing = self.list_folder(folder_path)
+        items = []
+        if listing['parent'] is not None:
+            items.append(f'<li><a href="/browse?path={quote(listing["parent"])}">..</a></li>')
+        for folder in listing['folders']:
+            style = '' if folder['has_animations'] else ' style="color:#999"'
+            items.append(f'<li><a{style} href="/browse?path={quote(folder["path"])}">'
+                         f'{html.escape(folder["name"])}/</a></li>')
+        for atlas in listing['atlases']:
+            detail = (f"{atlas['width']}x{atlas['height']}, {atlas['frame_count']} 帧"
+                      if not atlas['error'] else html.escape(atlas['error']))
+            items.append(f'<li><a href="/view?path={quote(atlas["path"])}">{html.escape(atlas["name"])}</a>'
+                         f' <small>{detail}</small></li>')
+        return self.page('/' + listing['path'], '<ul>' + ''.join(items) + '</ul>')
+
+    def page_view(self, params):
+        plist_path, file_stamp = self.resolve_atlas(params)
+        size = int_param(params, 'size', DEFAULT_PREVIEW_SIZE, 1, MAX_PREVIEW_SIZE)
+        fps = int_param(params, 'fps', DEFAULT_FPS, 1, MAX_FPS)
+        return file_stamp, lambda: ('html', self.view_html(plist_path, file_stamp, size, fps))
+
+    def view_html(self, plist_path, file_stamp, size, fps):
+        info = self.describe_atlas(plist_path, file_stamp)
+        path = quote(info['path'])
+        parent = quote(self.relative(os.path.dirname(plist_path)))
+        cells = []
+        for group in info['groups']:
+            cells.append(f'<figure><img src="/animation?path={path}&group={quote(group["name"])}'
+                         f'&size={size}&fps={fps}" loading="lazy">'
+                         f'<figcaption>{html.escape(group["name"])} '
+                         f'<small>{group["source_size"][0]}x{group["source_size"][1]}, '
+                         f'{group["frame_count"]} 帧</small></figcaption></figure>')
+        body = (f'<p><a href="/browse?path={parent}">返回</a> '
+                f'<small>{info["texture"]} {info["width"]}x{info["height"]}, {info["frame_count"]} 帧, {fps} fps</small></p>'
+                + ''.join(cells))
+        return self.page(info['path'], body)
+
+    def page(self, title, body):
+        return ('<!DOCTYPE html><html><head><meta charset="utf-8">'
+                f'<title>{html.escape(title)}</title><style>'
+                'body{font-family:sans-serif;margin:16px}'
+                'figure{display:inline-block;margin:8px;text-align:center}'
+                'img{background:#fff;border:1px solid #ccc;max-width:100%}'
+                '</style></head><body>'
+                f'<h3>{html.escape(title)}</h3>{body}</body></html>').encode('utf-8')
+
+    def to_json(self, data):
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def stats(self):
+        return {
+            'responses': len(self.responses.entries),
+            'response_bytes': self.responses.bytes,
+            'hits': self.responses.hits,
+            'misses': self.responses.misses,
+            'atlases': len(self.atlases.entries),
+            'decodes': self.decodes
+        }
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    """把GET请求交给服务器上的PreviewService"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            status, content_type, etag, body = self.server.service.handle(
+                url.path.rstrip('/') or '/', params, self.headers.get('If-None-Match'))
+        except RequestError as e:
+            status, content_type, etag, body = e.status, CONTENT_TYPES['json'], None, \
+                json.dumps({'error': str(e)}).encode('utf-8')
+        except Exception as e:
+            print(f"Error handling request {self.path}: {str(e)}")
+            status, content_type, etag, body = 500, CONTENT_TYPES['json'], None, \
+                json.dumps({'error': str(e)}).encode('utf-8')
+
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            # 每次都用ETag向服务器确认，文件变化后浏览器能马上看到
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(root, host='127.0.0.1', port=8000, quiet=False, **service_options):
+    """创建预览服务器（每个请求一个线程），调用 serve_forever() 开始服务"""
+    server = ThreadingHTTPServer((host, port), PreviewRequestHandler)
+    server.daemon_threads = True
+    server.service = PreviewService(root, **service_options)
+    server.quiet = quiet
+    return server
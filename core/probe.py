@@ -0,0 +1,188 @@
+"""只读取文件头的图集信息探测，不解码像素
+
+PNG只读取开头的IHDR块（33字节），PVR/CCZ只解压开头的文件头，
+plist用expat流式解析统计帧数并读取metadata，
+用于文件列表显示尺寸、帧数和解码后的内存大小，在打开之前标出过大的贴图。
+"""
+import os
+import struct
+import plistlib
+import xml.etree.ElementTree as ET
+import xml.parsers.expat
+from core.atlas import texture_path_for, is_pvr_texture
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG颜色类型对应的通道数
+PNG_COLOR_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+PNG_COLOR_NAMES = {0: 'Gray', 2: 'RGB', 3: 'Palette', 4: 'GrayAlpha', 6: 'RGBA'}
+
+# 解码后超过这个大小（字节）的贴图视为过大
+LARGE_DECODED_BYTES = 256 * 1024 * 1024
+
+
+def read_png_header(png_path):
+    """读取PNG的IHDR块，返回宽、高、位深、颜色类型等信息"""
+    with open(png_path, 'rb') as f:
+        header = f.read(33)
+    if len(header) < 33 or header[:8] != PNG_SIGNATURE or header[12:16] != b'IHDR':
+        raise ValueError(f"Not a PNG file: {png_path}")
+    width, height, bit_depth, color_type, compression, filter_method, interlace = \
+        struct.unpack('>IIBBBBB', header[16:29])
+    return {
+        'width': width,
+        'height': height,
+        'bit_depth': bit_depth,
+        'color_type': color_type,
+        'color_name': PNG_COLOR_NAMES.get(color_type, str(color_type)),
+        'channels': PNG_COLOR_CHANNELS.get(color_type, 4),
+        'interlaced': bool(interlace)
+    }
+
+
+def read_texture_header(texture_path):
+    """读取贴图的文件头，PVR贴图的颜色名为像素格式名，位深为每像素的位数"""
+    if not is_pvr_texture(texture_path):
+        return read_png_header(texture_path)
+    from core.pvr_decoder import read_pvr_header, FORMAT_BYTES, FORMAT_CHANNELS
+    header = read_pvr_header(texture_path)
+    return {
+        'width': header['width'],
+        'height': header['height'],
+        'bit_depth': FORMAT_BYTES[header['format']] * 8,
+        'color_type': None,
+        'color_name': header['format'],
+        'channels': FORMAT_CHANNELS[header['format']],
+        'interlaced': False
+    }
+
+
+def plist_element_value(elem):
+    """把XML plist的元素转换为Python值（只用于metadata这类小的子树）"""
+    tag = elem.tag
+    if tag == 'dict':
+        children = list(elem)
+        return {children[i].text or '': plist_element_value(children[i + 1])
+                for i in range(0, len(children) - 1, 2)}
+    if tag == 'array':
+        return [plist_element_value(child) for child in elem]
+    if tag == 'integer':
+        return int(elem.text)
+    if tag == 'real':
+        return float(elem.text)
+    if tag == 'true':
+        return True
+    if tag == 'false':
+        return False
+    return elem.text or ''
+
+
+def probe_plist(plist_path):
+    """统计plist中的帧数并读取metadata，不建立整个plist的数据结构
+
+    用expat逐个处理标签，只计数frames下的键；metadata先记下在文件中的位置，
+    解析完成后单独读出这一段。返回 (帧数, metadata字典)
+    """
+    frame_count, frame_names, metadata = scan_plist(plist_path)
+    return frame_count, metadata
+
+
+def read_frame_names(plist_path):
+    """流式读取plist中所有帧的帧名（不解析帧数据）"""
+    frame_count, frame_names, metadata = scan_plist(plist_path, collect_names=True)
+    return frame_names
+
+
+def scan_plist(plist_path, collect_names=False):
+    """probe_plist和read_frame_names共用的流式解析，返回 (帧数, 帧名列表或None, metadata字典)"""
+    with open(plist_path, 'rb') as f:
+        if f.read(8) == b'bplist00':
+            # 二进制plist无法流式读取，直接完整解析
+            f.seek(0)
+            plist_data = plistlib.load(f)
+            frames = plist_data.get('frames', {})
+            return (len(frames), list(frames) if collect_names else None,
+                    plist_data.get('metadata') or {})
+        f.seek(0)
+
+        parser = xml.parsers.expat.ParserCreate()
+        # 层级：1为<plist>，2为根dict，3为根dict的键和值，4为frames中每一帧的键和值
+        state = {
+            'depth': 0,
+            'top_key': None,
+            'key_text': None,
+            'frame_count': 0,
+            'frame_names': [] if collect_names else None,
+            'metadata_start': None,
+            'metadata_span': None
+        }
+
+        def start_element(name, attrs):
+            state['depth'] += 1
+            depth = state['depth']
+            if depth == 3:
+                if name == 'key':
+                    # 只在读取根dict的键时处理文本，其他文本不回调
+                    state['key_text'] = []
+                    parser.CharacterDataHandler = character_data
+                elif name == 'dict' and state['top_key'] == 'metadata':
+                    state['metadata_start'] = parser.CurrentByteIndex
+            elif depth == 4 and name == 'key' and state['top_key'] == 'frames':
+                state['frame_count'] += 1
+                if collect_names:
+                    state['key_text'] = []
+                    parser.CharacterDataHandler = character_data
+
+        def end_element(name):
+            depth = state['depth']
+            state['depth'] -= 1
+            if depth == 4 and state['key_text'] is not None:
+                state['frame_names'].append(''.join(state['key_text']))
+                state['key_text'] = None
+                parser.CharacterDataHandler = None
+                return
+            if depth != 3:
+                return
+            if name == 'key':
+                state['top_key'] = ''.join(state['key_text'])
+                state['key_text'] = None
+                parser.CharacterDataHandler = None
+                return
+            if name == 'dict' and state['top_key'] == 'metadata' and state['metadata_span'] is None:
+                state['metadata_span'] = (state['metadata_start'], parser.CurrentByteIndex)
+            state['top_key'] = None
+
+        def character_data(data):
+            state['key_text'].append(data)
+
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.ParseFile(f)
+
+        metadata = {}
+        span = state['metadata_span']
+        if span and span[1] > span[0]:
+            f.seek(span[0])
+            metadata_xml = f.read(span[1] - span[0]) + b'</dict>'
+            metadata = plist_element_value(ET.fromstring(metadata_xml))
+        return state['frame_count'], state['frame_names'], metadata
+
+
+def probe_atlas(plist_path):
+    """探测一个图集的信息，失败时返回带error的字典"""
+    texture_path = texture_path_for(plist_path)
+    info = {
+        'plist_path': plist_path,
+        'texture_path': texture_path
+    }
+    try:
+        info.update(read_texture_header(texture_path))
+        info['frame_count'], info['metadata'] = probe_plist(plist_path)
+        info['format'] = info['metadata'].get('format')
+        info['texture_bytes'] = os.path.getsize(texture_path)
+        # 贴图统一解码为RGBA
+        info['decoded_bytes'] = info['width'] * info['height'] * 4
+        info['large'] = info['decoded_bytes'] > LARGE_DECODED_BYTES
+    except Exception as e:
+        info['error'] = str(e)
+    return info
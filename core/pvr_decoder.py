@@ -0,0 +1,192 @@
+"""cocos2d-x 的 .pvr / .pvr.ccz / .ccz 贴图解码
+
+CCZ是带16字节头的zlib压缩容器，解压后是PVR文件（v2或v3格式）。
+支持 RGBA8888、BGRA8888、RGBA4444、RGB565、RGBA5551、RGB888、A8、L8、LA88 等非压缩格式，
+像素用numpy整列位运算展开为RGBA，不逐像素循环。PVRTC/ETC等压缩格式不支持。
+"""
+import struct
+import zlib
+
+CCZ_SIGNATURE = b'CCZ!'
+CCZ_ENCRYPTED_SIGNATURE = b'CCZp'
+CCZ_HEADER_SIZE = 16
+CCZ_COMPRESSION_ZLIB = 0
+
+PVR2_TAG = b'PVR!'
+PVR2_HEADER_SIZE = 52
+PVR3_VERSION = 0x03525650
+PVR3_HEADER_SIZE = 52
+PVR3_FLAG_PREMULTIPLIED = 0x02
+
+# PVR v2 的像素格式（flags的低8位）
+PVR2_FORMATS = {
+    0x10: 'RGBA4444',
+    0x11: 'RGBA5551',
+    0x12: 'RGBA8888',
+    0x13: 'RGB565',
+    0x15: 'RGB888',
+    0x16: 'L8',
+    0x17: 'LA88',
+    0x1A: 'BGRA8888',
+    0x1B: 'A8'
+}
+
+# PVR v3 的像素格式（低4字节为通道顺序，高4字节为各通道位数）
+PVR3_FORMATS = {
+    0x0808080861626772: 'RGBA8888',
+    0x0808080861726762: 'BGRA8888',
+    0x0404040461626772: 'RGBA4444',
+    0x0105050561626772: 'RGBA5551',
+    0x0005060500626772: 'RGB565',
+    0x0008080800626772: 'RGB888',
+    0x0000000800000061: 'A8',
+    0x000000080000006c: 'L8',
+    0x000008080000616c: 'LA88'
+}
+
+# 每种格式每个像素的字节数和通道数
+FORMAT_BYTES = {
+    'RGBA8888': 4, 'BGRA8888': 4, 'RGBA4444': 2, 'RGBA5551': 2, 'RGB565': 2,
+    'RGB888': 3, 'A8': 1, 'L8': 1, 'LA88': 2
+}
+FORMAT_CHANNELS = {
+    'RGBA8888': 4, 'BGRA8888': 4, 'RGBA4444': 4, 'RGBA5551': 4, 'RGB565': 3,
+    'RGB888': 3, 'A8': 1, 'L8': 1, 'LA88': 2
+}
+
+
+def is_ccz(data):
+    return data[:4] in (CCZ_SIGNATURE, CCZ_ENCRYPTED_SIGNATURE)
+
+
+def inflate_ccz(data, max_length=0):
+    """解压CCZ容器，max_length大于0时只解压开头的这么多字节（读取文件头用）"""
+    signature, compression, version, reserved, length = struct.unpack('>4sHHII', data[:CCZ_HEADER_SIZE])
+    if signature == CCZ_ENCRYPTED_SIGNATURE:
+        raise ValueError("Encrypted CCZ files are not supported")
+    if signature != CCZ_SIGNATURE:
+        raise ValueError("Not a CCZ file")
+    if compression != CCZ_COMPRESSION_ZLIB:
+        raise ValueError(f"Unsupported CCZ compression type: {compression}")
+    inflater = zlib.decompressobj()
+    payload = inflater.decompress(data[CCZ_HEADER_SIZE:], max_length)
+    if not max_length and len(payload) != length:
+        raise ValueError(f"CCZ size mismatch: {len(payload)} != {length}")
+    return payload
+
+
+def read_texture_data(texture_path, header_only=False):
+    """读取PVR数据，.ccz文件先解压；header_only时只读取和解压开头部分"""
+    with open(texture_path, 'rb') as f:
+        data = f.read(4096) if header_only else f.read()
+    if is_ccz(data):
+        return inflate_ccz(data, PVR3_HEADER_SIZE if header_only else 0)
+    return data
+
+
+def parse_pvr_header(data):
+    """解析PVR v2/v3文件头，返回宽、高、像素格式、像素数据起始位置等信息"""
+    if len(data) >= PVR3_HEADER_SIZE and struct.unpack('<I', data[:4])[0] == PVR3_VERSION:
+        (version, flags, pixel_format, color_space, channel_type, height, width,
+         depth, surfaces, faces, mipmaps, metadata_length) = struct.unpack('<IIQIIIIIIIII', data[:52])
+        format_name = PVR3_FORMATS.get(pixel_format)
+        if format_name is None:
+            raise ValueError(f"Unsupported PVR v3 pixel format: {pixel_format:#x}")
+        return {
+            'version': 3,
+            'width': width,
+            'height': height,
+            'format': format_name,
+            'premultiplied': bool(flags & PVR3_FLAG_PREMULTIPLIED),
+            'data_offset': PVR3_HEADER_SIZE + metadata_length
+        }
+    if len(data) >= PVR2_HEADER_SIZE and data[44:48] == PVR2_TAG:
+        (header_length, height, width, mipmaps, flags, data_length, bpp,
+         red_mask, green_mask, blue_mask, alpha_mask) = struct.unpack('<11I', data[:44])
+        format_name = PVR2_FORMATS.get(flags & 0xFF)
+        if format_name is None:
+            raise ValueError(f"Unsupported PVR v2 pixel format: {flags & 0xFF:#x}")
+        return {
+            'version': 2,
+            'width': width,
+            'height': height,
+            'format': format_name,
+            'premultiplied': False,
+            'data_offset': header_length
+        }
+    raise ValueError("Not a PVR file")
+
+
+def expand_bits(values, bits):
+    """把bits位的通道值扩展到8位（0和最大值分别对应0和255）"""
+    import numpy as np
+    values = values.astype(np.uint8)
+    if bits >= 4:
+        # 高位复制到低位，与GPU的扩展方式相同
+        return (values << (8 - bits)) | (values >> (2 * bits - 8))
+    return values * np.uint8(255 // ((1 << bits) - 1))
+
+
+def unpack_pixels(format_name, payload, width, height):
+    """把像素数据展开为 高x宽x4 的RGBA数组"""
+    import numpy as np
+    count = width * height
+    size = count * FORMAT_BYTES[format_name]
+    if len(payload) < size:
+        raise ValueError(f"PVR data too short: {len(payload)} < {size}")
+    raw = np.frombuffer(payload, dtype=np.uint8, count=size)
+
+    if format_name == 'RGBA8888':
+        return raw.reshape(height, width, 4)
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    if format_name == 'BGRA8888':
+        pixels = raw.reshape(height, width, 4)
+        rgba[..., 0] = pixels[..., 2]
+        rgba[..., 1] = pixels[..., 1]
+        rgba[..., 2] = pixels[..., 0]
+        rgba[..., 3] = pixels[..., 3]
+    elif format_name == 'RGB888':
+        rgba[..., :3] = raw.reshape(height, width, 3)
+        rgba[..., 3] = 255
+    elif format_name == 'A8':
+        rgba[..., :3] = 255
+        rgba[..., 3] = raw.reshape(height, width)
+    elif format_name == 'L8':
+        rgba[..., :3] = raw.reshape(height, width, 1)
+        rgba[..., 3] = 255
+    elif format_name == 'LA88':
+        pixels = raw.reshape(height, width, 2)
+        rgba[..., :3] = pixels[..., :1]
+        rgba[..., 3] = pixels[..., 1]
+    else:
+        # 16位格式按小端读取，每个通道用移位和掩码取出后扩展到8位
+        values = raw.view('<u2').reshape(height, width)
+        if format_name == 'RGBA4444':
+            fields = ((12, 4), (8, 4), (4, 4), (0, 4))
+        elif format_name == 'RGBA5551':
+            fields = ((11, 5), (6, 5), (1, 5), (0, 1))
+        else:
+            fields = ((11, 5), (5, 6), (0, 5))
+        for channel, (shift, bits) in enumerate(fields):
+            rgba[..., channel] = expand_bits((values >> shift) & ((1 << bits) - 1), bits)
+        if format_name == 'RGB565':
+            rgba[..., 3] = 255
+    return rgba
+
+
+def read_pvr_header(texture_path):
+    """只读取文件头（.ccz只解压开头），返回parse_pvr_header的结果"""
+    return parse_pvr_header(read_texture_data(texture_path, header_only=True))
+
+
+def load_pvr(texture_path):
+    """解码PVR贴图为RGBA的PIL图像"""
+    from PIL import Image
+    data = read_texture_data(texture_path)
+    header = parse_pvr_header(data)
+    width, height = header['width'], header['height']
+    rgba = unpack_pixels(header['format'], memoryview(data)[header['data_offset']:], width, height)
+    if header['premultiplied']:
+        # 预乘过的颜色还原为普通的RGBA，和PNG贴图的合成方式一致
+        return Image.frombuffer('RGBa', (width, height), rgba, 'raw', 'RGBa', 0, 1).convert('RGBA')
+    return Image.frombuffer('RGBA', (width, height), rgba, 'raw', 'RGBA', 0, 1)
@@ -0,0 +1,105 @@
+"""根据每次刷新的耗时自动调整预览网格的画质
+
+每次刷新记录一次耗时（GUI线程的处理时间和线程池完成这一批合成的时间中较大的一个），
+和帧间隔比较。负载持续偏高时按顺序降低画质：先改用最近邻缩放，再降低单元格分辨率，
+最后让非焦点单元格隔几次刷新才更新一次；负载降下来并保持一段时间后再逐级恢复。
+鼠标所在和高亮的单元格始终使用完整画质。
+"""
+from collections import deque
+
+# 画质等级，从高到低
+# resample: 缩放方式；scale: 单元格预览图的分辨率比例；frame_step: 非焦点单元格每几次刷新更新一次
+QUALITY_LEVELS = [
+    {'name': '完整', 'resample': 'bilinear', 'scale': 1.0, 'frame_step': 1},
+    {'name': '快速缩放', 'resample': 'nearest', 'scale': 1.0, 'frame_step': 1},
+    {'name': '半分辨率', 'resample': 'nearest', 'scale': 0.5, 'frame_step': 1},
+    {'name': '隔帧刷新', 'resample': 'nearest', 'scale': 0.5, 'frame_step': 2},
+    {'name': '每3帧刷新', 'resample': 'nearest', 'scale': 0.5, 'frame_step': 3}
+]
+FULL_QUALITY = QUALITY_LEVELS[0]
+
+
+class QualityGovernor:
+    """画质调节器
+
+    window: 计算平均负载的刷新次数，每次调整后重新积累这么多次再判断
+    step_down_load: 平均耗时超过帧间隔的这个比例时降低一级
+    step_up_load: 平均耗时低于这个比例并保持 hold_seconds 秒后恢复一级
+    """
+
+    def __init__(self, target_fps=12, window=8, step_down_load=0.9, step_up_load=0.5,
+                 hold_seconds=2.0):
+        self.window = window
+        self.step_down_load = step_down_load
+        self.step_up_load = step_up_load
+        self.hold_seconds = hold_seconds
+        self.samples = deque(maxlen=window)
+        self.level = 0
+        self.calm_ticks = 0
+        self.changes = 0
+        self.set_target_fps(target_fps)
+
+    def set_target_fps(self, fps):
+        """修改目标帧率，重新开始统计"""
+        self.target_fps = max(1, fps)
+        self.samples.clear()
+        self.calm_ticks = 0
+
+    def frame_budget(self):
+        """每次刷新可用的时间（秒）"""
+        return 1.0 / self.target_fps
+
+    def load(self):
+        """最近几次刷新的平均耗时占帧间隔的比例"""
+        if not self.samples:
+            return 0.0
+        return sum(self.samples) / len(self.samples) / self.frame_budget()
+
+    def settings(self, focused=False):
+        """当前等级的画质设置，焦点单元格始终为完整画质"""
+        return FULL_QUALITY if focused else QUALITY_LEVELS[self.level]
+
+    def level_name(self):
+        return QUALITY_LEVELS[self.level]['name']
+
+    def reset(self):
+        """恢复完整画质（例如更换图集后）"""
+        self.level = 0
+        self.samples.clear()
+        self.calm_ticks = 0
+
+    def record_tick(self, cost, dropped=False):
+        """记录一次刷新的耗时（秒），dropped表示上一批合成还没完成、本次刷新被跳过
+
+        画质等级变化时返回True
+        """
+        if dropped:
+            cost = max(cost, self.frame_budget())
+        self.samples.append(cost)
+        if len(self.samples) < self.window:
+            return False
+
+        load = self.load()
+        if load > self.step_down_load:
+            self.calm_ticks = 0
+            if self.level < len(QUALITY_LEVELS) - 1:
+                return self.set_level(self.level + 1)
+            return False
+        if load < self.step_up_load and self.level > 0:
+            self.calm_ticks += 1
+            if self.calm_ticks >= self.hold_seconds * self.target_fps:
+                return self.set_level(self.level - 1)
+        else:
+            self.calm_ticks = 0
+        return False
+
+    def set_level(self, level):
+        """切换画质等级，重新积累耗时样本"""
+        level = min(max(level, 0), len(QUALITY_LEVELS) - 1)
+        if level == self.level:
+            return False
+        self.level = level
+        self.samples.clear()
+        self.calm_ticks = 0
+        self.changes += 1
+        return True
@@ -0,0 +1,378 @@
+"""离线重新打包图集：裁掉帧周围的透明像素、合并相同的帧，用MaxRects重新排列
+
+    report = repack_atlas('effects/hero.plist', 'effects/repacked')
+    print(report['before_area'], report['after_area'])
+
+输出的plist/png对在本工具中合成出的每一帧与原图集逐像素相同：
+帧的原始尺寸不变，偏移按 ImageProcessor.process_frame 的取整方式重新计算。
+"""
+import os
+import math
+import time
+import hashlib
+import plistlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core.file_manager import FileManager
+from core.image_processor import ImageProcessor
+
+# 候选的图集宽度为 sqrt(总面积) 的这些倍数
+WIDTH_FACTORS = (1.0, 1.15, 1.3, 1.6, 2.0)
+
+DEFAULT_PADDING = 2
+DEFAULT_MAX_SIZE = 8192
+
+
+class MaxRectsPacker:
+    """MaxRects装箱（Bottom-Left规则）
+
+    空闲区域保存为 (x, y, 宽, 高) 数组，选择位置、切分和去除被包含的空闲区域都是整列运算。
+    放入的矩形越靠上越好，同样高度时越靠左越好，允许旋转时两个方向都尝试。
+    """
+
+    def __init__(self, width, height, allow_rotation=True):
+        self.width = width
+        self.height = height
+        self.allow_rotation = allow_rotation
+        self.free = np.array([[0, 0, width, height]], dtype=np.int64)
+
+    def find_position(self, width, height):
+        """返回 (顶边位置, x, 空闲区域下标)，放不下时返回None"""
+        free = self.free
+        fits = (free[:, 2] >= width) & (free[:, 3] >= height)
+        if not fits.any():
+            return None
+        # 先比较放入后的底边，再比较x
+        score = np.where(fits, (free[:, 1] + height) * (self.width + 1) + free[:, 0], np.iinfo(np.int64).max)
+        index = int(np.argmin(score))
+        return int(free[index, 1] + height), int(free[index, 0]), index
+
+    def insert(self, width, height):
+        """放入一个矩形，返回 (x, y, 是否旋转)，放不下时返回None"""
+        best = self.find_position(width, height)
+        rotated = False
+        if self.allow_rotation and width != height:
+            turned = self.find_position(height, width)
+            if turned is not None and (best is None or turned[:2] < best[:2]):
+                best, rotated = turned, True
+        if best is None:
+            return None
+        index = best[2]
+        x, y = int(self.free[index, 0]), int(self.free[index, 1])
+        if rotated:
+            width, height = height, width
+        self.place(x, y, width, height)
+        return x, y, rotated
+
+    def place(self, x, y, width, height):
+        """从空闲区域中扣除放入的矩形"""
+        free = self.free
+        fx, fy, fw, fh = free[:, 0], free[:, 1], free[:, 2], free[:, 3]
+        hit = (fx < x + width) & (fx + fw > x) & (fy < y + height) & (fy + fh > y)
+        keep = free[~hit]
+        fx, fy, fw, fh = fx[hit], fy[hit], fw[hit], fh[hit]
+
+        # 每个相交的空闲区域最多切出上下左右四块
+        right = np.full_like(fx, x + width)
+        bottom = np.full_like(fy, y + height)
+        parts = np.concatenate([
+            np.stack([fx, fy, x - fx, fh], axis=1),
+            np.stack([right, fy, fx + fw - right, fh], axis=1),
+            np.stack([fx, fy, fw, y - fy], axis=1),
+            np.stack([fx, bottom, fw, fy + fh - bottom], axis=1)
+        ])
+        parts = parts[(parts[:, 2] > 0) & (parts[:, 3] > 0)]
+        if len(parts):
+            parts = np.unique(parts, axis=0)
+            # 去掉被其他空闲区域包含的新区域，以及被新区域包含的旧区域
+            inside_new = contained_in(parts, parts, exclude_self=True)
+            inside_old = contained_in(parts, keep)
+            parts = parts[~(inside_new | inside_old)]
+            if len(keep) and len(parts):
+                keep = keep[~contained_in(keep, parts)]
+        self.free = np.concatenate([keep, parts]) if len(parts) else keep
+
+
+def contained_in(rects, others, exclude_self=False):
+    """rects中的每个矩形是否被others中的某个矩形包含"""
+    if not len(rects) or not len(others):
+        return np.zeros(len(rects), dtype=bool)
+    a = rects[:, None, :]
+    b = others[None, :, :]
+    inside = ((b[..., 0] <= a[..., 0]) & (b[..., 1] <= a[..., 1]) &
+              (b[..., 0] + b[..., 2] >= a[..., 0] + a[..., 2]) &
+              (b[..., 1] + b[..., 3] >= a[..., 1] + a[..., 3]))
+    if exclude_self:
+        np.fill_diagonal(inside, False)
+    return inside.any(axis=1)
+
+
+def next_power_of_two(value):
+    return 1 << max(0, int(value) - 1).bit_length()
+
+
+def pack_sizes(sizes, allow_rotation=True, padding=DEFAULT_PADDING, power_of_two=False,
+               max_size=DEFAULT_MAX_SIZE):
+    """为一组 (宽, 高) 选择面积最小的排列
+
+    依次尝试几种图集宽度，每种宽度下按高度从大到小放入，取面积最小的结果。
+    返回 ((图集宽, 图集高), [(x, y, 是否旋转), ...])，放不下时抛出ValueError。
+    """
+    if not sizes:
+        return (1, 1), []
+    padded = [(w + padding, h + padding) for w, h in sizes]
+    area = sum(w * h for w, h in padded)
+    if allow_rotation:
+        min_width = max(min(w, h) for w, h in padded)
+    else:
+        min_width = max(w for w, h in padded)
+    total_height = sum(max(w, h) if allow_rotation else h for w, h in padded)
+    # 高的先放；允许旋转时按长边排序
+    order = sorted(range(len(sizes)), key=lambda i: (-max(padded[i]) if allow_rotation else -padded[i][1],
+                                                     -padded[i][0] * padded[i][1]))
+
+    side = math.sqrt(area)
+    widths = {max(min_width, int(math.ceil(side * factor / 4)) * 4) for factor in WIDTH_FACTORS}
+    if power_of_two:
+        widths = {next_power_of_two(w) for w in widths}
+    best = None
+    for bin_width in sorted(widths):
+        if bin_width - padding > max_size:
+            continue
+        packer = MaxRectsPacker(bin_width, total_height, allow_rotation)
+        placements = [None] * len(sizes)
+        sheet_w = sheet_h = 1
+        for i in order:
+            placed = packer.insert(*padded[i])
+            if placed is None:
+                break
+            x, y, rotated = placed
+            w, h = sizes[i][::-1] if rotated else sizes[i]
+            placements[i] = placed
+            sheet_w = max(sheet_w, x + w)
+            sheet_h = max(sheet_h, y + h)
+        else:
+            if power_of_two:
+                sheet_w, sheet_h = next_power_of_two(sheet_w), next_power_of_two(sheet_h)
+            if sheet_w > max_size or sheet_h > max_size:
+                continue
+            key = (sheet_w * sheet_h, abs(sheet_w - sheet_h))
+            if best is None or key < best[0]:
+                best = (key, (sheet_w, sheet_h), placements)
+    if best is None:
+        raise ValueError(f"Frames do not fit in {max_size}x{max_size}")
+    return best[1], best[2]
+
+
+def frame_image(frame_data, sprite_sheet):
+    """从图集中取出一帧未合成的图像（宽x高为帧的实际大小，旋转的帧已转正）"""
+    from PIL import Image
+    x, y, w, h = (int(v) for v in frame_data['rect'])
+    if frame_data['rotated']:
+        return sprite_sheet.crop((x, y, x + h, y + w)).transpose(Image.ROTATE_90)
+    return sprite_sheet.crop((x, y, x + w, y + h))
+
+
+def alpha_bounds(image):
+    """不透明像素的外接矩形 (x0, y0, x1, y1)，完全透明时返回左上角的一个像素"""
+    alpha = np.asarray(image)[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    columns = np.flatnonzero(alpha.any(axis=0))
+    if not len(rows):
+        return 0, 0, 1, 1
+    return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+
+
+def offset_for(position, source_length, length):
+    """求整数c，使 int((source_length - length) / 2 + c) == position（与process_frame的取整一致）"""
+    base = (source_length - length) / 2
+    start = math.floor(position - base)
+    for candidate in (start, start + 1, start - 1):
+        if int(base + candidate) == position:
+            return candidate
+    raise ValueError(f"No integer offset places {length} at {position} in {source_length}")
+
+
+def trim_frames(frames_dict, sprite_sheet):
+    """裁掉每一帧的透明边缘并合并相同的帧
+
+    返回 (帧列表, 图像列表)：帧列表按帧表的顺序，每项为
+    {'name', 'image': 图像下标, 'position': 在原始尺寸中的位置, 'source_size'}
+    """
+    frames = []
+    images = []
+    image_index = {}
+    for row, name in enumerate(frames_dict.names):
+        frame_data = frames_dict.records[row]
+        image = frame_image(frame_data, sprite_sheet)
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        x0, y0, x1, y1 = alpha_bounds(image)
+        trimmed = image.crop((x0, y0, x1, y1))
+
+        # 与process_frame相同的粘贴位置
+        source_w, source_h = (int(v) for v in frame_data['source_size'])
+        offset_x, offset_y = (int(v) for v in frame_data['offset'])
+        w, h = (int(v) for v in frame_data['rect'][2:])
+        paste_x = int((source_w - w) / 2 + offset_x)
+        paste_y = int((source_h - h) / 2 - offset_y)
+
+        key = (trimmed.size, hashlib.sha1(trimmed.tobytes()).digest())
+        if key not in image_index:
+            image_index[key] = len(images)
+            images.append(trimmed)
+        frames.append({
+            'name': name,
+            'image': image_index[key],
+            'position': (paste_x + x0, paste_y + y0),
+            'source_size': (source_w, source_h)
+        })
+    return frames, images
+
+
+def format_size(width, height):
+    return f"{{{width},{height}}}"
+
+
+def format_rect(x, y, width, height):
+    return f"{{{{{x},{y}}},{{{width},{height}}}}}"
+
+
+def build_plist(frames, images, placements, sheet_size, texture_name, plist_format=2):
+    """生成plist数据（format 2为frame/offset旧格式，format 3为textureRect新格式）"""
+    frames_data = {}
+    for frame in frames:
+        image = images[frame['image']]
+        x, y, rotated = placements[frame['image']]
+        width, height = image.size
+        source_w, source_h = frame['source_size']
+        position_x, position_y = frame['position']
+        offset_x = offset_for(position_x, source_w, width)
+        offset_y = -offset_for(position_y, source_h, height)
+        if plist_format == 3:
+            frames_data[frame['name']] = {
+                'aliases': [],
+                'spriteOffset': format_size(offset_x, offset_y),
+                'spriteSize': format_size(width, height),
+                'spriteSourceSize': format_size(source_w, source_h),
+                'textureRect': format_rect(x, y, width, height),
+                'textureRotated': rotated
+            }
+        else:
+            frames_data[frame['name']] = {
+                'frame': format_rect(x, y, width, height),
+                'offset': format_size(offset_x, offset_y),
+                'rotated': rotated,
+                'sourceColorRect': format_rect(position_x, position_y, width, height),
+                'sourceSize': format_size(source_w, source_h)
+            }
+    return {
+        'frames': frames_data,
+        'metadata': {
+            'format': plist_format,
+            'realTextureFileName': texture_name,
+            'size': format_size(*sheet_size),
+            'textureFileName': texture_name
+        }
+    }
+
+
+def build_sheet(images, placements, sheet_size):
+    """把帧图像按排列结果复制到新的贴图中（旋转的帧顺时针旋转90度存放）"""
+    from PIL import Image
+    sheet = Image.new('RGBA', sheet_size, (0, 0, 0, 0))
+    for image, (x, y, rotated) in zip(images, placements):
+        if rotated:
+            image = image.transpose(Image.ROTATE_270)
+        sheet.paste(image, (x, y))
+    return sheet
+
+
+def repack_atlas(plist_path, output_dir, plist_format=2, allow_rotation=True,
+                 padding=DEFAULT_PADDING, power_of_two=False, max_size=DEFAULT_MAX_SIZE,
+                 verify=False):
+    """重新打包一个图集，输出到output_dir中的同名plist/png，返回统计信息"""
+    started = time.perf_counter()
+    output_plist = os.path.join(output_dir, os.path.basename(plist_path))
+    if os.path.abspath(output_plist) == os.path.abspath(plist_path):
+        raise ValueError("Output would overwrite the input atlas")
+
+    frames_dict, sprite_sheet, animation_groups = FileManager().load_animation_file(plist_path)
+    if frames_dict is None:
+        raise ValueError(f"Cannot load atlas: {plist_path}")
+
+    frames, images = trim_frames(frames_dict, sprite_sheet)
+    sheet_size, placements = pack_sizes([image.size for image in images], allow_rotation,
+                                        padding, power_of_two, max_size)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_png = output_plist[:-len('.plist')] + '.png'
+    build_sheet(images, placements, sheet_size).save(output_png)
+    plist_data = build_plist(frames, images, placements, sheet_size,
+                             os.path.basename(output_png), plist_format)
+    with open(output_plist, 'wb') as f:
+        plistlib.dump(plist_data, f)
+
+    report = {
+        'plist_path': plist_path,
+        'output_path': output_plist,
+        'frames': len(frames),
+        'unique_frames': len(images),
+        'before_size': sprite_sheet.size,
+        'after_size': sheet_size,
+        'before_area': sprite_sheet.width * sprite_sheet.height,
+        'after_area': sheet_size[0] * sheet_size[1],
+        'pixel_area': sum(image.width * image.height for image in images)
+    }
+    if verify:
+        report['mismatched'] = verify_repack(plist_path, output_plist)
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def verify_repack(original_plist, repacked_plist):
+    """逐帧合成两个图集并比较像素，返回不相同的帧名
+
+    原图集无法加载时抛出ValueError（无法验证不能当作通过）；重新打包的图集无法加载时所有帧都算不相同。
+    """
+    file_manager = FileManager()
+    old_frames, old_sheet, _ = file_manager.load_animation_file(original_plist)
+    if old_frames is None:
+        raise ValueError(f"Cannot load atlas: {original_plist}")
+    new_frames, new_sheet, _ = file_manager.load_animation_file(repacked_plist)
+    if new_frames is None:
+        return list(old_frames.names)
+    mismatched = []
+    for name in old_frames.names:
+        if name not in new_frames:
+            mismatched.append(name)
+            continue
+        old_image = ImageProcessor.process_frame(old_frames[name], old_sheet)
+        new_image = ImageProcessor.process_frame(new_frames[name], new_sheet)
+        if old_image is None or new_image is None:
+            if (old_image is None) != (new_image is None):
+                mismatched.append(name)
+            continue
+        if old_image.size != new_image.size or \
+                not np.array_equal(np.asarray(old_image), np.asarray(new_image)):
+            mismatched.append(name)
+    return mismatched
+
+
+def repack_one(plist_path, output_dir, options):
+    """工作进程中重新打包一个图集，出错时返回带error的统计"""
+    try:
+        return repack_atlas(plist_path, output_dir, **options)
+    except Exception as e:
+        return {'plist_path': plist_path, 'error': str(e)}
+
+
+def repack_folder(folder_path, output_dir, max_workers=None, **options):
+    """在进程池中重新打包文件夹中的所有图集，按完成的顺序产出统计信息"""
+    plist_files = FileManager().get_animation_files(folder_path)
+    plist_paths = [os.path.join(folder_path, name) for name in plist_files]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(repack_one, plist_path, output_dir, options)
+                   for plist_path in plist_paths]
+        for future in as_completed(futures):
+            yield future.result()
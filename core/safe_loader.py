@@ -0,0 +1,207 @@
+"""在独立进程中加载图集，限制贴图像素数、文件大小、帧数和加载时间
+
+加载前先用文件头信息（core.probe）检查，超出限制的图集不会被解码。
+解码在一个常驻的工作进程中进行，像素通过共享内存传回（与预加载相同），
+工作进程崩溃或超时时被结束并在下一次加载时重新启动，主进程只得到一个LoadError。
+等待期间反复调用 idle()，界面可以继续刷新。
+"""
+import os
+import time
+import threading
+import multiprocessing
+from core.probe import probe_atlas
+
+# 默认的加载限制，可以在配置中修改（键名见 LIMIT_CONFIG_KEYS）
+DEFAULT_LIMITS = {
+    'max_pixels': 16384 * 16384,
+    'max_file_bytes': 512 * 1024 * 1024,
+    'max_frames': 100000,
+    'timeout': 30.0,
+    # 工作进程的地址空间上限（字节），0为不限制，只在支持resource模块的系统上有效
+    'max_memory_bytes': 0
+}
+
+# 配置项 -> (限制名, 换算倍数)
+LIMIT_CONFIG_KEYS = {
+    'load_max_pixels': ('max_pixels', 1),
+    'load_max_file_mb': ('max_file_bytes', 1024 * 1024),
+    'load_max_frames': ('max_frames', 1),
+    'load_timeout_seconds': ('timeout', 1),
+    'load_max_memory_mb': ('max_memory_bytes', 1024 * 1024)
+}
+
+# 工作进程启动（导入PIL/numpy）的最长等待时间（秒）
+STARTUP_TIMEOUT = 60.0
+# 等待时调用idle()的间隔（秒）
+POLL_INTERVAL = 0.02
+
+
+class LoadError(Exception):
+    """图集超出限制、解码失败、工作进程崩溃或超时"""
+
+
+class LoaderBusy(Exception):
+    """加载进程正在加载另一个图集（等待期间界面处理事件时重入了加载），不是图集本身的问题"""
+
+
+def limits_from_config(config):
+    """从配置中读取加载限制，没有配置的项使用默认值"""
+    limits = dict(DEFAULT_LIMITS)
+    for key, (name, scale) in LIMIT_CONFIG_KEYS.items():
+        if config.get(key) is not None:
+            limits[name] = type(DEFAULT_LIMITS[name])(config[key] * scale)
+    return limits
+
+
+def check_limits(info, limits):
+    """用文件头信息检查图集是否超出限制，超出时抛出LoadError"""
+    if info is None:
+        raise LoadError("Atlas files not found")
+    if 'error' in info:
+        raise LoadError(f"Unreadable header: {info['error']}")
+    width, height = info['width'], info['height']
+    if width <= 0 or height <= 0:
+        raise LoadError(f"Invalid texture size: {width}x{height}")
+    if width * height > limits['max_pixels']:
+        raise LoadError(f"Texture too large: {width}x{height} "
+                        f"({width * height} pixels, limit {limits['max_pixels']})")
+    file_bytes = info['texture_bytes'] + os.path.getsize(info['plist_path'])
+    if file_bytes > limits['max_file_bytes']:
+        raise LoadError(f"Files too large: {file_bytes} bytes (limit {limits['max_file_bytes']})")
+    if info['frame_count'] > limits['max_frames']:
+        raise LoadError(f"Too many frames: {info['frame_count']} (limit {limits['max_frames']})")
+
+
+def apply_worker_limits(limits):
+    """在工作进程中设置PIL的像素上限和进程的地址空间上限"""
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = limits['max_pixels']
+    if limits['max_memory_bytes']:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (limits['max_memory_bytes'], limits['max_memory_bytes']))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Error setting memory limit: {str(e)}")
+
+
+def worker_main(connection, limits):
+    """工作进程：逐个处理 (plist路径, 共享内存名, 贴图尺寸)，返回不含像素的Atlas或错误信息"""
+    apply_worker_limits(limits)
+    # 启动时就导入，导入时间不计入第一次加载的超时
+    import numpy
+    from core.warm_pool import decode_into_shared_memory
+    connection.send(('ready', None))
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        plist_path, shm_name, sheet_size = message
+        try:
+            connection.send(('ok', decode_into_shared_memory(plist_path, shm_name, sheet_size)))
+        except Exception as e:
+            connection.send(('error', f"{type(e).__name__}: {str(e)}"))
+
+
+class SafeLoader:
+    """在常驻的工作进程中加载图集
+
+    limits: 见 DEFAULT_LIMITS；idle: 等待期间反复调用的函数（例如处理界面的绘制事件）
+    同一时间只处理一个加载，正在加载时再次调用 load() 直接抛出LoaderBusy（不是LoadError，不算加载失败）。
+    """
+
+    def __init__(self, limits=None, idle=None):
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.idle = idle
+        self.process = None
+        self.connection = None
+        self.ready = False
+        self.lock = threading.Lock()
+        self.crashes = 0
+        self.timeouts = 0
+
+    def start(self):
+        """启动工作进程（不等待它完成启动），可以提前调用以减少第一次加载的等待"""
+        if self.process is not None and self.process.is_alive():
+            return
+        self.stop()
+        context = multiprocessing.get_context('spawn')
+        parent_connection, child_connection = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_connection, self.limits),
+                                       name='atlas-loader', daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.connection = parent_connection
+        self.ready = False
+
+    def stop(self):
+        """结束工作进程"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(1)
+            self.process = None
+
+    def wait_reply(self, timeout, action):
+        """等待工作进程的回复；进程退出或超时时结束进程并抛出LoadError"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if self.connection.poll(POLL_INTERVAL):
+                    return self.connection.recv()
+            except (EOFError, OSError):
+                pass
+            if not self.process.is_alive():
+                exit_code = self.process.exitcode
+                self.crashes += 1
+                self.stop()
+                raise LoadError(f"Loader process crashed while {action} (exit code {exit_code})")
+            if time.monotonic() > deadline:
+                self.timeouts += 1
+                self.stop()
+                raise LoadError(f"Timed out after {timeout:g}s while {action}")
+            if self.idle is not None:
+                self.idle()
+
+    def load(self, plist_path, info=None):
+        """检查限制并在工作进程中解码图集，返回带贴图的Atlas
+
+        info为probe_atlas的结果（调用者已经读取过时传入，避免重复读取文件头）
+        """
+        from PIL import Image
+        from core.warm_pool import SharedPixels, release_shared_memory
+        if not self.lock.acquire(blocking=False):
+            raise LoaderBusy("Another atlas is being loaded")
+        try:
+            if info is None:
+                info = probe_atlas(plist_path)
+            check_limits(info, self.limits)
+            sheet_size = (info['width'], info['height'])
+
+            self.start()
+            if not self.ready:
+                self.wait_reply(STARTUP_TIMEOUT, "starting")
+                self.ready = True
+
+            shm = SharedPixels(create=True, size=sheet_size[0] * sheet_size[1] * 4)
+            try:
+                self.connection.send((plist_path, shm.name, sheet_size))
+                status, result = self.wait_reply(self.limits['timeout'], "loading")
+                if status != 'ok':
+                    raise LoadError(result)
+                sprite_sheet = Image.frombuffer('RGBA', sheet_size, shm.buf, 'raw', 'RGBA', 0, 1)
+            except BaseException:
+                release_shared_memory(shm)
+                raise
+            # 像素只被这个图像引用：先删除共享内存的名字，映射随图像一起释放
+            shm.unlink()
+            sprite_sheet.shared_memory = shm
+            result.set_sprite_sheet(sprite_sheet)
+            return result
+        finally:
+            self.lock.release()
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class GridIndex:
+    """矩形的均匀网格索引，用于在图集上按坐标查找帧
+
+    每个矩形登记到它覆盖的所有网格中，按网格编号排序后存为连续数组
+    （order[starts[c]:starts[c + 1]] 为网格 c 中的矩形），查询时只检查相关网格中的矩形。
+    rects 为 (N, 4) 的数组 (x0, y0, x1, y1)，通常是 FrameTable.sheet_rects()。
+    """
+
+    def __init__(self, rects, cell_size=None):
+        self.rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        count = len(self.rects)
+        if cell_size is None:
+            cell_size = self.default_cell_size()
+        self.cell_size = max(1, int(cell_size))
+
+        if count:
+            self.origin = (int(self.rects[:, 0].min()), int(self.rects[:, 1].min()))
+            extent_x = int(self.rects[:, 2].max()) - self.origin[0]
+            extent_y = int(self.rects[:, 3].max()) - self.origin[1]
+        else:
+            self.origin = (0, 0)
+            extent_x = extent_y = 0
+        self.columns = extent_x // self.cell_size + 1
+        self.grid_rows = extent_y // self.cell_size + 1
+
+        # 每个矩形覆盖的网格范围（包含两端）
+        cx0, cy0 = self.cell_of(self.rects[:, 0], self.rects[:, 1])
+        cx1, cy1 = self.cell_of(np.maximum(self.rects[:, 2] - 1, self.rects[:, 0]),
+                                np.maximum(self.rects[:, 3] - 1, self.rects[:, 1]))
+        span_x = cx1 - cx0 + 1
+        span_y = cy1 - cy0 + 1
+        per_rect = span_x * span_y
+
+        # 展开为 (矩形, 网格) 对
+        rect_ids = np.repeat(np.arange(count, dtype=np.int32), per_rect)
+        first = np.repeat(np.cumsum(per_rect) - per_rect, per_rect)
+        local = np.arange(len(rect_ids)) - first
+        repeated_span_x = np.repeat(span_x, per_rect)
+        cells_x = np.repeat(cx0, per_rect) + local % repeated_span_x
+        cells_y = np.repeat(cy0, per_rect) + local // repeated_span_x
+        cell_ids = cells_y * self.columns + cells_x
+
+        sort = np.argsort(cell_ids, kind='stable')
+        self.order = rect_ids[sort]
+        self.starts = np.searchsorted(cell_ids[sort],
+                                      np.arange(self.columns * self.grid_rows + 1))
+
+    def default_cell_size(self):
+        """网格大小取矩形边长的中位数的两倍"""
+        if not len(self.rects):
+            return 64
+        sizes = np.maximum(self.rects[:, 2] - self.rects[:, 0], self.rects[:, 3] - self.rects[:, 1])
+        return max(8, int(np.median(sizes)) * 2)
+
+    def __len__(self):
+        return len(self.rects)
+
+    def cell_of(self, x, y):
+        """坐标所在的网格（限制在网格范围内）"""
+        cx = np.clip((np.asarray(x) - self.origin[0]) // self.cell_size, 0, self.columns - 1)
+        cy = np.clip((np.asarray(y) - self.origin[1]) // self.cell_size, 0, self.grid_rows - 1)
+        return cx, cy
+
+    def candidates(self, x0, y0, x1, y1):
+        """区域覆盖的网格中登记的所有矩形（去重后）"""
+        if not len(self.rects):
+            return np.empty(0, dtype=np.int32)
+        cx0, cy0 = (int(v) for v in self.cell_of(x0, y0))
+        cx1, cy1 = (int(v) for v in self.cell_of(x1, y1))
+        parts = []
+        for cy in range(cy0, cy1 + 1):
+            # 同一行的网格编号连续，可以一次取出
+            start = self.starts[cy * self.columns + cx0]
+            stop = self.starts[cy * self.columns + cx1 + 1]
+            parts.append(self.order[start:stop])
+        found = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+        if cy1 > cy0 or cx1 > cx0:
+            found = np.unique(found)
+        return found
+
+    def query_rect(self, x0, y0, x1, y1):
+        """与区域 [x0, x1) x [y0, y1) 相交的矩形编号"""
+        if x1 <= x0 or y1 <= y0:
+            return np.empty(0, dtype=np.int32)
+        found = self.candidates(x0, y0, x1 - 1, y1 - 1)
+        rects = self.rects[found]
+        hit = (rects[:, 0] < x1) & (rects[:, 2] > x0) & (rects[:, 1] < y1) & (rects[:, 3] > y0)
+        return found[hit]
+
+    def query_point(self, x, y):
+        """包含该点的矩形编号，按面积从小到大排列"""
+        found = self.candidates(x, y, x, y)
+        rects = self.rects[found]
+        hit = (rects[:, 0] <= x) & (rects[:, 2] > x) & (rects[:, 1] <= y) & (rects[:, 3] > y)
+        found, rects = found[hit], rects[hit]
+        area = (rects[:, 2] - rects[:, 0]).astype(np.int64) * (rects[:, 3] - rects[:, 1])
+        return found[np.argsort(area, kind='stable')]
+
+    def hit_test(self, x, y):
+        """包含该点的最小的矩形，没有时返回None"""
+        found = self.query_point(x, y)
+        return int(found[0]) if len(found) else None
@@ -0,0 +1,36 @@
+import time
+import json
+import sys
+
+# 尽量早地导入本模块（main.py的第一行），作为启动计时的起点
+PROCESS_START = time.perf_counter()
+
+# 启动过程中各阶段的时间点（毫秒，相对于启动）
+marks = {}
+
+
+def mark(name):
+    """记录一个阶段的时间点，同名阶段只记录第一次"""
+    if name not in marks:
+        marks[name] = (time.perf_counter() - PROCESS_START) * 1000
+    return marks[name]
+
+
+def loaded_heavy_modules():
+    """启动阶段不应该导入的重量级模块中，已经被导入的那些"""
+    return [name for name in ('PIL.Image', 'numpy') if name in sys.modules]
+
+
+def report():
+    """返回启动统计"""
+    return {
+        'marks': dict(marks),
+        'heavy_modules': loaded_heavy_modules()
+    }
+
+
+def print_report(stream=None):
+    """以JSON格式输出启动统计"""
+    stream = stream or sys.stderr
+    stream.write(json.dumps(report()) + '\n')
+    stream.flush()
@@ -0,0 +1,162 @@
+"""可选的跟踪记录，输出 Chrome trace-event 格式的 JSON
+
+生成的文件可以直接用 Perfetto (ui.perfetto.dev) 或 chrome://tracing 打开。
+两种打开方式：
+    设置环境变量 ANIPREVIEW_TRACE=trace.json
+    或者 python main.py --trace trace.json
+事件保存在一个固定长度的环形缓冲区中（默认20万条，可用 ANIPREVIEW_TRACE_BUFFER 修改），
+长时间运行时只保留最近的事件。程序退出时写入文件。
+只跟踪主进程，加载进程和进程池中的子进程不开启跟踪。
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import functools
+from collections import deque
+
+# 默认最多保留的事件数
+DEFAULT_BUFFER_SIZE = 200000
+
+
+class _NullSpan:
+    """跟踪关闭时使用的空上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer.add_complete(self.name, self.category, self.start, end, self.args)
+        return False
+
+
+class Tracer:
+    """记录带线程ID的时间段（span），默认关闭"""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = deque(maxlen=DEFAULT_BUFFER_SIZE)
+        self.thread_names = {}
+        self.dropped = 0
+        self.null_span = _NullSpan()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def enable(self, path, buffer_size=None):
+        """开始跟踪，程序退出时写入 path"""
+        if buffer_size:
+            self.events = deque(self.events, maxlen=buffer_size)
+        if not self.enabled:
+            atexit.register(self.save)
+        self.path = path
+        self.enabled = True
+
+    def span(self, name, category='app', **args):
+        """用于 with 语句的时间段"""
+        if not self.enabled:
+            return self.null_span
+        return _Span(self, name, category, args)
+
+    def traced(self, name, category='app'):
+        """整个函数作为一个时间段的装饰器"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, name, category, None):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instant(self, name, category='app', **args):
+        """记录一个时间点事件"""
+        if not self.enabled:
+            return
+        self.append({'name': name, 'cat': category, 'ph': 'i', 's': 't',
+                     'ts': time.perf_counter_ns() // 1000}, args)
+
+    def add_complete(self, name, category, start_ns, end_ns, args=None):
+        """记录一个完整的时间段（ph='X'）"""
+        self.append({'name': name, 'cat': category, 'ph': 'X',
+                     'ts': start_ns // 1000, 'dur': (end_ns - start_ns) / 1000}, args)
+
+    def append(self, event, args):
+        thread = threading.current_thread()
+        event['pid'] = self.pid
+        event['tid'] = thread.ident
+        if args:
+            event['args'] = args
+        with self.lock:
+            if thread.ident not in self.thread_names:
+                self.thread_names[thread.ident] = thread.name
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+
+    def trace_events(self):
+        """缓冲区中的事件，加上进程和线程名的元数据事件"""
+        with self.lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                     'args': {'name': 'AnimationPreview'}}]
+        for tid, thread_name in thread_names.items():
+            metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                             'args': {'name': thread_name}})
+        return metadata + events
+
+    def save(self, path=None):
+        """写入trace文件"""
+        path = path or self.path
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': self.trace_events(),
+                           'displayTimeUnit': 'ms',
+                           'otherData': {'dropped_events': self.dropped}}, f)
+            print(f"Trace written to {path}", file=sys.stderr)
+        except Exception as e:
+            print(f"Error writing trace: {str(e)}")
+
+
+def env_buffer_size():
+    """环境变量 ANIPREVIEW_TRACE_BUFFER 设置的缓冲区大小，没有设置时返回None"""
+    value = os.environ.get('ANIPREVIEW_TRACE_BUFFER')
+    if not value:
+        return None
+    try:
+        return int(value) or None
+    except ValueError:
+        print(f"Error reading ANIPREVIEW_TRACE_BUFFER: {value}")
+        return None
+
+
+# 全局共享的跟踪对象
+tracer = Tracer()
+
+# 读取后从环境变量中移除：加载进程和进程池的子进程不再继承它，
+# 否则子进程导入本模块时也会开启跟踪，退出时用自己的事件覆盖主进程的trace文件
+_trace_path = os.environ.pop('ANIPREVIEW_TRACE', None)
+if _trace_path:
+    tracer.enable(_trace_path, env_buffer_size())
@@ -0,0 +1,232 @@
+"""在进程池中预先解码一个文件夹中的所有图集
+
+父进程按贴图文件头中的尺寸创建共享内存，工作进程解析plist、解码贴图后把RGBA像素
+直接写入共享内存，只有帧表通过pickle传回。父进程用 Image.frombuffer 直接引用共享内存中的像素，
+不需要再复制一次。总内存超过上限时，最久没有使用的图集先被释放。
+"""
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from core.atlas import Atlas
+
+# 默认的预加载内存上限（字节）
+DEFAULT_MEMORY_LIMIT = 1024 * 1024 * 1024
+
+# warm() 返回的状态
+WARM_READY = 'ready'
+WARM_PENDING = 'pending'
+WARM_SKIPPED = 'skipped'
+
+
+def decode_into_shared_memory(plist_path, shm_name, sheet_size):
+    """在工作进程中解析图集并把贴图像素写入共享内存，返回不含像素的Atlas"""
+    atlas = Atlas.open(plist_path)
+    sprite_sheet = atlas.sprite_sheet
+    if sprite_sheet.size != tuple(sheet_size):
+        raise ValueError(f"Texture size changed: {sprite_sheet.size} != {tuple(sheet_size)}")
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = sprite_sheet.tobytes()
+        shm.buf[:len(data)] = data
+    finally:
+        shm.close()
+    atlas.close()
+    return atlas
+
+
+class SharedPixels(shared_memory.SharedMemory):
+    """存放贴图像素的共享内存
+
+    图像用 Image.frombuffer 直接引用其中的像素，本对象释放时像素可能仍被图像引用，
+    这时不关闭映射（映射在图像释放后随缓冲区一起释放），也不输出BufferError。
+    """
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass
+
+
+def release_shared_memory(shm):
+    """删除共享内存并关闭映射；像素仍被图像引用时，映射随图像一起释放"""
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        shm.close()
+    except BufferError:
+        pass
+
+
+class WarmPool:
+    """预加载的图集缓存
+
+    entries 按最近使用的顺序保存 {plist路径: {'stamp', 'atlas', 'shm', 'bytes'}}，
+    pending 保存进行中的任务 {future: (plist路径, 文件标记, 共享内存, 字节数, 贴图尺寸)}。
+    on_ready(plist_path, ok) 在任务完成时从线程池的线程中调用。
+    """
+
+    def __init__(self, max_workers=None, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) - 1)
+        self.memory_limit = memory_limit
+        self.executor = None
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.on_ready = None
+
+    def ensure_executor(self):
+        """第一次使用时才启动工作进程（spawn方式，不复制GUI进程的状态）"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def memory_used(self):
+        """已预加载和正在解码的贴图占用的字节数"""
+        with self.lock:
+            return self._memory_used()
+
+    def _memory_used(self):
+        total = sum(entry['bytes'] for entry in self.entries.values())
+        return total + sum(job[3] for job in self.pending.values())
+
+    def pending_paths(self):
+        with self.lock:
+            return {job[0] for job in self.pending.values()}
+
+    def is_ready(self, plist_path, file_stamp):
+        with self.lock:
+            entry = self.entries.get(plist_path)
+            return entry is not None and entry['stamp'] == file_stamp
+
+    def warm(self, plist_path, file_stamp, sheet_size, keep=()):
+        """提交一个图集的预加载任务
+
+        sheet_size为贴图文件头中的尺寸，keep中的图集在腾出内存时不会被释放。
+        返回 WARM_READY / WARM_PENDING / WARM_SKIPPED（超出内存上限）
+        """
+        size = sheet_size[0] * sheet_size[1] * 4
+        with self.lock:
+            entry = self.entries.get(plist_path)
+            if entry is not None and entry['stamp'] == file_stamp:
+                return WARM_READY
+            if any(job[0] == plist_path and job[1] == file_stamp for job in self.pending.values()):
+                return WARM_PENDING
+            if entry is not None:
+                self._evict(plist_path)
+            if size <= 0 or not self._make_room(size, keep):
+                return WARM_SKIPPED
+            shm = SharedPixels(create=True, size=size)
+            future = self.ensure_executor().submit(decode_into_shared_memory, plist_path,
+                                                   shm.name, tuple(sheet_size))
+            self.pending[future] = (plist_path, file_stamp, shm, size, tuple(sheet_size))
+        future.add_done_callback(self.on_job_done)
+        return WARM_PENDING
+
+    def _make_room(self, size, keep):
+        """释放最久没有使用的图集，直到能放下size字节"""
+        if size > self.memory_limit:
+            return False
+        for plist_path in list(self.entries):
+            if self._memory_used() + size <= self.memory_limit:
+                break
+            if plist_path not in keep:
+                self._evict(plist_path)
+        return self._memory_used() + size <= self.memory_limit
+
+    def on_job_done(self, future):
+        plist_path, ok = self.adopt(future)
+        if plist_path is not None and self.on_ready is not None:
+            self.on_ready(plist_path, ok)
+
+    def adopt(self, future):
+        """把完成的任务结果放入缓存，返回 (plist路径, 是否成功)；已处理过时返回 (None, False)"""
+        from PIL import Image
+        with self.lock:
+            job = self.pending.pop(future, None)
+            if job is None:
+                return None, False
+            plist_path, file_stamp, shm, size, sheet_size = job
+            if future.cancelled():
+                release_shared_memory(shm)
+                return None, False
+            try:
+                atlas = future.result()
+                sprite_sheet = Image.frombuffer('RGBA', sheet_size, shm.buf, 'raw', 'RGBA', 0, 1)
+            except Exception as e:
+                print(f"Error preloading atlas: {str(e)}")
+                print(f"File path: {plist_path}")
+                release_shared_memory(shm)
+                return plist_path, False
+            # 图像引用共享内存，保证映射在图像的像素释放之后才关闭
+            sprite_sheet.shared_memory = shm
+            atlas.set_sprite_sheet(sprite_sheet)
+            self.entries[plist_path] = {
+                'stamp': file_stamp,
+                'atlas': atlas,
+                'shm': shm,
+                'bytes': size
+            }
+            return plist_path, True
+
+    def get(self, plist_path, file_stamp):
+        """取出预加载的图集，文件已变化或还没完成时返回None
+
+        任务正在解码时等待它完成；还没开始的任务直接取消，由调用者同步加载。
+        """
+        with self.lock:
+            running = [future for future, job in self.pending.items()
+                       if job[0] == plist_path and job[1] == file_stamp]
+        for future in running:
+            if future.cancel():
+                self.adopt(future)
+            else:
+                future.exception()
+                self.adopt(future)
+        with self.lock:
+            entry = self.entries.get(plist_path)
+            if entry is None:
+                return None
+            if entry['stamp'] != file_stamp:
+                self._evict(plist_path)
+                return None
+            self.entries.move_to_end(plist_path)
+            return entry['atlas']
+
+    def cancel_pending(self):
+        """取消还没开始的任务（切换文件夹时）"""
+        with self.lock:
+            futures = list(self.pending)
+        for future in futures:
+            if future.cancel():
+                self.adopt(future)
+
+    def _evict(self, plist_path):
+        entry = self.entries.pop(plist_path, None)
+        if entry is not None:
+            entry['atlas'].close()
+            release_shared_memory(entry['shm'])
+
+    def clear(self):
+        """释放所有预加载的图集"""
+        self.cancel_pending()
+        with self.lock:
+            for plist_path in list(self.entries):
+                self._evict(plist_path)
+
+    def shutdown(self):
+        """停止工作进程并释放共享内存"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            for job in self.pending.values():
+                release_shared_memory(job[2])
+            self.pending.clear()
+            for plist_path in list(self.entries):
+                self._evict(plist_path)
@@ -1,12 +1,54 @@
+from core import startup_profile
+from core.tracing import tracer, env_buffer_size
 import sys
+import argparse
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from ui.main_window import MainWindow
 
+def parse_args(argv):
+    """解析命令行参数，未识别的参数留给Qt"""
+    parser = argparse.ArgumentParser(description="序列帧动画预览工具")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="退出时输出启动各阶段的耗时（JSON）")
+    parser.add_argument('--startup-budget', type=float, default=None, metavar='MS',
+                        help="首次绘制窗口的时间预算（毫秒），超出时以非零状态退出")
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help="窗口首次绘制后立即退出，用于测量启动时间")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="记录加载和播放过程，退出时写入 Chrome trace-event JSON 文件"
+                             "（也可以设置环境变量 ANIPREVIEW_TRACE）")
+    return parser.parse_known_args(argv)
+
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.trace:
+        tracer.enable(args.trace, env_buffer_size())
+    startup_profile.mark('imports')
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
+    startup_profile.mark('window_created')
     window.show()
-    sys.exit(app.exec_())
+    
+    if args.exit_after_startup:
+        # 等到窗口第一次绘制完成后退出
+        exit_timer = QTimer()
+        exit_timer.timeout.connect(
+            lambda: 'first_paint' in startup_profile.marks and app.quit())
+        exit_timer.start(10)
+    
+    exit_code = app.exec_()
+    
+    if args.profile_startup or args.startup_budget is not None:
+        startup_profile.print_report()
+    if args.startup_budget is not None:
+        first_paint = startup_profile.marks.get('first_paint')
+        if first_paint is None or first_paint > args.startup_budget:
+            print(f"Startup budget exceeded: first paint {first_paint} ms, "
+                  f"budget {args.startup_budget} ms", file=sys.stderr)
+            exit_code = exit_code or 1
+    sys.exit(exit_code)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,66 @@
+"""冷启动时间检查
+
+在offscreen平台下多次以新进程启动程序，取首次绘制时间的中位数与预算比较，
+超出预算或启动阶段导入了PIL/numpy时以非零状态退出。
+
+用法: python -m tools.check_startup [--budget 毫秒] [--runs 次数]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认的首次绘制时间预算（毫秒）
+DEFAULT_BUDGET = 1000
+
+
+def measure_once():
+    """启动一次程序并返回启动统计"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT_DIR, 'main.py'),
+         '--profile-startup', '--exit-after-startup'],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, timeout=60)
+    for line in reversed(result.stderr.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"No startup report in output:\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查冷启动时间是否超出预算")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help="首次绘制时间预算（毫秒）")
+    parser.add_argument('--runs', type=int, default=3, help="启动次数，取中位数")
+    args = parser.parse_args()
+    
+    first_paints = []
+    failures = []
+    for _ in range(args.runs):
+        report = measure_once()
+        first_paint = report['marks'].get('first_paint')
+        if first_paint is None:
+            failures.append("window was never painted")
+            continue
+        first_paints.append(first_paint)
+        if report['heavy_modules']:
+            failures.append(f"heavy modules imported before first paint: {report['heavy_modules']}")
+    
+    if first_paints:
+        median = statistics.median(first_paints)
+        print(f"first paint: median {median:.1f} ms over {len(first_paints)} runs "
+              f"(budget {args.budget:.0f} ms)")
+        if median > args.budget:
+            failures.append(f"first paint {median:.1f} ms exceeds budget {args.budget:.0f} ms")
+    
+    for failure in sorted(set(failures)):
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""生成文件夹的总览图
+
+文件夹中每个图集的每个动画序列占一行，显示序列名和均匀选取的关键帧，
+每若干行保存为一张PNG。图集在进程池中并行解码，每张图画完立即保存。
+
+用法: python -m tools.contact_sheet <文件夹> [-o 输出文件夹] [--frames 帧数] [--cell 像素]
+                                    [--rows 行数] [--recursive] [--jobs 进程数]
+"""
+import os
+import sys
+import time
+import argparse
+from core.contact_sheet import (render_contact_sheets, DEFAULT_FRAMES, DEFAULT_CELL_SIZE,
+                                DEFAULT_ROWS_PER_TILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把文件夹中所有动画序列的关键帧画成总览图")
+    parser.add_argument('folder', help="包含图集的文件夹")
+    parser.add_argument('-o', '--output', help="输出文件夹（默认为输入文件夹下的contact_sheets）")
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help="每个动画序列选取的帧数")
+    parser.add_argument('--cell', type=int, default=DEFAULT_CELL_SIZE, help="每一帧的单元格边长（像素）")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS_PER_TILE, help="每张图的行数")
+    parser.add_argument('--recursive', action='store_true', help="包括子文件夹中的图集")
+    parser.add_argument('--jobs', type=int, help="进程数（默认为CPU核数）")
+    args = parser.parse_args()
+
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"Not a folder: {folder}")
+        return 1
+    output_dir = args.output or os.path.join(folder, 'contact_sheets')
+    if args.frames < 1 or args.cell < 1 or args.rows < 1:
+        print("--frames, --cell and --rows must be positive")
+        return 1
+
+    started = time.perf_counter()
+    tiles = rows = 0
+    failed = False
+    for report in render_contact_sheets(folder, output_dir, args.frames, args.cell, args.rows,
+                                        args.recursive, args.jobs):
+        for error in report['errors']:
+            print(f"{error['plist_path']}: error: {error['error']}")
+            failed = True
+        if report['path'] is None:
+            continue
+        tiles += 1
+        rows += report['rows']
+    if not tiles and not failed:
+        print(f"No atlases found in {folder}")
+        return 1
+    print(f"{tiles} sheets, {rows} animations written to {output_dir} "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""比较图集的两个版本，列出有变化、新增、删除和只是位置变化的帧
+
+两个参数都是文件夹时比较其中的同名图集，也可以直接比较两个plist文件（例如图集和它的备份）。
+有变化的帧可以保存差异热力图（亮的地方变化大）。
+没有差异时退出码为0，有差异时为1，无法加载时为2。
+
+用法: python -m tools.diff <旧版本> <新版本> [--tolerance 差值] [--heatmaps 输出文件夹]
+                          [--all] [--json 报告文件]
+"""
+import os
+import sys
+import json
+import argparse
+from core.atlas_diff import (diff_atlas_files, pair_atlas_paths, heatmap_image, frame_canvas,
+                             sheet_array, STATUS_CHANGED, STATUS_UNCHANGED, STATUSES)
+from core.file_manager import FileManager
+
+
+def frame_line(frame):
+    line = f"  {frame['status']:<9} {frame['name']}"
+    if frame['status'] == STATUS_CHANGED:
+        line += (f"  {frame['changed_pixels']} px ({frame['changed_ratio']:.1%})"
+                 f"  max {frame['max_diff']}  bounds {frame['bounds']}")
+    return line
+
+
+def save_heatmaps(result, output_dir, tolerance, file_manager):
+    """把有变化的帧的热力图保存为 <图集名>/<帧名>.png，底图为新版本的帧"""
+    if not result['heatmaps']:
+        return 0
+    new_frames, new_sheet, _ = file_manager.load_animation_file(result['new_path'])
+    sheet = sheet_array(new_sheet)
+    atlas_name = os.path.splitext(os.path.basename(result['new_path']))[0]
+    atlas_dir = os.path.join(output_dir, atlas_name)
+    os.makedirs(atlas_dir, exist_ok=True)
+    for name, difference in result['heatmaps'].items():
+        height, width = difference.shape
+        base = frame_canvas(new_frames[name], sheet, (width, height))
+        file_name = os.path.splitext(name.replace('/', '_'))[0] + '.png'
+        heatmap_image(difference, base, tolerance).save(os.path.join(atlas_dir, file_name))
+    return len(result['heatmaps'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐帧比较图集的两个版本")
+    parser.add_argument('old', help="旧版本的plist文件或文件夹")
+    parser.add_argument('new', help="新版本的plist文件或文件夹")
+    parser.add_argument('--tolerance', type=int, default=0,
+                        help="每个通道允许的差值（0-255），不超过它的像素不算变化")
+    parser.add_argument('--heatmaps', help="保存有变化的帧的热力图到这个文件夹")
+    parser.add_argument('--all', action='store_true', help="也列出没有变化的帧")
+    parser.add_argument('--json', help="把比较结果写入JSON文件")
+    args = parser.parse_args()
+
+    if not 0 <= args.tolerance <= 255:
+        print("--tolerance must be between 0 and 255")
+        return 2
+    pairs = pair_atlas_paths(args.old, args.new)
+    if not pairs:
+        print(f"No atlases found in {args.old} or {args.new}")
+        return 2
+
+    file_manager = FileManager()
+    differs = failed = False
+    report = []
+    for old_plist, new_plist in pairs:
+        if old_plist is None or new_plist is None:
+            status = 'added' if old_plist is None else 'removed'
+            print(f"{new_plist or old_plist}: atlas {status}")
+            report.append({'old_path': old_plist, 'new_path': new_plist, 'status': status})
+            differs = True
+            continue
+        try:
+            result = diff_atlas_files(old_plist, new_plist, args.tolerance, file_manager)
+        except Exception as e:
+            print(f"{new_plist}: error: {str(e)}")
+            failed = True
+            continue
+
+        counts = result['counts']
+        summary = ", ".join(f"{counts[status]} {status}" for status in STATUSES if counts[status])
+        print(f"{new_plist}: {summary or 'empty'} ({result['seconds'] * 1000:.0f} ms)")
+        for frame in result['frames']:
+            if args.all or frame['status'] != STATUS_UNCHANGED:
+                print(frame_line(frame))
+        if any(counts[status] for status in STATUSES if status != STATUS_UNCHANGED):
+            differs = True
+        if args.heatmaps:
+            saved = save_heatmaps(result, args.heatmaps, args.tolerance, file_manager)
+            if saved:
+                print(f"  {saved} heatmaps written to {args.heatmaps}")
+        report.append({'old_path': old_plist, 'new_path': new_plist, 'counts': counts,
+                       'frames': result['frames']})
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if failed:
+        return 2
+    return 1 if differs else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""重新打包图集
+
+裁掉帧周围的透明像素、合并相同的帧，用MaxRects重新排列后输出新的plist/png，
+并报告打包前后的贴图面积。传入文件夹时在进程池中处理其中的所有图集。
+
+用法: python -m tools.repack <plist或文件夹> [-o 输出文件夹] [--format 2|3] [--no-rotate]
+                             [--padding 像素] [--pot] [--max-size 像素] [--verify] [--jobs 进程数]
+"""
+import os
+import sys
+import argparse
+from core.repacker import repack_atlas, repack_folder, DEFAULT_PADDING, DEFAULT_MAX_SIZE
+
+
+def format_report(report):
+    """一个图集的结果，一行"""
+    name = os.path.basename(report['plist_path'])
+    if 'error' in report:
+        return f"{name}: error: {report['error']}"
+    before_w, before_h = report['before_size']
+    after_w, after_h = report['after_size']
+    ratio = report['after_area'] * 100 / max(1, report['before_area'])
+    line = (f"{name}: {before_w}x{before_h} -> {after_w}x{after_h} "
+            f"({report['before_area']} -> {report['after_area']} px, {ratio:.1f}%), "
+            f"{report['frames']} frames, {report['unique_frames']} unique, "
+            f"{report['seconds']:.2f}s")
+    if 'mismatched' in report:
+        line += f", verify: {'ok' if not report['mismatched'] else str(len(report['mismatched'])) + ' mismatched'}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重新打包图集，减小贴图面积")
+    parser.add_argument('path', help="plist文件或包含图集的文件夹")
+    parser.add_argument('-o', '--output', help="输出文件夹（默认为输入所在文件夹下的repacked）")
+    parser.add_argument('--format', type=int, choices=(2, 3), default=2, help="输出的plist格式")
+    parser.add_argument('--no-rotate', action='store_true', help="不旋转帧")
+    parser.add_argument('--padding', type=int, default=DEFAULT_PADDING, help="帧之间的间距（像素）")
+    parser.add_argument('--pot', action='store_true', help="贴图宽高取2的幂")
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE, help="贴图的最大边长")
+    parser.add_argument('--verify', action='store_true', help="逐帧合成并与原图集比较像素")
+    parser.add_argument('--jobs', type=int, help="批量处理时的进程数（默认为CPU核数）")
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.path)
+    folder = path if os.path.isdir(path) else os.path.dirname(path)
+    output_dir = args.output or os.path.join(folder, 'repacked')
+    options = {
+        'plist_format': args.format,
+        'allow_rotation': not args.no_rotate,
+        'padding': args.padding,
+        'power_of_two': args.pot,
+        'max_size': args.max_size,
+        'verify': args.verify
+    }
+
+    if os.path.isdir(path):
+        reports = repack_folder(path, output_dir, args.jobs, **options)
+    else:
+        try:
+            reports = [repack_atlas(path, output_dir, **options)]
+        except Exception as e:
+            reports = [{'plist_path': path, 'error': str(e)}]
+
+    failed = False
+    before = after = 0
+    for report in reports:
+        print(format_report(report))
+        if 'error' in report or report.get('mismatched'):
+            failed = True
+            continue
+        before += report['before_area']
+        after += report['after_area']
+    if before:
+        print(f"total: {before} -> {after} px ({after * 100 / before:.1f}%), written to {output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""本地HTTP预览服务，不需要PyQt，用浏览器查看根目录下的动画
+
+用法: python -m tools.serve [根目录] [--host 地址] [--port 端口] [--cache-mb 大小]
+                           [--atlas-cache-mb 大小] [--quiet]
+不指定根目录时使用程序上次打开的位置。接口说明见 core/preview_server.py。
+"""
+import os
+import sys
+import argparse
+from core.file_manager import FileManager
+from core.preview_server import (create_server, DEFAULT_RESPONSE_CACHE_BYTES,
+                                 DEFAULT_ATLAS_CACHE_BYTES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在浏览器中预览动画的本地HTTP服务")
+    parser.add_argument('root', nargs='?', help="根目录（默认为上次打开的位置）")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址（0.0.0.0 允许其他电脑访问）")
+    parser.add_argument('--port', type=int, default=8000, help="端口")
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_RESPONSE_CACHE_BYTES // (1024 * 1024),
+                        help="响应缓存大小（MB）")
+    parser.add_argument('--atlas-cache-mb', type=int, default=DEFAULT_ATLAS_CACHE_BYTES // (1024 * 1024),
+                        help="已解码图集的缓存大小（MB）")
+    parser.add_argument('--quiet', action='store_true', help="不输出每个请求的日志")
+    args = parser.parse_args()
+
+    root = args.root or FileManager().load_last_position()
+    if not root or not os.path.isdir(root):
+        print(f"Error: root folder not found: {root}")
+        return 1
+
+    server = create_server(root, args.host, args.port, quiet=args.quiet,
+                           response_cache_bytes=args.cache_mb * 1024 * 1024,
+                           atlas_cache_bytes=args.atlas_cache_mb * 1024 * 1024)
+    host, port = server.server_address[:2]
+    print(f"Serving {server.service.root} at http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
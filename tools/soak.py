@@ -0,0 +1,386 @@
+"""端到端的长时间运行测试
+
+生成一个合成的图集库，在offscreen平台下驱动主窗口：依次点击文件夹和文件，
+播放固定时长，定期打开和关闭预览窗口。记录选中文件到显示第一帧的延迟、实际帧率、
+进程内存（RSS）和对象数量随时间的变化，最后与阈值比较，超出时以非零状态退出。
+
+用法: python -m tools.soak [--cycles 轮数] [--library 目录] [--thresholds 阈值.json] [--report 结果.json]
+
+内存和对象数从第一轮结束时开始比较（第一轮中缓存和线程池的增长不算泄漏），至少需要两轮。
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import plistlib
+import statistics
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 默认阈值，可以用 --thresholds 指定的JSON文件覆盖其中的项
+DEFAULT_THRESHOLDS = {
+    # 选中文件到显示第一帧的延迟（毫秒）
+    'latency_p95_ms': 500,
+    'latency_max_ms': 2000,
+    # 实际帧率与设定帧率之比的中位数
+    'min_fps_ratio': 0.8,
+    'min_preview_fps_ratio': 0.8,
+    # 第一轮结束到最后一轮结束之间的增长
+    'max_rss_growth_mb': 64,
+    'max_object_growth': 20000,
+    'max_widget_growth': 0,
+    'max_load_failures': 0
+}
+
+# 动画序列名，数量不够时加上序号
+GROUP_NAMES = ('idle', 'walk', 'run', 'attack', 'hit', 'die', 'cast', 'jump')
+
+# 等待第一帧显示的最长时间（毫秒）
+FIRST_FRAME_TIMEOUT = 10000
+
+# 生成的图集库的参数记录，参数相同时直接使用已有的文件
+LIBRARY_MANIFEST = 'soak_library.json'
+
+
+def make_frame(rng, group_index, frame_index, frame_count, size):
+    """画一帧：透明背景上移动的圆和一条表示帧序号的色条，返回 (裁剪后的图像, 在原图中的位置)"""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    color = (rng.randrange(60, 256), rng.randrange(60, 256), (group_index * 40) % 256, 255)
+    radius = size // 4 + rng.randrange(size // 8 + 1)
+    center_x = size // 4 + (size // 2) * frame_index // max(1, frame_count - 1)
+    center_y = size // 2
+    draw.ellipse((center_x - radius, center_y - radius, center_x + radius, center_y + radius), fill=color)
+    bar_width = max(1, (size - 4) * (frame_index + 1) // frame_count)
+    draw.rectangle((2, size - 6, 2 + bar_width, size - 3), fill=(255, 255, 255, 255))
+    bounds = image.getbbox()
+    return image.crop(bounds), bounds[:2]
+
+
+def write_atlas(plist_path, rng, groups, frames_per_group, frame_size):
+    """生成一个图集（plist + png），排列方式与 core.repacker 相同"""
+    from core.repacker import pack_sizes, build_sheet, build_plist
+    frames = []
+    images = []
+    for group_index in range(groups):
+        group_name = GROUP_NAMES[group_index % len(GROUP_NAMES)]
+        if group_index >= len(GROUP_NAMES):
+            group_name += str(group_index // len(GROUP_NAMES))
+        for frame_index in range(frames_per_group):
+            image, position = make_frame(rng, group_index, frame_index, frames_per_group, frame_size)
+            frames.append({
+                'name': f"{group_name}_{frame_index:02d}.png",
+                'image': len(images),
+                'source_size': (frame_size, frame_size),
+                'position': position
+            })
+            images.append(image)
+    sheet_size, placements = pack_sizes([image.size for image in images])
+    png_path = plist_path[:-len('.plist')] + '.png'
+    build_sheet(images, placements, sheet_size).save(png_path)
+    with open(plist_path, 'wb') as f:
+        plistlib.dump(build_plist(frames, images, placements, sheet_size, os.path.basename(png_path)), f)
+
+
+def generate_library(root, folders, atlases, groups, frames, frame_size, seed=0):
+    """在root下生成 folders 个文件夹，每个文件夹 atlases 个图集，返回文件夹路径列表
+
+    root中已有参数相同的图集库时不重新生成。
+    """
+    params = {'folders': folders, 'atlases': atlases, 'groups': groups,
+              'frames': frames, 'frame_size': frame_size, 'seed': seed}
+    folder_paths = [os.path.join(root, f"set_{i:02d}") for i in range(folders)]
+    manifest_path = os.path.join(root, LIBRARY_MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) == params:
+                return folder_paths
+    except (OSError, ValueError):
+        pass
+
+    rng = random.Random(seed)
+    for folder_path in folder_paths:
+        os.makedirs(folder_path, exist_ok=True)
+        for i in range(atlases):
+            write_atlas(os.path.join(folder_path, f"atlas_{i:02d}.plist"), rng, groups, frames, frame_size)
+    with open(manifest_path, 'w') as f:
+        json.dump(params, f)
+    return folder_paths
+
+
+def resident_bytes():
+    """当前进程的常驻内存（字节），没有 /proc 时用峰值代替"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS上单位为字节，Linux上为KB
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def percentile(values, fraction):
+    """values中位于fraction处的值（最近秩）"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+class SoakRun:
+    """驱动主窗口并记录延迟、帧率和内存
+
+    samples 中每一项为 {'seconds', 'selections', 'rss_bytes', 'objects', 'widgets'}，
+    每个文件夹结束时记录一次。
+    """
+
+    def __init__(self, app, window, play_seconds, preview_every, preview_seconds):
+        self.app = app
+        self.window = window
+        self.play_seconds = play_seconds
+        self.preview_every = preview_every
+        self.preview_seconds = preview_seconds
+        self.started = time.perf_counter()
+        self.latencies = []
+        self.fps_ratios = []
+        self.preview_fps_ratios = []
+        self.load_failures = []
+        self.selections = 0
+        self.samples = []
+
+    def wait(self, milliseconds):
+        from PyQt5.QtTest import QTest
+        QTest.qWait(int(milliseconds))
+
+    def select_folder(self, folder_path):
+        """像点击一样选中文件夹（会自动加载第一个文件）"""
+        window = self.window
+        window.folder_browser.reveal_path(folder_path)
+        index = window.folder_tree.currentIndex()
+        if window.folder_browser.file_path(index) != folder_path:
+            # 文件系统模型还没读到这个目录
+            deadline = time.perf_counter() + 5
+            while time.perf_counter() < deadline:
+                self.wait(20)
+                window.folder_browser.reveal_path(folder_path)
+                index = window.folder_tree.currentIndex()
+                if window.folder_browser.file_path(index) == folder_path:
+                    break
+            else:
+                raise RuntimeError(f"Folder not shown in tree: {folder_path}")
+        window.folder_tree.clicked.emit(index)
+        self.wait(10)
+
+    def first_frame_shown(self):
+        return any(entry['pixmap'] is not None for entry in self.window.preview_model.entries)
+
+    def select_file(self, row):
+        """点击列表中的一个文件，记录到第一帧显示的延迟，然后播放一段时间"""
+        window = self.window
+        item = window.animation_list.item(row)
+        plist_path = os.path.join(window.folder_browser.file_path(window.folder_tree.currentIndex()),
+                                  item.text())
+        started = time.perf_counter()
+        window.animation_list.setCurrentItem(item)
+        window.animation_list.itemClicked.emit(item)
+        if window.current_plist_path != plist_path:
+            self.load_failures.append(plist_path)
+            return
+        deadline = started + FIRST_FRAME_TIMEOUT / 1000
+        while not self.first_frame_shown():
+            if time.perf_counter() > deadline:
+                self.load_failures.append(plist_path)
+                return
+            self.app.processEvents()
+            time.sleep(0.001)
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        self.selections += 1
+
+        ticks = window.animation_ticks
+        play_started = time.perf_counter()
+        self.wait(self.play_seconds * 1000)
+        fps = (window.animation_ticks - ticks) / (time.perf_counter() - play_started)
+        self.fps_ratios.append(fps / window.fps_spinbox.value())
+
+        if self.preview_every and self.selections % self.preview_every == 0:
+            self.open_preview()
+
+    def open_preview(self):
+        """双击第一个预览单元格打开预览窗口，播放一段时间后关闭"""
+        from PyQt5.QtWidgets import QApplication
+        from ui.preview_window import PreviewWindow
+        existing = set(id(widget) for widget in QApplication.topLevelWidgets())
+        self.window.on_preview_activated(0)
+        windows = [widget for widget in QApplication.topLevelWidgets()
+                   if isinstance(widget, PreviewWindow) and id(widget) not in existing]
+        if not windows:
+            return
+        preview = windows[0]
+        self.wait(50)
+        ticks = preview.animation_ticks
+        play_started = time.perf_counter()
+        self.wait(self.preview_seconds * 1000)
+        fps = (preview.animation_ticks - ticks) / (time.perf_counter() - play_started)
+        self.preview_fps_ratios.append(fps / preview.fps_spinbox.value())
+        preview.close()
+        self.wait(10)
+
+    def sample(self):
+        """记录内存和对象数（先回收一次垃圾，并让延迟删除的Qt对象真正删除）"""
+        from PyQt5.QtCore import QEvent
+        from PyQt5.QtWidgets import QApplication
+        self.app.sendPostedEvents(None, QEvent.DeferredDelete)
+        gc.collect()
+        self.samples.append({
+            'seconds': time.perf_counter() - self.started,
+            'selections': self.selections,
+            'rss_bytes': resident_bytes(),
+            'objects': len(gc.get_objects()),
+            'widgets': len(QApplication.allWidgets())
+        })
+
+    def run_cycle(self, folder_paths):
+        """依次点击每个文件夹中的每个文件，每个文件夹结束时记录一次内存"""
+        for folder_path in folder_paths:
+            self.select_folder(folder_path)
+            for row in range(self.window.animation_list.count()):
+                self.select_file(row)
+            self.sample()
+
+
+def summarize(run, cycle_ends, thresholds):
+    """计算统计并与阈值比较，返回 (统计, 失败原因列表)"""
+    failures = []
+    metrics = {'selections': run.selections, 'load_failures': len(run.load_failures)}
+    if len(run.load_failures) > thresholds['max_load_failures']:
+        failures.append(f"{len(run.load_failures)} files failed to load: {run.load_failures[:5]}")
+
+    if run.latencies:
+        metrics['latency_median_ms'] = statistics.median(run.latencies)
+        metrics['latency_p95_ms'] = percentile(run.latencies, 0.95)
+        metrics['latency_max_ms'] = max(run.latencies)
+        if metrics['latency_p95_ms'] > thresholds['latency_p95_ms']:
+            failures.append(f"p95 selection latency {metrics['latency_p95_ms']:.1f} ms "
+                            f"exceeds {thresholds['latency_p95_ms']} ms")
+        if metrics['latency_max_ms'] > thresholds['latency_max_ms']:
+            failures.append(f"max selection latency {metrics['latency_max_ms']:.1f} ms "
+                            f"exceeds {thresholds['latency_max_ms']} ms")
+    if run.fps_ratios:
+        metrics['fps_ratio_median'] = statistics.median(run.fps_ratios)
+        if metrics['fps_ratio_median'] < thresholds['min_fps_ratio']:
+            failures.append(f"grid played at {metrics['fps_ratio_median']:.0%} of target fps "
+                            f"(minimum {thresholds['min_fps_ratio']:.0%})")
+    if run.preview_fps_ratios:
+        metrics['preview_fps_ratio_median'] = statistics.median(run.preview_fps_ratios)
+        if metrics['preview_fps_ratio_median'] < thresholds['min_preview_fps_ratio']:
+            failures.append(f"preview window played at {metrics['preview_fps_ratio_median']:.0%} "
+                            f"of target fps (minimum {thresholds['min_preview_fps_ratio']:.0%})")
+
+    if len(cycle_ends) >= 2:
+        first, last = cycle_ends[0], cycle_ends[-1]
+        metrics['rss_growth_mb'] = (last['rss_bytes'] - first['rss_bytes']) / (1024 * 1024)
+        metrics['object_growth'] = last['objects'] - first['objects']
+        metrics['widget_growth'] = last['widgets'] - first['widgets']
+        if metrics['rss_growth_mb'] > thresholds['max_rss_growth_mb']:
+            failures.append(f"RSS grew {metrics['rss_growth_mb']:.1f} MB after the first cycle "
+                            f"(limit {thresholds['max_rss_growth_mb']} MB)")
+        if metrics['object_growth'] > thresholds['max_object_growth']:
+            failures.append(f"{metrics['object_growth']} more Python objects after the first cycle "
+                            f"(limit {thresholds['max_object_growth']})")
+        if metrics['widget_growth'] > thresholds['max_widget_growth']:
+            failures.append(f"{metrics['widget_growth']} more widgets after the first cycle "
+                            f"(limit {thresholds['max_widget_growth']})")
+    return metrics, failures
+
+
+def print_metrics(metrics, cycle_ends):
+    print(f"selections: {metrics['selections']}, load failures: {metrics['load_failures']}")
+    if 'latency_median_ms' in metrics:
+        print(f"selection to first frame: median {metrics['latency_median_ms']:.1f} ms, "
+              f"p95 {metrics['latency_p95_ms']:.1f} ms, max {metrics['latency_max_ms']:.1f} ms")
+    if 'fps_ratio_median' in metrics:
+        print(f"grid fps: {metrics['fps_ratio_median']:.0%} of target (median)")
+    if 'preview_fps_ratio_median' in metrics:
+        print(f"preview fps: {metrics['preview_fps_ratio_median']:.0%} of target (median)")
+    for cycle, sample in enumerate(cycle_ends, 1):
+        print(f"cycle {cycle}: RSS {sample['rss_bytes'] / (1024 * 1024):.1f} MB, "
+              f"{sample['objects']} objects, {sample['widgets']} widgets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成图集库并长时间驱动主窗口，检查延迟、帧率和内存增长")
+    parser.add_argument('--library', help="图集库目录（默认在临时目录中生成，结束后保留以便下次复用）")
+    parser.add_argument('--folders', type=int, default=4, help="文件夹数")
+    parser.add_argument('--atlases', type=int, default=5, help="每个文件夹的图集数")
+    parser.add_argument('--groups', type=int, default=6, help="每个图集的动画序列数")
+    parser.add_argument('--frames', type=int, default=12, help="每个动画序列的帧数")
+    parser.add_argument('--frame-size', type=int, default=96, help="帧的原始尺寸（像素）")
+    parser.add_argument('--cycles', type=int, default=3, help="遍历整个图集库的轮数")
+    parser.add_argument('--play-seconds', type=float, default=0.5, help="每个文件播放的时长（秒）")
+    parser.add_argument('--preview-every', type=int, default=4,
+                        help="每选中多少个文件打开一次预览窗口，0为不打开")
+    parser.add_argument('--preview-seconds', type=float, default=0.5, help="预览窗口播放的时长（秒）")
+    parser.add_argument('--warm-folder', action='store_true', help="开启文件夹预加载")
+    parser.add_argument('--in-process', action='store_true', help="在主进程中加载图集（关闭独立进程加载）")
+    parser.add_argument('--thresholds', help="阈值JSON文件，覆盖默认阈值中的对应项")
+    parser.add_argument('--report', help="把统计和内存采样写入JSON文件")
+    args = parser.parse_args()
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds.update(json.load(f))
+    library = args.library or os.path.join(tempfile.gettempdir(), 'anipreview-soak')
+    print(f"generating library in {library} ...")
+    folder_paths = generate_library(library, args.folders, args.atlases, args.groups,
+                                    args.frames, args.frame_size)
+
+    # 使用单独的配置文件，不修改用户的配置
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    config_file = os.path.join(library, 'soak_config.json')
+    with open(config_file, 'w') as f:
+        json.dump({'last_position': library, 'warm_folder': args.warm_folder,
+                   'isolated_loading': not args.in_process}, f)
+    os.environ['ANIPREVIEW_CONFIG'] = config_file
+
+    from PyQt5.QtWidgets import QApplication
+    from ui.main_window import MainWindow
+    app = QApplication(sys.argv[:1])
+    window = MainWindow()
+    window.show()
+
+    run = SoakRun(app, window, args.play_seconds, args.preview_every, args.preview_seconds)
+    # 等待启动时延迟执行的任务（加载进程、名称索引）
+    run.wait(2500)
+    cycle_ends = []
+    for cycle in range(args.cycles):
+        run.run_cycle(folder_paths)
+        cycle_ends.append(run.samples[-1])
+        print(f"cycle {cycle + 1}/{args.cycles} done: {run.selections} selections, "
+              f"{run.samples[-1]['seconds']:.1f}s")
+    window.close()
+
+    metrics, failures = summarize(run, cycle_ends, thresholds)
+    print_metrics(metrics, cycle_ends)
+    if args.cycles < 2:
+        print("note: memory growth is only checked with at least 2 cycles")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'metrics': metrics, 'thresholds': thresholds, 'failures': failures,
+                       'latencies_ms': run.latencies, 'samples': run.samples,
+                       'load_failures': run.load_failures}, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("FAIL" if failures else "PASS")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
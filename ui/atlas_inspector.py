@@ -0,0 +1,339 @@
+import numpy as np
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel
+from PyQt5.QtCore import Qt, QRectF, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor, QPen, QBrush
+from core.spatial_index import GridIndex
+from ui.image_convert import pil_to_qimage
+
+# 缩放范围和每一级的倍数
+MIN_ZOOM = 0.02
+MAX_ZOOM = 16.0
+ZOOM_STEP = 1.25
+
+# 细节层次：屏幕上小于这个大小（像素）的矩形不绘制
+MIN_OVERLAY_PIXELS = 2
+# 一次最多绘制的矩形数，超出时只画最大的那些
+MAX_OVERLAYS = 20000
+# 矩形宽度超过这个大小（像素）且数量不多时才显示帧名
+LABEL_MIN_PIXELS = 80
+MAX_LABELS = 300
+
+# 鼠标移动超过这个距离（像素）视为拖动，松开时不算点击
+DRAG_THRESHOLD = 4
+
+
+def group_color(group_id):
+    """动画序列的颜色，不属于任何序列的帧为灰色"""
+    if group_id < 0:
+        return QColor(160, 160, 160)
+    return QColor.fromHsv((group_id * 137) % 360, 200, 240)
+
+
+class AtlasCanvas(QWidget):
+    """显示整张图集并叠加每一帧的矩形，可以缩放和拖动
+
+    可见的矩形通过网格索引查找，过小的矩形按细节层次剔除，
+    所以几千个矩形的图集也能流畅地缩放和悬停。
+    """
+
+    frame_hovered = pyqtSignal(int)
+    frame_clicked = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sheet_image = None
+        self.sheet_size = (1, 1)
+        self.rects = np.empty((0, 4), dtype=np.int32)
+        self.index = GridIndex(self.rects)
+        self.group_ids = np.empty(0, dtype=np.int32)
+        self.names = []
+        self.colors = {}
+
+        self.fit_mode = True
+        self.zoom = 1.0
+        # 画布中心对应的图集坐标
+        self.center = QPointF(0, 0)
+        self.hovered_row = -1
+        self.selected_row = -1
+        self.press_pos = None
+        self.drag_pos = None
+
+        self.setMinimumSize(300, 300)
+        self.setMouseTracking(True)
+
+    def set_atlas(self, frames_dict, sprite_sheet):
+        """设置显示的图集，frames_dict为FrameTable"""
+        self.sheet_image = pil_to_qimage(sprite_sheet) if sprite_sheet is not None else None
+        self.sheet_size = (sprite_sheet.width, sprite_sheet.height) if sprite_sheet is not None else (1, 1)
+        self.names = frames_dict.names
+        self.rects = frames_dict.sheet_rects()
+        self.index = GridIndex(self.rects)
+        _, self.group_ids = frames_dict.group_ids()
+        self.colors = {}
+        if self.hovered_row >= len(self.rects):
+            self.hovered_row = -1
+        if self.selected_row >= len(self.rects):
+            self.selected_row = -1
+        self.update()
+
+    def current_zoom(self):
+        if self.fit_mode:
+            return min(self.width() / self.sheet_size[0], self.height() / self.sheet_size[1])
+        return self.zoom
+
+    def current_center(self):
+        if self.fit_mode:
+            return QPointF(self.sheet_size[0] / 2, self.sheet_size[1] / 2)
+        return self.center
+
+    def set_zoom(self, zoom, anchor=None):
+        """设置缩放比例，anchor为保持不动的画布坐标"""
+        old_zoom = self.current_zoom()
+        center = self.current_center()
+        self.fit_mode = False
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        if anchor is not None:
+            delta = QPointF(anchor) - QPointF(self.width() / 2, self.height() / 2)
+            center = center + delta / old_zoom - delta / zoom
+        self.center = center
+        self.zoom = zoom
+        self.update()
+
+    def set_fit_mode(self):
+        """显示整张图集"""
+        self.fit_mode = True
+        self.update()
+
+    def view_to_sheet(self, pos):
+        """画布坐标转换为图集坐标"""
+        zoom = self.current_zoom()
+        center = self.current_center()
+        return QPointF((pos.x() - self.width() / 2) / zoom + center.x(),
+                       (pos.y() - self.height() / 2) / zoom + center.y())
+
+    def visible_region(self):
+        """画布可见的图集区域 (x0, y0, x1, y1)"""
+        zoom = self.current_zoom()
+        center = self.current_center()
+        half_w = self.width() / 2 / zoom
+        half_h = self.height() / 2 / zoom
+        return (center.x() - half_w, center.y() - half_h,
+                center.x() + half_w, center.y() + half_h)
+
+    def color_for(self, group_id):
+        color = self.colors.get(group_id)
+        if color is None:
+            color = self.colors[group_id] = group_color(group_id)
+        return color
+
+    def visible_overlays(self, region, zoom):
+        """需要绘制的矩形编号：与可见区域相交，并且在屏幕上足够大"""
+        x0, y0, x1, y1 = region
+        rows = self.index.query_rect(int(np.floor(x0)), int(np.floor(y0)),
+                                     int(np.ceil(x1)), int(np.ceil(y1)))
+        rects = self.rects[rows]
+        size = np.maximum(rects[:, 2] - rects[:, 0], rects[:, 3] - rects[:, 1]) * zoom
+        keep = size >= MIN_OVERLAY_PIXELS
+        rows, size = rows[keep], size[keep]
+        if len(rows) > MAX_OVERLAYS:
+            rows = rows[np.argsort(-size, kind='stable')[:MAX_OVERLAYS]]
+        return rows
+
+    def screen_rect(self, row, region, zoom):
+        x0, y0, x1, y1 = (int(v) for v in self.rects[row])
+        return QRectF((x0 - region[0]) * zoom, (y0 - region[1]) * zoom,
+                      (x1 - x0) * zoom, (y1 - y0) * zoom)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(64, 64, 64))
+        if self.sheet_image is None:
+            painter.end()
+            return
+
+        zoom = self.current_zoom()
+        region = self.visible_region()
+
+        # 只绘制图集的可见部分
+        sx0, sy0 = max(0.0, region[0]), max(0.0, region[1])
+        sx1, sy1 = min(float(self.sheet_size[0]), region[2]), min(float(self.sheet_size[1]), region[3])
+        if sx1 > sx0 and sy1 > sy0:
+            painter.setRenderHint(QPainter.SmoothPixmapTransform, zoom < 1)
+            source = QRectF(sx0, sy0, sx1 - sx0, sy1 - sy0)
+            target = QRectF((sx0 - region[0]) * zoom, (sy0 - region[1]) * zoom,
+                            (sx1 - sx0) * zoom, (sy1 - sy0) * zoom)
+            painter.drawImage(target, self.sheet_image, source)
+        painter.setPen(QPen(QColor(200, 200, 200), 1, Qt.DashLine))
+        painter.drawRect(QRectF(-region[0] * zoom, -region[1] * zoom,
+                                self.sheet_size[0] * zoom, self.sheet_size[1] * zoom))
+
+        # 帧矩形，按动画序列分组批量绘制
+        rows = self.visible_overlays(region, zoom)
+        rects = self.rects[rows]
+        left = (rects[:, 0] - region[0]) * zoom
+        top = (rects[:, 1] - region[1]) * zoom
+        width = (rects[:, 2] - rects[:, 0]) * zoom
+        height = (rects[:, 3] - rects[:, 1]) * zoom
+        group_ids = self.group_ids[rows]
+        painter.setBrush(Qt.NoBrush)
+        for group_id in np.unique(group_ids):
+            mask = group_ids == group_id
+            painter.setPen(QPen(self.color_for(int(group_id)), 1))
+            painter.drawRects([QRectF(*values) for values in
+                               zip(left[mask].tolist(), top[mask].tolist(),
+                                   width[mask].tolist(), height[mask].tolist())])
+
+        # 放大到足够大时显示帧名
+        labeled = np.nonzero(width >= LABEL_MIN_PIXELS)[0]
+        if len(labeled) <= MAX_LABELS:
+            for i in labeled.tolist():
+                painter.setPen(self.color_for(int(group_ids[i])))
+                painter.drawText(QRectF(left[i] + 3, top[i] + 2, width[i] - 6, height[i] - 4),
+                                 Qt.AlignLeft | Qt.AlignTop, self.names[int(rows[i])])
+
+        # 选中和悬停的帧
+        for row, alpha in [(self.selected_row, 90), (self.hovered_row, 60)]:
+            if row < 0:
+                continue
+            color = self.color_for(int(self.group_ids[row]))
+            fill = QColor(color)
+            fill.setAlpha(alpha)
+            painter.setPen(QPen(color, 2))
+            painter.setBrush(QBrush(fill))
+            painter.drawRect(self.screen_rect(row, region, zoom))
+        painter.end()
+
+    def wheelEvent(self, event):
+        """滚轮以鼠标位置为中心缩放"""
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self.current_zoom() * ZOOM_STEP ** steps, event.pos())
+        event.accept()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.press_pos = event.pos()
+            self.drag_pos = event.pos()
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_pos is not None and (event.buttons() & Qt.LeftButton):
+            # 拖动平移
+            if (event.pos() - self.press_pos).manhattanLength() >= DRAG_THRESHOLD:
+                self.setCursor(Qt.ClosedHandCursor)
+                zoom = self.current_zoom()
+                center = self.current_center()
+                self.fit_mode = False
+                self.zoom = zoom
+                self.center = center - QPointF(event.pos() - self.drag_pos) / zoom
+                self.drag_pos = event.pos()
+                self.update()
+        else:
+            # 悬停识别鼠标下的帧
+            point = self.view_to_sheet(event.pos())
+            row = self.index.hit_test(int(np.floor(point.x())), int(np.floor(point.y())))
+            row = -1 if row is None else row
+            if row != self.hovered_row:
+                self.hovered_row = row
+                self.frame_hovered.emit(row)
+                self.update()
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton and self.press_pos is not None:
+            if (event.pos() - self.press_pos).manhattanLength() < DRAG_THRESHOLD:
+                point = self.view_to_sheet(event.pos())
+                row = self.index.hit_test(int(np.floor(point.x())), int(np.floor(point.y())))
+                if row is not None:
+                    self.selected_row = row
+                    self.frame_clicked.emit(row)
+                    self.update()
+            self.press_pos = None
+            self.drag_pos = None
+            self.unsetCursor()
+        super().mouseReleaseEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        """双击显示整张图集"""
+        self.set_fit_mode()
+
+    def leaveEvent(self, event):
+        if self.hovered_row >= 0:
+            self.hovered_row = -1
+            self.frame_hovered.emit(-1)
+            self.update()
+        super().leaveEvent(event)
+
+
+class AtlasInspector(QMainWindow):
+    """图集检查窗口：显示整张贴图和所有帧的位置，点击帧跳转到预览网格"""
+
+    # 动画序列名，帧在序列中的位置
+    frame_activated = pyqtSignal(str, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.frames_dict = None
+        self.group_names = []
+        self.setup_ui()
+
+    def setup_ui(self):
+        """设置窗口UI"""
+        self.resize(900, 700)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(10, 10, 10, 10)
+
+        self.canvas = AtlasCanvas()
+        self.canvas.frame_hovered.connect(self.on_frame_hovered)
+        self.canvas.frame_clicked.connect(self.on_frame_clicked)
+        layout.addWidget(self.canvas, stretch=1)
+
+        # 鼠标下的帧的信息
+        self.info_label = QLabel()
+        self.info_label.setStyleSheet("color: #666666;")
+        layout.addWidget(self.info_label)
+
+        hint_label = QLabel("滚轮缩放，拖动平移，双击显示整张图集，点击帧跳转到预览网格")
+        hint_label.setStyleSheet("color: #999999;")
+        layout.addWidget(hint_label)
+
+    def set_atlas(self, title, frames_dict, sprite_sheet):
+        """显示一个图集"""
+        self.setWindowTitle(f"图集 - {title}")
+        self.frames_dict = frames_dict
+        self.group_names, _ = frames_dict.group_ids()
+        self.canvas.set_atlas(frames_dict, sprite_sheet)
+        self.info_label.setText(f"贴图: {sprite_sheet.width}x{sprite_sheet.height} | "
+                                f"帧数: {len(frames_dict)} | 动画序列: {len(self.group_names)}")
+
+    def frame_position(self, row):
+        """帧所属的动画序列和在序列中的位置，不属于任何序列时返回 (None, -1)"""
+        group_id = int(self.canvas.group_ids[row])
+        if group_id < 0:
+            return None, -1
+        group_name = self.group_names[group_id]
+        positions = np.nonzero(self.frames_dict.groups[group_name] == row)[0]
+        return group_name, int(positions[0])
+
+    def describe_frame(self, row):
+        x0, y0, x1, y1 = (int(v) for v in self.canvas.rects[row])
+        group_name, position = self.frame_position(row)
+        text = f"{self.frames_dict.names[row]} | 位置: ({x0}, {y0}) 大小: {x1 - x0}x{y1 - y0}"
+        if self.frames_dict.records['rotated'][row]:
+            text += " (旋转)"
+        if group_name is not None:
+            text += f" | 动画: {group_name} 第{position + 1}帧"
+        return text
+
+    def on_frame_hovered(self, row):
+        if row >= 0:
+            self.info_label.setText(self.describe_frame(row))
+
+    def on_frame_clicked(self, row):
+        self.info_label.setText(self.describe_frame(row))
+        group_name, position = self.frame_position(row)
+        if group_name is not None:
+            self.frame_activated.emit(group_name, position)
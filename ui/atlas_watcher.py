@@ -0,0 +1,79 @@
+import os
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+from core.atlas import texture_path_for
+
+# 美术导出时会连续写入多次，等文件稳定后再处理
+DEBOUNCE_INTERVAL = 300
+
+
+class AtlasWatcher(QObject):
+    """监视当前打开的plist/png文件以及所在的文件夹"""
+
+    atlas_changed = pyqtSignal(str)
+    folder_changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.plist_path = None
+        self.folder_path = None
+
+        self.atlas_timer = QTimer(self)
+        self.atlas_timer.setSingleShot(True)
+        self.atlas_timer.setInterval(DEBOUNCE_INTERVAL)
+        self.atlas_timer.timeout.connect(self.emit_atlas_changed)
+
+        self.folder_timer = QTimer(self)
+        self.folder_timer.setSingleShot(True)
+        self.folder_timer.setInterval(DEBOUNCE_INTERVAL)
+        self.folder_timer.timeout.connect(self.emit_folder_changed)
+
+    def atlas_paths(self):
+        """当前图集对应的文件路径"""
+        if not self.plist_path:
+            return []
+        return [self.plist_path, texture_path_for(self.plist_path)]
+
+    def watch_folder(self, folder_path):
+        """监视文件夹中动画文件的增删"""
+        if self.folder_path:
+            self.watcher.removePath(self.folder_path)
+        self.folder_path = folder_path
+        if folder_path and os.path.isdir(folder_path):
+            self.watcher.addPath(folder_path)
+
+    def watch_atlas(self, plist_path):
+        """监视当前打开的图集"""
+        paths = self.atlas_paths()
+        if paths:
+            self.watcher.removePaths([p for p in paths if p in self.watcher.files()])
+        self.plist_path = plist_path
+        self.rewatch_atlas()
+
+    def rewatch_atlas(self):
+        """重新添加监视（导出工具先删除再写入时，监视会丢失）"""
+        for path in self.atlas_paths():
+            if os.path.exists(path) and path not in self.watcher.files():
+                self.watcher.addPath(path)
+
+    def on_file_changed(self, path):
+        if path in self.atlas_paths():
+            self.atlas_timer.start()
+
+    def on_directory_changed(self, path):
+        if path == self.folder_path:
+            self.folder_timer.start()
+            # 文件被替换时也会触发目录变化
+            if self.plist_path and os.path.dirname(self.plist_path) == path:
+                self.atlas_timer.start()
+
+    def emit_atlas_changed(self):
+        self.rewatch_atlas()
+        if self.plist_path:
+            self.atlas_changed.emit(self.plist_path)
+
+    def emit_folder_changed(self):
+        if self.folder_path:
+            self.folder_changed.emit(self.folder_path)
@@ -0,0 +1,263 @@
+import os
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
+                             QListWidgetItem, QComboBox, QPushButton, QSpinBox, QSplitter, QSizePolicy)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QColor
+from core.atlas import group_name_for
+from core.atlas_diff import (frame_canvas, sheet_array, heatmap_image, STATUSES, STATUS_CHANGED,
+                             STATUS_ADDED, STATUS_REMOVED, STATUS_MOVED, STATUS_UNCHANGED)
+from ui.image_convert import pil_to_pixmap
+
+STATUS_LABELS = {
+    STATUS_CHANGED: "有变化",
+    STATUS_ADDED: "新增",
+    STATUS_REMOVED: "删除",
+    STATUS_MOVED: "位置变化",
+    STATUS_UNCHANGED: "无变化"
+}
+STATUS_COLORS = {
+    STATUS_CHANGED: QColor(217, 83, 79),
+    STATUS_ADDED: QColor(92, 184, 92),
+    STATUS_REMOVED: QColor(150, 150, 150),
+    STATUS_MOVED: QColor(66, 139, 202),
+    STATUS_UNCHANGED: QColor(0, 0, 0)
+}
+# 默认只列出这些状态的帧
+DIFFERENT_STATUSES = (STATUS_CHANGED, STATUS_ADDED, STATUS_REMOVED)
+
+
+class DiffPane(QLabel):
+    """显示一帧的画布，保持比例缩放到控件大小，没有这一帧时显示提示文字"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image = None
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(160, 160)
+        # 大小只由布局决定，否则缩放到控件大小的图像会反过来撑大控件
+        self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.setStyleSheet("background-color: #2b2b2b; color: #aaaaaa;")
+
+    def set_image(self, image, text=""):
+        self.image = image
+        if image is None:
+            self.clear()
+            self.setText(text)
+        else:
+            self.refresh()
+
+    def refresh(self):
+        if self.image is None:
+            return
+        size = self.contentsRect().size()
+        # 放大时不插值，便于看清变化的像素
+        smooth = size.width() < self.image.width or size.height() < self.image.height
+        pixmap = pil_to_pixmap(self.image, size, smooth=smooth)
+        if pixmap is not None:
+            self.setPixmap(pixmap)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
+
+
+class DiffWindow(QMainWindow):
+    """对比图集两个版本的窗口
+
+    左侧列出帧和比较结果，右侧并排显示旧版本、新版本和差异热力图。
+    播放时两边同步播放所选帧所在的动画序列，某一边没有的帧显示为空。
+    """
+
+    def __init__(self, result, old_atlas, new_atlas, fps=12, tolerance=0, parent=None):
+        """result为 diff_frames 的结果，old_atlas/new_atlas 为 (帧数据, 贴图)"""
+        super().__init__(parent)
+        self.result = result
+        self.tolerance = tolerance
+        self.old_frames, old_sheet = old_atlas
+        self.new_frames, new_sheet = new_atlas
+        self.old_sheet = sheet_array(old_sheet)
+        self.new_sheet = sheet_array(new_sheet)
+        self.frame_results = {frame['name']: frame for frame in result['frames']}
+        # 正在显示的动画序列（帧名列表）和其中的位置
+        self.sequence = []
+        self.sequence_index = 0
+        self.play_timer = QTimer(self)
+        self.play_timer.timeout.connect(self.next_frame)
+        self.setup_ui(fps)
+        self.show_frames()
+
+    def setup_ui(self, fps):
+        """设置窗口UI"""
+        old_name = os.path.basename(self.result.get('old_path') or "")
+        new_name = os.path.basename(self.result.get('new_path') or "")
+        self.setWindowTitle(f"对比 - {old_name} → {new_name}")
+        self.resize(1100, 620)
+
+        splitter = QSplitter(Qt.Horizontal)
+        self.setCentralWidget(splitter)
+
+        # 左侧：统计、过滤和帧列表
+        left_panel = QWidget()
+        left_layout = QVBoxLayout(left_panel)
+        left_layout.setContentsMargins(10, 10, 5, 10)
+        counts = self.result['counts']
+        summary = "  ".join(f"{STATUS_LABELS[status]} {counts[status]}" for status in STATUSES)
+        self.summary_label = QLabel(summary)
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setToolTip(f"旧版本: {self.result.get('old_path')}\n"
+                                      f"新版本: {self.result.get('new_path')}\n"
+                                      f"比较耗时: {self.result['seconds'] * 1000:.0f} ms")
+        self.filter_combo = QComboBox()
+        self.filter_combo.addItem("有差异的帧", DIFFERENT_STATUSES)
+        self.filter_combo.addItem("全部帧", STATUSES)
+        for status in STATUSES:
+            self.filter_combo.addItem(STATUS_LABELS[status], (status,))
+        self.frame_list = QListWidget()
+        self.frame_list.setStyleSheet("border: 1px solid #cccccc;")
+        left_layout.addWidget(self.summary_label)
+        left_layout.addWidget(self.filter_combo)
+        left_layout.addWidget(self.frame_list, stretch=1)
+        splitter.addWidget(left_panel)
+
+        # 右侧：三个画面和播放控制
+        right_panel = QWidget()
+        right_layout = QVBoxLayout(right_panel)
+        right_layout.setContentsMargins(5, 10, 10, 10)
+        panes_layout = QHBoxLayout()
+        self.old_pane = DiffPane()
+        self.new_pane = DiffPane()
+        self.heatmap_pane = DiffPane()
+        for title, pane in (("旧版本", self.old_pane), ("新版本", self.new_pane),
+                            ("差异", self.heatmap_pane)):
+            column = QVBoxLayout()
+            column.addWidget(QLabel(title))
+            column.addWidget(pane, stretch=1)
+            panes_layout.addLayout(column)
+        self.frame_label = QLabel()
+        self.frame_label.setStyleSheet("color: #666666;")
+
+        control_layout = QHBoxLayout()
+        self.play_button = QPushButton("播放")
+        self.play_button.setToolTip("两边同步播放所选帧所在的动画序列")
+        self.fps_spinbox = QSpinBox()
+        self.fps_spinbox.setRange(1, 60)
+        self.fps_spinbox.setValue(fps)
+        control_layout.addWidget(self.play_button)
+        control_layout.addWidget(QLabel("帧率:"))
+        control_layout.addWidget(self.fps_spinbox)
+        control_layout.addStretch()
+
+        right_layout.addLayout(panes_layout, stretch=1)
+        right_layout.addWidget(self.frame_label)
+        right_layout.addLayout(control_layout)
+        splitter.addWidget(right_panel)
+        splitter.setSizes([300, 800])
+
+        self.filter_combo.currentIndexChanged.connect(self.show_frames)
+        self.frame_list.currentItemChanged.connect(self.on_frame_selected)
+        self.play_button.clicked.connect(self.toggle_play)
+        self.fps_spinbox.valueChanged.connect(self.update_fps)
+
+    def show_frames(self, *args):
+        """按过滤条件列出帧，保留当前选中的帧"""
+        statuses = self.filter_combo.currentData()
+        current = self.frame_list.currentItem()
+        current_name = current.data(Qt.UserRole) if current is not None else None
+        self.frame_list.blockSignals(True)
+        self.frame_list.clear()
+        selected_row = 0
+        for frame in self.result['frames']:
+            if frame['status'] not in statuses:
+                continue
+            text = f"{frame['name']}  [{STATUS_LABELS[frame['status']]}]"
+            if frame['status'] == STATUS_CHANGED:
+                text += f"  {frame['changed_ratio']:.1%}"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, frame['name'])
+            item.setForeground(STATUS_COLORS[frame['status']])
+            if frame['name'] == current_name:
+                selected_row = self.frame_list.count()
+            self.frame_list.addItem(item)
+        self.frame_list.blockSignals(False)
+        if self.frame_list.count() == 0:
+            item = QListWidgetItem("没有符合条件的帧")
+            item.setFlags(Qt.NoItemFlags)
+            self.frame_list.addItem(item)
+            return
+        self.frame_list.setCurrentRow(selected_row)
+
+    def on_frame_selected(self, item, previous=None):
+        name = item.data(Qt.UserRole) if item is not None else None
+        if name is None:
+            return
+        self.sequence = self.sequence_for(name)
+        self.sequence_index = self.sequence.index(name)
+        self.show_frame(name)
+
+    def sequence_for(self, name):
+        """帧所在的动画序列：两个版本中这个序列的帧合在一起，按帧序号排序"""
+        group_name = group_name_for(name)
+        names = set()
+        for frames_dict in (self.new_frames, self.old_frames):
+            if group_name in frames_dict.groups:
+                names.update(frames_dict.group_names(group_name))
+        if name not in names:
+            return [name]
+        return sorted(names, key=lambda x: int(x.split('_')[-1].split('.')[0]))
+
+    def show_frame(self, name):
+        """在三个画面中显示一帧（两边使用相同大小的画布，位置一一对应）"""
+        frame = self.frame_results.get(name)
+        if frame is None:
+            return
+        canvas_size = frame['canvas_size']
+        old_canvas = new_canvas = None
+        if name in self.old_frames:
+            old_canvas = frame_canvas(self.old_frames[name], self.old_sheet, canvas_size)
+        if name in self.new_frames:
+            new_canvas = frame_canvas(self.new_frames[name], self.new_sheet, canvas_size)
+        from PIL import Image
+        self.old_pane.set_image(Image.fromarray(old_canvas, 'RGBA') if old_canvas is not None else None,
+                                "旧版本中没有这一帧")
+        self.new_pane.set_image(Image.fromarray(new_canvas, 'RGBA') if new_canvas is not None else None,
+                                "新版本中没有这一帧")
+
+        difference = self.result['heatmaps'].get(name)
+        if difference is not None:
+            self.heatmap_pane.set_image(heatmap_image(difference, new_canvas, self.tolerance))
+        elif frame['status'] == STATUS_MOVED:
+            self.heatmap_pane.set_image(None, "像素相同\n在贴图中的位置不同")
+        elif frame['status'] == STATUS_UNCHANGED:
+            self.heatmap_pane.set_image(None, "没有变化")
+        else:
+            self.heatmap_pane.set_image(None, "")
+
+        text = f"{name}  {STATUS_LABELS[frame['status']]}"
+        if frame['status'] == STATUS_CHANGED:
+            text += (f"  {frame['changed_pixels']} 像素 ({frame['changed_ratio']:.1%})"
+                     f"  最大差值 {frame['max_diff']}  范围 {frame['bounds']}")
+        if len(self.sequence) > 1:
+            text += f"  —  {self.sequence_index + 1}/{len(self.sequence)}"
+        self.frame_label.setText(text)
+
+    def toggle_play(self):
+        if self.play_timer.isActive():
+            self.play_timer.stop()
+            self.play_button.setText("播放")
+        elif self.sequence:
+            self.play_timer.start(1000 // self.fps_spinbox.value())
+            self.play_button.setText("暂停")
+
+    def update_fps(self, fps):
+        if self.play_timer.isActive():
+            self.play_timer.start(1000 // fps)
+
+    def next_frame(self):
+        if not self.sequence:
+            return
+        self.sequence_index = (self.sequence_index + 1) % len(self.sequence)
+        self.show_frame(self.sequence[self.sequence_index])
+
+    def closeEvent(self, event):
+        self.play_timer.stop()
+        super().closeEvent(event)
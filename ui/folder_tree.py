@@ -0,0 +1,219 @@
+from PyQt5.QtWidgets import QTreeView, QFileSystemModel
+from PyQt5.QtCore import QDir, QModelIndex, QSortFilterProxyModel, QTimer, pyqtSignal
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+# 只显示含动画文件夹模式下，向下查找动画文件的层数
+ANIMATION_FOLDER_SCAN_DEPTH = 2
+# 扫描结果到达后重新过滤前等待的时间（毫秒），一次展开的很多结果合并成一次过滤
+REFILTER_DELAY_MS = 100
+
+
+class AnimationFolderProxy(QSortFilterProxyModel):
+    """只显示包含动画文件（或子文件夹中包含）的文件夹
+
+    文件夹在后台线程中扫描，结果按路径缓存；还没有扫描结果的文件夹先显示出来，
+    结果到达后再重新过滤，展开大文件夹或网络盘时界面不会卡住。
+    """
+    
+    # 扫描完成（路径, 是否包含动画文件），从扫描线程发出
+    scan_finished = pyqtSignal(str, bool)
+    
+    def __init__(self, file_manager, parent=None):
+        super().__init__(parent)
+        self.file_manager = file_manager
+        self.keep_paths = set()
+        self.scan_results = {}
+        self.pending_scans = set()
+        self.executor = None
+        self.refilter_timer = QTimer(self)
+        self.refilter_timer.setSingleShot(True)
+        self.refilter_timer.setInterval(REFILTER_DELAY_MS)
+        self.refilter_timer.timeout.connect(self.invalidateFilter)
+        self.scan_finished.connect(self.on_scan_finished)
+    
+    def set_keep_path(self, *paths):
+        """始终显示指定路径及其所有上级目录"""
+        self.keep_paths = set()
+        for path in paths:
+            while path:
+                self.keep_paths.add(os.path.normpath(path))
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+        self.invalidateFilter()
+    
+    def clear_results(self):
+        """丢弃缓存的扫描结果（重新打开过滤时文件夹内容可能已经变化）"""
+        self.scan_results = {}
+    
+    def filterAcceptsRow(self, source_row, source_parent):
+        source_model = self.sourceModel()
+        index = source_model.index(source_row, 0, source_parent)
+        path = os.path.normpath(source_model.filePath(index))
+        if path in self.keep_paths:
+            return True
+        result = self.scan_results.get(path)
+        if result is None:
+            self.request_scan(path)
+            return True
+        return result
+    
+    def request_scan(self, path):
+        if path in self.pending_scans:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='folder-scan')
+        self.pending_scans.add(path)
+        self.executor.submit(self.scan_folder, path)
+    
+    def scan_folder(self, path):
+        try:
+            result = self.file_manager.folder_has_animations(path, ANIMATION_FOLDER_SCAN_DEPTH)
+        except Exception as e:
+            print(f"Error scanning folder: {str(e)}")
+            result = True
+        # 窗口关闭后不再发出信号
+        if self.executor is not None:
+            self.scan_finished.emit(path, result)
+    
+    def on_scan_finished(self, path, result):
+        self.pending_scans.discard(path)
+        self.scan_results[path] = result
+        if not result:
+            # 之前先显示出来的文件夹需要隐藏
+            self.refilter_timer.start()
+    
+    def shutdown(self):
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FolderTree:
+    """左侧的文件夹树，文件扫描和配置由FileManager负责"""
+    
+    def __init__(self, file_manager):
+        self.file_manager = file_manager
+        # 文件系统模型在创建文件夹树时才创建
+        self.folder_model = None
+        self.folder_proxy = None
+        self.tree = None
+        # 文件夹树显示的根目录，可以用 go_up 切换到上级
+        self.root_path = None
+    
+    def setup_model(self):
+        """设置文件系统模型
+        
+        不在这里调用setRootPath，否则Qt的后台线程会从根目录开始
+        读取和监视整个文件系统，挂载了大型网络盘时启动很慢。
+        """
+        self.folder_model = QFileSystemModel()
+        self.folder_model.setFilter(QDir.AllDirs | QDir.NoDotAndDotDot | QDir.Drives)
+        
+    def create_folder_tree(self):
+        """创建文件夹树视图"""
+        self.setup_model()
+        self.tree = QTreeView()
+        self.tree.setModel(self.folder_model)
+        
+        # 设置列宽和显示
+        self.tree.setColumnWidth(0, 300)
+        self.tree.setMinimumWidth(350)
+        
+        # 恢复上次的位置，只从这个位置开始加载，其他文件夹在展开时才读取
+        start_path = self.file_manager.load_last_position()
+        if not start_path or not os.path.isdir(start_path):
+            start_path = QDir.homePath()
+        self.root_path = os.path.normpath(start_path)
+        self.folder_model.setRootPath(self.root_path)
+        self.set_only_animation_folders(self.file_manager.load_config().get('only_animation_folders', False),
+                                        start_path)
+        
+        # 等首次绘制之后再定位到上次的位置
+        QTimer.singleShot(0, lambda: self.reveal_path(start_path))
+        
+        return self.tree
+    
+    def set_only_animation_folders(self, enabled, current_path=None):
+        """切换是否只显示包含动画文件的文件夹"""
+        if enabled:
+            if self.folder_proxy is None:
+                self.folder_proxy = AnimationFolderProxy(self.file_manager)
+                self.folder_proxy.setSourceModel(self.folder_model)
+            self.folder_proxy.clear_results()
+            self.folder_proxy.set_keep_path(current_path, self.root_path)
+            model = self.folder_proxy
+        else:
+            model = self.folder_model
+        
+        if self.tree.model() is not model:
+            # 旧模型的根索引不能带到新模型
+            self.tree.setRootIndex(QModelIndex())
+            self.tree.setModel(model)
+        self.tree.setRootIndex(self.map_from_source(self.folder_model.index(self.root_path)))
+        
+        # 只显示文件夹名称列
+        self.tree.setColumnHidden(1, True)
+        self.tree.setColumnHidden(2, True)
+        self.tree.setColumnHidden(3, True)
+        
+        if current_path:
+            self.reveal_path(current_path)
+    
+    def set_root(self, path, current_path=None):
+        """把文件夹树的根目录切换到path，只读取和监视这个目录以下的文件夹"""
+        self.root_path = os.path.normpath(path)
+        if self.folder_proxy is not None:
+            # 根目录和当前位置不能被过滤掉
+            self.folder_proxy.set_keep_path(current_path, self.root_path)
+        self.folder_model.setRootPath(self.root_path)
+        self.tree.setRootIndex(self.map_from_source(self.folder_model.index(self.root_path)))
+    
+    def go_up(self):
+        """显示上一级文件夹，保持当前选中的文件夹"""
+        parent = os.path.dirname(self.root_path)
+        if parent == self.root_path:
+            return
+        current_path = self.file_path(self.tree.currentIndex())
+        self.set_root(parent, current_path)
+        self.reveal_path(current_path)
+    
+    def is_under_root(self, path):
+        path = os.path.normpath(path)
+        return path == self.root_path or path.startswith(self.root_path.rstrip(os.sep) + os.sep)
+    
+    def map_from_source(self, index):
+        """把文件系统模型的索引转换为树视图当前使用的模型的索引"""
+        if self.tree is not None and self.tree.model() is self.folder_proxy:
+            return self.folder_proxy.mapFromSource(index)
+        return index
+    
+    def file_path(self, index):
+        """获取树视图索引对应的路径"""
+        if self.tree is not None and self.tree.model() is self.folder_proxy:
+            index = self.folder_proxy.mapToSource(index)
+        return self.folder_model.filePath(index)
+    
+    def reveal_path(self, path):
+        """选中并展开到指定路径"""
+        if not path or not os.path.exists(path):
+            return
+        if not self.is_under_root(path):
+            # 在根目录之外时切换到它的上级目录
+            self.set_root(os.path.dirname(os.path.normpath(path)) or path, path)
+        index = self.map_from_source(self.folder_model.index(path))
+        if not index.isValid():
+            return
+        self.tree.setCurrentIndex(index)
+        # 展开到当前位置的路径
+        parent = index.parent()
+        while parent.isValid():
+            self.tree.expand(parent)
+            parent = parent.parent()
+        self.tree.scrollTo(index)
+    
+    def shutdown(self):
+        if self.folder_proxy is not None:
+            self.folder_proxy.shutdown()
@@ -0,0 +1,192 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QRectF, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor, QPen
+from ui.image_convert import pil_to_qimage
+
+# 缩放范围和每一级的倍数
+MIN_ZOOM = 0.05
+MAX_ZOOM = 32.0
+ZOOM_STEP = 1.25
+
+
+class FrameCanvas(QWidget):
+    """可以缩放和拖动的单帧画布
+
+    适应窗口模式下直接绘制预览窗口缓存的帧；缩放后每次只合成当前可见的区域，
+    从图集的子区域直接缩放到画布大小（ImageProcessor.process_region），
+    所以放大查看大尺寸的帧时，播放的开销和适应窗口时差不多。
+    """
+
+    fit_mode_changed = pyqtSignal(bool)
+    zoom_changed = pyqtSignal(float)
+    resized = pyqtSignal()
+
+    def __init__(self, image_processor, parent=None):
+        super().__init__(parent)
+        self.image_processor = image_processor
+        self.frame_index = None
+        self.frame_data = None
+        self.sprite_sheet = None
+        self.fit_pixmap = None
+
+        self.fit_mode = True
+        self.zoom = 1.0
+        # 画布中心对应的帧坐标
+        self.center = QPointF(0, 0)
+
+        # 最近一次合成的可见区域，帧和视图都没变时直接重用
+        self.region_image = None
+        self.region_key = None
+        self.drag_pos = None
+
+        self.setMinimumSize(200, 200)
+        self.setFocusPolicy(Qt.ClickFocus)
+
+    def set_frame(self, frame_index, frame_data, sprite_sheet, fit_pixmap=None):
+        """设置当前显示的帧，fit_pixmap为适应窗口模式下显示的缓存帧"""
+        self.frame_index = frame_index
+        self.frame_data = frame_data
+        self.sprite_sheet = sprite_sheet
+        self.fit_pixmap = fit_pixmap
+        self.update()
+
+    def source_size(self):
+        """当前帧的原始尺寸"""
+        if self.frame_data is None:
+            return (1, 1)
+        w, h = (int(v) for v in self.frame_data['source_size'])
+        return (max(w, 1), max(h, 1))
+
+    def fit_zoom(self):
+        """适应窗口时的缩放比例"""
+        w, h = self.source_size()
+        return min(self.width() / w, self.height() / h)
+
+    def current_zoom(self):
+        return self.fit_zoom() if self.fit_mode else self.zoom
+
+    def set_fit_mode(self, enabled=True):
+        """切换到适应窗口模式"""
+        if self.fit_mode == enabled:
+            return
+        self.fit_mode = enabled
+        if not enabled:
+            # 从适应窗口的位置开始缩放
+            self.zoom = self.fit_zoom()
+            w, h = self.source_size()
+            self.center = QPointF(w / 2, h / 2)
+        self.fit_mode_changed.emit(enabled)
+        self.zoom_changed.emit(self.current_zoom())
+        self.update()
+
+    def set_zoom(self, zoom, anchor=None):
+        """设置缩放比例，anchor为保持不动的画布坐标（默认为画布中心）"""
+        self.set_fit_mode(False)
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        if anchor is not None:
+            # 保持鼠标下的帧坐标不变
+            view_center = QPointF(self.width() / 2, self.height() / 2)
+            delta = QPointF(anchor) - view_center
+            point = self.center + delta / self.zoom
+            self.center = point - delta / zoom
+        self.zoom = zoom
+        self.zoom_changed.emit(zoom)
+        self.update()
+
+    def zoom_by(self, steps, anchor=None):
+        """按级缩放，steps为正时放大"""
+        self.set_zoom(self.current_zoom() * ZOOM_STEP ** steps, anchor)
+
+    def visible_region(self):
+        """画布可见的帧坐标区域 (x0, y0, x1, y1)"""
+        half_w = self.width() / 2 / self.zoom
+        half_h = self.height() / 2 / self.zoom
+        return (self.center.x() - half_w, self.center.y() - half_h,
+                self.center.x() + half_w, self.center.y() + half_h)
+
+    def render_region(self):
+        """合成当前可见区域"""
+        region = self.visible_region()
+        key = (self.frame_index, id(self.sprite_sheet), region, self.width(), self.height())
+        if key == self.region_key:
+            return self.region_image
+        frame_image = self.image_processor.process_region(
+            self.frame_data, self.sprite_sheet, region, (self.width(), self.height()), self.zoom)
+        self.region_image = pil_to_qimage(frame_image) if frame_image is not None else None
+        self.region_key = key
+        return self.region_image
+
+    def frame_rect(self):
+        """帧的范围在画布中的位置"""
+        w, h = self.source_size()
+        if self.fit_mode:
+            zoom = self.fit_zoom()
+            return QRectF((self.width() - w * zoom) / 2, (self.height() - h * zoom) / 2,
+                          w * zoom, h * zoom)
+        x0, y0, _, _ = self.visible_region()
+        return QRectF(-x0 * self.zoom, -y0 * self.zoom, w * self.zoom, h * self.zoom)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(240, 240, 240))
+
+        if self.frame_data is not None:
+            if self.fit_mode:
+                if self.fit_pixmap is not None and not self.fit_pixmap.isNull():
+                    x = (self.width() - self.fit_pixmap.width()) // 2
+                    y = (self.height() - self.fit_pixmap.height()) // 2
+                    painter.drawPixmap(x, y, self.fit_pixmap)
+            else:
+                q_image = self.render_region()
+                if q_image is not None:
+                    painter.drawImage(0, 0, q_image)
+                # 缩放后标出帧的边界
+                painter.setPen(QPen(QColor(120, 120, 120), 1, Qt.DashLine))
+                painter.drawRect(self.frame_rect())
+
+        # 边框
+        painter.setPen(QPen(QColor(204, 204, 204), 1))
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+        painter.end()
+
+    def wheelEvent(self, event):
+        """滚轮以鼠标位置为中心缩放"""
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.zoom_by(steps, event.pos())
+        event.accept()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_pos = event.pos()
+            self.setCursor(Qt.ClosedHandCursor)
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        """拖动平移"""
+        if self.drag_pos is not None:
+            self.set_fit_mode(False)
+            delta = event.pos() - self.drag_pos
+            self.drag_pos = event.pos()
+            self.center -= QPointF(delta) / self.zoom
+            self.update()
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_pos = None
+            self.unsetCursor()
+        super().mouseReleaseEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        """双击在适应窗口和1:1之间切换"""
+        if self.fit_mode:
+            self.set_zoom(1.0, event.pos())
+        else:
+            self.set_fit_mode(True)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resized.emit()
+        if self.fit_mode:
+            self.zoom_changed.emit(self.current_zoom())
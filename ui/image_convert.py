@@ -0,0 +1,111 @@
+import sys
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtCore import Qt
+from core.image_processor import ImageProcessor
+from core.perf_stats import perf_stats
+from core.tracing import tracer
+
+# 绘制时Qt原生的像素格式，转换成这种格式后QPainter不需要再转换一次
+# 小端机器上ARGB32_Premultiplied在内存中的字节顺序为B,G,R,A
+if sys.byteorder == 'little':
+    NATIVE_RAW_MODE = 'BGRa'
+    NATIVE_FORMAT = QImage.Format_ARGB32_Premultiplied
+else:
+    NATIVE_RAW_MODE = 'RGBa'
+    NATIVE_FORMAT = QImage.Format_RGBA8888_Premultiplied
+
+
+def export_pixels(pil_image, raw_mode, q_image):
+    """把PIL图像按raw_mode打包后分块写入q_image自己的缓冲区
+
+    与 Image.tobytes 使用同一个编码器，但不把所有分块拼成一个完整的bytes，
+    所以整个转换只分配QImage这一块图像大小的缓冲区。
+    """
+    from PIL import Image
+    if q_image.isNull():
+        # 宽或高为0的图像没有像素
+        return
+    pixels = q_image.bits()
+    pixels.setsize(q_image.sizeInBytes())
+    target = memoryview(pixels)
+    encoder = Image._getencoder(pil_image.mode, 'raw', (raw_mode, 0, 1))
+    encoder.setimage(pil_image.im, (0, 0) + pil_image.size)
+    chunk_size = max(65536, pil_image.width * 4)
+    position = 0
+    while True:
+        _, status, data = encoder.encode(chunk_size)
+        target[position:position + len(data)] = data
+        position += len(data)
+        if status:
+            break
+    if status < 0:
+        raise RuntimeError(f"encoder error {status} in export_pixels")
+
+
+@perf_stats.timed('convert')
+@tracer.traced('pil_to_qimage', 'render')
+def pil_to_qimage(pil_image):
+    """将PIL图像转换为QImage（可以在工作线程中调用）
+
+    QImage自己分配像素缓冲区，PIL导出像素时直接写入其中，同时完成预乘和通道重排，
+    得到的QImage使用绘制时的原生格式，整个转换只有这一次复制。
+    QPixmap.fromImage 对原生格式的QImage只做浅拷贝，像素由Qt管理，不依赖任何Python对象的生命周期。
+    """
+    try:
+        if pil_image is None:
+            return None
+
+        if pil_image.mode != 'RGBA':
+            pil_image = pil_image.convert('RGBA')
+            ImageProcessor.allocation_stats.record_allocation(pil_image.width, pil_image.height)
+        pil_image.load()
+        q_image = QImage(pil_image.width, pil_image.height, NATIVE_FORMAT)
+        ImageProcessor.allocation_stats.record_allocation(pil_image.width, pil_image.height)
+        try:
+            export_pixels(pil_image, NATIVE_RAW_MODE, q_image)
+        except ValueError:
+            # 旧版Pillow没有BGRa打包器
+            pil_image = pil_image.convert('RGBa')
+            ImageProcessor.allocation_stats.record_allocation(pil_image.width, pil_image.height)
+            q_image.reinterpretAsFormat(QImage.Format_RGBA8888_Premultiplied)
+            export_pixels(pil_image, 'RGBa', q_image)
+        ImageProcessor.allocation_stats.record_conversion()
+        return q_image
+
+    except Exception as e:
+        print(f"Error converting image: {str(e)}")
+        return None
+
+
+@tracer.traced('pil_to_pixmap', 'render')
+def pil_to_pixmap(pil_image, target_size=None, smooth=True):
+    """将PIL图像转换为QPixmap
+
+    smooth为False时使用最近邻缩放，用于需要立即显示的低质量草图
+    """
+    try:
+        if pil_image is None:
+            return None
+
+        q_image = pil_to_qimage(pil_image)
+        if q_image is None:
+            return None
+
+        # 创建QPixmap（原生格式时与q_image共享像素，不分配新的缓冲区）
+        pixmap = QPixmap.fromImage(q_image)
+
+        # 如果指定了目标大小，进行缩放
+        if target_size:
+            with perf_stats.stage('scale'):
+                pixmap = pixmap.scaled(
+                    target_size,
+                    Qt.KeepAspectRatio,
+                    Qt.SmoothTransformation if smooth else Qt.FastTransformation
+                )
+            ImageProcessor.allocation_stats.record_allocation(pixmap.width(), pixmap.height())
+
+        return pixmap
+
+    except Exception as e:
+        print(f"Error converting image: {str(e)}")
+        return None
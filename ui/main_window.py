@@ -1,14 +1,32 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QTreeView, QListWidget, QLabel, QPushButton, 
-                            QSpinBox, QComboBox, QGridLayout, QScrollArea)
-from PyQt5.QtCore import Qt, QTimer
+                            QSpinBox, QComboBox, QCheckBox, QDockWidget, QShortcut, QStyle,
+                            QApplication, QFileDialog)
+from PyQt5.QtCore import Qt, QTimer, QEventLoop, QUrl, pyqtSignal
+from PyQt5.QtGui import QKeySequence, QColor, QIcon, QDesktopServices
 from core.file_manager import FileManager
 from core.animation_merger import AnimationMerger
 from ui.preview_window import PreviewWindow
+from ui.preview_grid import AnimationGridModel, PreviewGridView
+from ui.render_pool import RenderPool
+from ui.atlas_watcher import AtlasWatcher
+from ui.folder_tree import FolderTree
+from ui.name_search import NameSearch
+from ui.perf_hud import PerfHud, format_bytes
 from core.image_processor import ImageProcessor
+from core import startup_profile
+from core.tracing import tracer
+from core.quality_governor import QualityGovernor
 import os
+import time
 
 class MainWindow(QMainWindow):
+    # 预加载任务完成（plist路径, 是否成功），从进程池的线程发出
+    atlas_warmed = pyqtSignal(str, bool)
+    # 总览图的进度（已完成的图数, 总图数）和结果（输出文件夹, 图数, 出错的图集数），从后台线程发出
+    contact_sheet_progress = pyqtSignal(int, int)
+    contact_sheets_done = pyqtSignal(str, int, int)
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("序列帧动画预览工具")
@@ -16,11 +34,25 @@ class MainWindow(QMainWindow):
         
         # 初始化核心组件
         self.file_manager = FileManager()
+        self.folder_browser = FolderTree(self.file_manager)
         self.animation_merger = AnimationMerger()
         self.image_processor = ImageProcessor()
         
         self.setup_ui()
         self.setup_connections()
+        self.setup_safe_loading()
+        
+    def setup_safe_loading(self):
+        """在独立进程中加载图集（配置项 isolated_loading 为false时关闭）"""
+        if not self.file_manager.load_config().get('isolated_loading', True):
+            return
+        loader = self.file_manager.enable_safe_loading(idle=self.process_paint_events)
+        # 启动完成后提前启动加载进程，第一次打开文件时不用等待
+        QTimer.singleShot(500, loader.start)
+        
+    def process_paint_events(self):
+        """等待加载进程时继续刷新界面，但不处理鼠标和键盘输入"""
+        QApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
         
     def setup_ui(self):
         """设置UI组件"""
@@ -42,16 +74,37 @@ class MainWindow(QMainWindow):
         # 初始化动画相关变量
         self.setup_animation_variables()
         
+        # 性能面板（默认隐藏）
+        self.setup_perf_hud()
+        
     def setup_left_panel(self, parent_layout):
         """设置左侧文件浏览面板"""
         left_panel = QWidget()
         layout = QVBoxLayout(left_panel)
         layout.setContentsMargins(10, 10, 10, 10)
         
-        # 文件夹浏览器
-        self.folder_tree = self.file_manager.create_folder_tree()
+        # 按帧名和动画名查找图集
+        self.name_search = NameSearch(self.file_manager)
         
-        layout.addWidget(QLabel("文件夹:"))
+        # 文件夹浏览器
+        self.folder_tree = self.folder_browser.create_folder_tree()
+        
+        # 只显示包含动画文件的文件夹
+        self.only_animation_folders_check = QCheckBox("只显示含动画的文件夹")
+        self.only_animation_folders_check.setChecked(
+            self.file_manager.load_config().get('only_animation_folders', False))
+        
+        layout.addWidget(QLabel("搜索:"))
+        layout.addWidget(self.name_search)
+        # 文件夹树只从上次的位置开始显示，可以逐级切换到上级文件夹
+        self.folder_up_button = QPushButton("上级文件夹")
+        self.folder_up_button.setToolTip("文件夹树从上一级文件夹开始显示")
+        folder_header = QHBoxLayout()
+        folder_header.addWidget(QLabel("文件夹:"))
+        folder_header.addStretch()
+        folder_header.addWidget(self.folder_up_button)
+        layout.addLayout(folder_header)
+        layout.addWidget(self.only_animation_folders_check)
         layout.addWidget(self.folder_tree)
         
         parent_layout.addWidget(left_panel)
@@ -68,8 +121,25 @@ class MainWindow(QMainWindow):
         self.animation_list.setStyleSheet("border: 1px solid #cccccc;")
         self.animation_list.setFixedWidth(200)  # 固定宽度
         
+        # 在后台进程中预先解码文件夹中的所有图集
+        self.warm_pool = None
+        self.warm_folder_path = None
+        self.warm_skipped = set()
+        self.warm_folder_check = QCheckBox("预加载整个文件夹")
+        self.warm_folder_check.setToolTip("选择文件夹后在后台解码其中所有图集，完成的文件带有勾选图标")
+        self.warm_folder_check.setChecked(self.file_manager.load_config().get('warm_folder', False))
+        
+        # 把整个文件夹的动画序列画成总览图（在后台生成）
+        self.contact_sheet_executor = None
+        self.contact_sheet_future = None
+        self.contact_sheet_button = QPushButton("生成总览图")
+        self.contact_sheet_button.setToolTip("把当前文件夹中每个动画序列的关键帧画成总览图，\n"
+                                             "保存在文件夹中的 contact_sheets 文件夹")
+        
         layout.addWidget(anim_label)
+        layout.addWidget(self.warm_folder_check)
         layout.addWidget(self.animation_list)
+        layout.addWidget(self.contact_sheet_button)
         
         parent_layout.addWidget(middle_panel)
         
@@ -82,29 +152,16 @@ class MainWindow(QMainWindow):
         # 创建预览区域
         preview_label = QLabel("预览:")
         
-        # 创滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        
-        # 创建预览容器
-        self.preview_widget = QWidget()
-        self.preview_layout = QVBoxLayout(self.preview_widget)
-        self.preview_layout.setContentsMargins(0, 0, 0, 0)
-        
-        # 创建预览窗口的容器
-        self.preview_container = QWidget()
-        self.preview_grid = QGridLayout(self.preview_container)
-        self.preview_grid.setSpacing(20)
-        self.preview_layout.addWidget(self.preview_container)
-        
-        # 将预览容器添加到滚动区域
-        scroll_area.setWidget(self.preview_widget)
+        # 创建预览网格（只绘制可见的单元格）
+        self.render_pool = RenderPool(self.image_processor, parent=self)
+        self.preview_model = AnimationGridModel(self.animation_merger, self.image_processor,
+                                                self.render_pool)
+        self.preview_grid = PreviewGridView()
+        self.preview_grid.setModel(self.preview_model)
         
         # 添加到右侧面板
         layout.addWidget(preview_label)
-        layout.addWidget(scroll_area)
+        layout.addWidget(self.preview_grid)
         
         # 创建控制按钮区域
         control_widget = QWidget()
@@ -112,14 +169,30 @@ class MainWindow(QMainWindow):
         control_layout.setContentsMargins(0, 0, 0, 0)
         
         self.play_button = QPushButton("播放")
+        self.inspect_button = QPushButton("图集")
+        self.inspect_button.setToolTip("查看整张贴图和每一帧的位置")
+        self.compare_button = QPushButton("对比")
+        self.compare_button.setToolTip("与另一个版本的图集（例如备份）逐帧比较")
+        self.perf_button = QPushButton("性能")
+        self.perf_button.setCheckable(True)
+        self.perf_button.setToolTip("显示性能面板 (F3)")
         fps_label = QLabel("帧率:")
         self.fps_spinbox = QSpinBox()
         self.fps_spinbox.setRange(1, 60)
         self.fps_spinbox.setValue(12)
+        # 当前的预览画质，负载高时自动降低
+        self.quality_label = QLabel()
+        self.quality_label.setToolTip("刷新跟不上帧率时依次改用快速缩放、半分辨率和隔帧刷新，\n"
+                                      "鼠标所在的单元格始终为完整画质")
         
         control_layout.addWidget(self.play_button)
         control_layout.addWidget(fps_label)
         control_layout.addWidget(self.fps_spinbox)
+        control_layout.addWidget(self.quality_label)
+        control_layout.addStretch()
+        control_layout.addWidget(self.inspect_button)
+        control_layout.addWidget(self.compare_button)
+        control_layout.addWidget(self.perf_button)
         
         layout.addWidget(control_widget)
         
@@ -130,22 +203,74 @@ class MainWindow(QMainWindow):
         self.current_frames = []
         self.current_frame_index = 0
         self.animation_timer = QTimer()
-        self.preview_windows = []
+        # 实际刷新次数，性能面板据此计算实际帧率
+        self.animation_ticks = 0
+        # 根据刷新耗时调节预览网格的画质
+        self.quality_governor = QualityGovernor(self.fps_spinbox.value())
+        self.update_quality_label()
+        
+        # 当前打开的图集，用于文件变化后的增量重新加载
+        self.current_plist_path = None
+        self.current_frames_dict = None
+        self.current_sprite_sheet = None
+        self.current_file_stamp = None
+        # 正在加载图集时为True；等待加载进程时仍会处理定时器，期间到来的重新加载先记下来
+        self.loading_atlas = False
+        self.pending_reload = None
+        self.atlas_watcher = AtlasWatcher(self)
+        # 图集检查窗口（第一次打开时创建）
+        self.atlas_inspector = None
+        # 相似动画窗口（第一次查找时创建）
+        self.similar_window = None
+        
+    def setup_perf_hud(self):
+        """设置性能面板"""
+        self.perf_hud = PerfHud(self.hud_metrics)
+        self.perf_dock = QDockWidget("性能", self)
+        self.perf_dock.setWidget(self.perf_hud)
+        self.perf_dock.setMinimumWidth(380)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.perf_dock)
+        self.perf_dock.hide()
+        self.perf_shortcut = QShortcut(QKeySequence(Qt.Key_F3), self)
         
     def setup_connections(self):
         """设置信号连接"""
         self.folder_tree.clicked.connect(self.on_folder_selected)
+        self.folder_up_button.clicked.connect(self.folder_browser.go_up)
+        self.only_animation_folders_check.toggled.connect(self.on_folder_filter_toggled)
+        self.warm_folder_check.toggled.connect(self.on_warm_folder_toggled)
+        self.atlas_warmed.connect(self.on_atlas_warmed)
         self.animation_list.itemClicked.connect(self.on_animation_selected)
         self.play_button.clicked.connect(self.toggle_animation)
+        self.inspect_button.clicked.connect(self.show_atlas_inspector)
+        self.compare_button.clicked.connect(self.compare_atlas)
+        self.contact_sheet_button.clicked.connect(self.render_contact_sheets)
+        self.contact_sheet_progress.connect(self.on_contact_sheet_progress)
+        self.contact_sheets_done.connect(self.on_contact_sheets_done)
+        self.perf_button.toggled.connect(self.perf_dock.setVisible)
+        self.perf_dock.visibilityChanged.connect(self.perf_button.setChecked)
+        self.perf_shortcut.activated.connect(self.perf_button.toggle)
         self.fps_spinbox.valueChanged.connect(self.update_fps)
         self.animation_timer.timeout.connect(self.update_animation_frame)
-        
-    def on_folder_selected(self, index):
-        """处理文件夹选择事件"""
-        path = self.file_manager.folder_model.filePath(index)
+        self.preview_grid.animation_activated.connect(self.on_preview_activated)
+        self.preview_grid.image_size_changed.connect(self.on_preview_size_changed)
+        self.preview_grid.similar_requested.connect(self.find_similar)
+        self.preview_grid.verticalScrollBar().valueChanged.connect(self.render_visible_previews)
+        self.atlas_watcher.atlas_changed.connect(self.reload_current_animation)
+        self.atlas_watcher.folder_changed.connect(self.refresh_animation_list)
+        self.preview_model.dataChanged.connect(self.on_first_frame)
+        self.name_search.hit_activated.connect(self.open_search_hit)
+        self.name_search.root_button.clicked.connect(self.set_search_root)
+        # 启动完成后再在后台更新名称索引
+        QTimer.singleShot(2000, self.name_search.refresh)
+        
+    def on_folder_selected(self, index, select_name=None):
+        """处理文件夹选择事件，select_name为要选中的文件名（默认选中第一个）"""
+        path = self.folder_browser.file_path(index)
         
         # 保存当前位置
         self.file_manager.save_last_position(path)
+        self.atlas_watcher.watch_folder(path)
         
         self.animation_list.clear()
         
@@ -158,10 +283,134 @@ class MainWindow(QMainWindow):
         
         # 添加到列表并选中第一个
         self.animation_list.addItems(plist_files)
-        self.animation_list.setCurrentRow(0)
-        first_item = self.animation_list.item(0)
+        self.annotate_animation_items(path)
+        row = plist_files.index(select_name) if select_name in plist_files else 0
+        self.animation_list.setCurrentRow(row)
+        first_item = self.animation_list.item(row)
         if first_item:
             self.on_animation_selected(first_item)
+        
+        # 开启预加载时在后台解码所有文件（第一个文件已同步加载，不等待工作进程启动）
+        self.warm_folder(path, plist_files)
+
+    def annotate_animation_items(self, folder_path):
+        """用文件头信息为列表项添加提示，标出解码后过大的贴图"""
+        for row in range(self.animation_list.count()):
+            item = self.animation_list.item(row)
+            plist_path = os.path.join(folder_path, item.text())
+            info = self.file_manager.probe_animation_file(plist_path)
+            if info is None:
+                continue
+            if 'error' in info:
+                item.setToolTip(f"无法读取文件头: {info['error']}")
+                item.setForeground(QColor('#999999'))
+                continue
+            tooltip = (f"贴图: {info['width']}x{info['height']} {info['color_name']} {info['bit_depth']}位\n"
+                       f"帧数: {info['frame_count']}\n"
+                       f"文件大小: {format_bytes(info['texture_bytes'])}\n"
+                       f"解码后: {format_bytes(info['decoded_bytes'])}")
+            if info['large']:
+                tooltip += "\n贴图较大，打开可能较慢并占用大量内存"
+                item.setForeground(QColor('#d9534f'))
+            item.setToolTip(tooltip)
+            # 超出加载限制的文件在打开之前就标出来
+            limit_error = self.check_load_limits(info)
+            if limit_error:
+                self.mark_failed_item(item, f"超出加载限制: {limit_error}")
+            elif plist_path in self.file_manager.load_errors:
+                self.mark_failed_item(item, self.file_manager.load_errors[plist_path])
+            self.mark_warm_item(item, plist_path)
+
+    def check_load_limits(self, info):
+        """按文件头检查图集是否超出加载限制，返回原因（未超出或未开启独立进程加载时为None）"""
+        loader = self.file_manager.safe_loader
+        if loader is None:
+            return None
+        from core.safe_loader import check_limits, LoadError
+        try:
+            check_limits(info, loader.limits)
+        except LoadError as e:
+            return str(e)
+        return None
+
+    def mark_failed_item(self, item, reason):
+        """标出无法加载的文件，原因显示在提示中"""
+        item.setForeground(QColor('#d9534f'))
+        item.setIcon(self.style().standardIcon(QStyle.SP_MessageBoxWarning))
+        tooltip = item.toolTip()
+        if reason not in tooltip:
+            item.setToolTip((tooltip + "\n" if tooltip else "") + f"无法加载: {reason}")
+
+    def ensure_warm_pool(self):
+        """第一次预加载时创建进程池，进程数和内存上限从配置读取"""
+        if self.warm_pool is None:
+            from core.warm_pool import WarmPool
+            config = self.file_manager.load_config()
+            self.warm_pool = WarmPool(
+                max_workers=config.get('warm_pool_workers') or None,
+                memory_limit=int(config.get('warm_memory_limit_mb', 1024)) * 1024 * 1024)
+            self.warm_pool.on_ready = self.atlas_warmed.emit
+            self.file_manager.atlas_cache = self.warm_pool
+        return self.warm_pool
+
+    def warm_folder(self, folder_path, plist_files):
+        """把文件夹中的图集提交到进程池预先解码，超出内存上限的文件跳过"""
+        if not self.warm_folder_check.isChecked():
+            return
+        from core.warm_pool import WARM_SKIPPED
+        pool = self.ensure_warm_pool()
+        # 切换文件夹后，旧文件夹中还没开始的任务不再需要
+        pool.cancel_pending()
+        self.warm_folder_path = folder_path
+        self.warm_skipped = set()
+        plist_paths = [os.path.join(folder_path, name) for name in plist_files]
+        for plist_path in plist_paths:
+            info = self.file_manager.probe_animation_file(plist_path)
+            if info is None or 'error' in info or self.check_load_limits(info):
+                continue
+            status = pool.warm(plist_path, self.file_manager.get_file_stamp(plist_path),
+                               (info['width'], info['height']), keep=set(plist_paths))
+            if status == WARM_SKIPPED:
+                self.warm_skipped.add(plist_path)
+
+    def mark_warm_item(self, item, plist_path):
+        """预加载完成的文件显示勾选图标，超出内存上限的文件在提示中说明"""
+        if self.warm_pool is None or os.path.dirname(plist_path) != self.warm_folder_path:
+            return
+        if self.warm_pool.is_ready(plist_path, self.file_manager.get_file_stamp(plist_path)):
+            item.setIcon(self.style().standardIcon(QStyle.SP_DialogApplyButton))
+            if "已预加载" not in item.toolTip():
+                item.setToolTip(item.toolTip() + "\n已预加载")
+        elif plist_path in self.warm_skipped and "超出预加载内存上限" not in item.toolTip():
+            item.setToolTip(item.toolTip() + "\n超出预加载内存上限，未预加载")
+
+    def on_atlas_warmed(self, plist_path, ok):
+        """预加载任务完成后标记对应的列表项"""
+        if not ok or os.path.dirname(plist_path) != self.warm_folder_path:
+            return
+        for item in self.animation_list.findItems(os.path.basename(plist_path), Qt.MatchExactly):
+            self.mark_warm_item(item, plist_path)
+
+    def on_warm_folder_toggled(self, checked):
+        """开启时预加载当前文件夹，关闭时释放所有预加载的图集"""
+        self.file_manager.save_config(warm_folder=checked)
+        folder_path = self.folder_browser.file_path(self.folder_tree.currentIndex())
+        if checked:
+            if folder_path and os.path.isdir(folder_path):
+                self.warm_folder(folder_path, self.file_manager.get_animation_files(folder_path))
+            return
+        if self.warm_pool is not None:
+            self.warm_pool.clear()
+        self.warm_folder_path = None
+        for row in range(self.animation_list.count()):
+            self.animation_list.item(row).setIcon(QIcon())
+        self.annotate_animation_items(folder_path)
+
+    def on_folder_filter_toggled(self, checked):
+        """切换是否只显示含动画的文件夹"""
+        current_path = self.folder_browser.file_path(self.folder_tree.currentIndex())
+        self.folder_browser.set_only_animation_folders(checked, current_path)
+        self.file_manager.save_config(only_animation_folders=checked)
 
     def on_animation_selected(self, item):
         """处理动画选择事件"""
@@ -171,97 +420,272 @@ class MainWindow(QMainWindow):
             
         # 获取文件路径
         folder_index = self.folder_tree.currentIndex()
-        folder_path = self.file_manager.folder_model.filePath(folder_index)
+        folder_path = self.folder_browser.file_path(folder_index)
         plist_path = os.path.join(folder_path, item.text())
         
-        # 加载动画文件
-        frames_dict, sprite_sheet, animation_groups = self.file_manager.load_animation_file(plist_path)
+        # 加载动画文件，失败时在列表中标出原因
+        frames_dict, sprite_sheet, animation_groups = self.load_animation_file(plist_path)
         if not all([frames_dict, sprite_sheet, animation_groups]):
+            if plist_path in self.file_manager.load_errors:
+                self.mark_failed_item(item, self.file_manager.load_errors[plist_path])
             return
             
-        # 清除现有的预览窗口
-        for window in self.preview_windows:
-            window['container'].setParent(None)
-        self.preview_windows.clear()
-        
-        # 创建新的预览窗口
-        self.create_preview_windows(animation_groups, frames_dict, sprite_sheet)
+        # 更新预览网格，新图集从完整画质开始重新调节
+        self.quality_governor.reset()
+        self.apply_quality()
+        self.preview_model.set_animations(animation_groups, frames_dict, sprite_sheet)
+        self.preview_grid.highlight_row(None)
+        self.render_visible_previews()
+        
+        # 记录当前图集并监视文件变化
+        self.current_plist_path = plist_path
+        self.current_frames_dict = frames_dict
+        self.current_sprite_sheet = sprite_sheet
+        self.current_file_stamp = self.file_manager.get_file_stamp(plist_path)
+        self.atlas_watcher.watch_atlas(plist_path)
+        self.update_atlas_inspector()
         
         # 开始播放动画
         interval = int(1000 / self.fps_spinbox.value())
         self.animation_timer.start(interval)
         self.play_button.setText("暂停")
 
-    def create_preview_windows(self, animation_groups, frames_dict, sprite_sheet):
-        """创建预览窗口"""
-        # 计算网格布局
-        num_animations = len(animation_groups)
-        cols = 2  # 固定为2列
-        rows = (num_animations + cols - 1) // cols
-        
-        # 设置预览容器的固定宽度
-        container_width = 900  # 适合两列布局
-        self.preview_container.setFixedWidth(container_width)
-        
-        # 计算每个预览窗口的固定大小
-        preview_size = (container_width - 60) // 2  # 减去间距后平分宽度
-        
-        # 为每个动画序列创建预览窗口
-        for i, (anim_name, frame_names) in enumerate(sorted(animation_groups.items())):
-            # 创建预览窗口容器
-            container = QWidget()
-            container.setFixedSize(preview_size, preview_size + 40)
-            container_layout = QVBoxLayout(container)
-            container_layout.setSpacing(5)
-            container_layout.setContentsMargins(5, 5, 5, 5)
-            
-            # 创建预览标签
-            preview_label = QLabel()
-            preview_label.setFixedSize(preview_size - 10, preview_size - 45)
-            preview_label.setAlignment(Qt.AlignCenter)
-            preview_label.setStyleSheet("border: 1px solid #cccccc;")
-            
-            # 创建名称标签
-            name_label = QLabel(anim_name)
-            name_label.setAlignment(Qt.AlignCenter)
-            
-            # 创建信息标签
-            info_label = QLabel()
-            info_label.setAlignment(Qt.AlignCenter)
-            info_label.setStyleSheet("color: #666666; font-size: 10px;")
-            
-            # 解析动画帧
-            frames = self.animation_merger.parse_animation_frames(frames_dict, frame_names)
-            
-            # 添加双击事件
-            preview_label.mouseDoubleClickEvent = lambda event, name=anim_name, frames=frames, sheet=sprite_sheet: \
-                self.show_single_preview(name, frames, sheet)
-            
-            container_layout.addWidget(preview_label)
-            container_layout.addWidget(name_label)
-            container_layout.addWidget(info_label)
-            
-            # 添加到网格布局
-            row = i // cols
-            col = i % cols
-            self.preview_grid.addWidget(container, row, col, Qt.AlignCenter)
-            
-            # 保存预览窗口信息
-            self.preview_windows.append({
-                'container': container,
-                'label': preview_label,
-                'name_label': name_label,
-                'info_label': info_label,
-                'frame_index': 0,
-                'frames': frames,
-                'sprite_sheet': sprite_sheet
-            })
-            
-            # 更新信息标签
-            if frames:
-                source_size = frames[0]['source_size']
-                info_text = f"尺寸: {source_size[0]}x{source_size[1]} | 帧数: {len(frames)}"
-                info_label.setText(info_text)
+    def load_animation_file(self, plist_path):
+        """加载图集；加载期间到来的重新加载在加载完成后处理"""
+        self.loading_atlas = True
+        try:
+            return self.file_manager.load_animation_file(plist_path)
+        finally:
+            self.loading_atlas = False
+            if self.pending_reload is not None:
+                plist_path, self.pending_reload = self.pending_reload, None
+                QTimer.singleShot(0, lambda: self.reload_current_animation(plist_path))
+
+    def reload_current_animation(self, plist_path):
+        """图集文件被重新导出后，只更新发生变化的帧"""
+        if plist_path != self.current_plist_path:
+            return
+        file_stamp = self.file_manager.get_file_stamp(plist_path)
+        if file_stamp is None or file_stamp == self.current_file_stamp:
+            return
+        if self.loading_atlas:
+            # 正在加载其他图集，加载完成后再检查
+            self.pending_reload = plist_path
+            return
+        
+        frames_dict, sprite_sheet, animation_groups = self.load_animation_file(plist_path)
+        if not all([frames_dict, sprite_sheet, animation_groups]):
+            # 可能还没写完，等下一次变化
+            return
+        
+        changed_frames = self.animation_merger.find_changed_frames(
+            self.current_frames_dict, self.current_sprite_sheet, frames_dict, sprite_sheet)
+        self.current_frames_dict = frames_dict
+        self.current_sprite_sheet = sprite_sheet
+        self.current_file_stamp = file_stamp
+        
+        self.preview_model.update_animations(animation_groups, frames_dict, sprite_sheet,
+                                             changed_frames)
+        self.render_visible_previews()
+        self.update_atlas_inspector()
+
+    def refresh_animation_list(self, folder_path):
+        """文件夹中的动画文件增删后刷新列表，保持当前选中项"""
+        current_item = self.animation_list.currentItem()
+        current_name = current_item.text() if current_item else None
+        
+        plist_files = self.file_manager.get_animation_files(folder_path)
+        self.animation_list.clear()
+        if not plist_files:
+            self.animation_list.addItem("没有找到有效的动画文件")
+            return
+        
+        self.animation_list.addItems(plist_files)
+        self.annotate_animation_items(folder_path)
+        if current_name in plist_files:
+            self.animation_list.setCurrentRow(plist_files.index(current_name))
+
+    def show_atlas_inspector(self):
+        """打开图集检查窗口"""
+        if self.current_frames_dict is None:
+            return
+        if self.atlas_inspector is None:
+            # 检查窗口依赖numpy，第一次使用时才导入
+            from ui.atlas_inspector import AtlasInspector
+            self.atlas_inspector = AtlasInspector(parent=self)
+            self.atlas_inspector.frame_activated.connect(self.jump_to_frame)
+        self.update_atlas_inspector(force=True)
+        self.atlas_inspector.show()
+        self.atlas_inspector.raise_()
+
+    def update_atlas_inspector(self, force=False):
+        """当前图集变化后更新检查窗口"""
+        if self.atlas_inspector is None or self.current_frames_dict is None:
+            return
+        if force or self.atlas_inspector.isVisible():
+            self.atlas_inspector.set_atlas(os.path.basename(self.current_plist_path),
+                                           self.current_frames_dict, self.current_sprite_sheet)
+
+    def compare_atlas(self):
+        """选择另一个版本的图集（作为旧版本），与当前图集逐帧比较"""
+        if self.current_frames_dict is None:
+            return
+        other_path, _ = QFileDialog.getOpenFileName(self, "选择要对比的旧版本图集",
+                                                    os.path.dirname(self.current_plist_path),
+                                                    "Plist (*.plist)")
+        if not other_path:
+            return
+        # 比较依赖numpy，第一次使用时才导入
+        from core.atlas_diff import diff_frames
+        from ui.diff_window import DiffWindow
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            other_frames, other_sheet, _ = self.load_animation_file(other_path)
+            if other_frames is None:
+                raise ValueError(f"Cannot load atlas: {other_path}")
+            result = diff_frames(other_frames, other_sheet,
+                                 self.current_frames_dict, self.current_sprite_sheet)
+        except Exception as e:
+            print(f"Error comparing atlases: {str(e)}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        result['old_path'] = other_path
+        result['new_path'] = self.current_plist_path
+        diff_window = DiffWindow(result, (other_frames, other_sheet),
+                                 (self.current_frames_dict, self.current_sprite_sheet),
+                                 fps=self.fps_spinbox.value(), parent=self)
+        # 关闭后删除窗口，释放两个版本的贴图
+        diff_window.setAttribute(Qt.WA_DeleteOnClose)
+        diff_window.show()
+
+    def jump_to_frame(self, anim_name, frame_index):
+        """在预览网格中显示指定动画序列的指定帧（暂停播放）"""
+        row = self.preview_model.row_for_name(anim_name)
+        if row is None:
+            return
+        if self.animation_timer.isActive():
+            self.toggle_animation()
+        self.preview_model.set_frame_index(row, frame_index)
+        self.preview_grid.highlight_row(row)
+        self.render_visible_previews()
+
+    def render_contact_sheets(self):
+        """在后台为当前文件夹生成总览图，完成后打开输出文件夹"""
+        if self.contact_sheet_future is not None and not self.contact_sheet_future.done():
+            return
+        folder_path = self.folder_browser.file_path(self.folder_tree.currentIndex())
+        if not folder_path or not os.path.isdir(folder_path):
+            return
+        if self.contact_sheet_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.contact_sheet_executor = ThreadPoolExecutor(max_workers=1,
+                                                             thread_name_prefix='contact-sheet')
+        self.contact_sheet_button.setEnabled(False)
+        self.contact_sheet_button.setText("正在生成总览图…")
+        self.contact_sheet_future = self.contact_sheet_executor.submit(
+            self.render_contact_sheets_in_background, folder_path,
+            os.path.join(folder_path, 'contact_sheets'))
+
+    def render_contact_sheets_in_background(self, folder_path, output_dir):
+        from core.contact_sheet import render_contact_sheets
+        
+        def report_progress(done, total):
+            # 窗口关闭后不再发出信号
+            if self.contact_sheet_executor is not None:
+                self.contact_sheet_progress.emit(done, total)
+        
+        tiles = errors = 0
+        try:
+            sheets = render_contact_sheets(folder_path, output_dir, progress=report_progress)
+            for report in sheets:
+                if self.contact_sheet_executor is None:
+                    # 窗口已关闭，不再开始剩下的图
+                    sheets.close()
+                    return
+                tiles += report['path'] is not None
+                errors += len(report['errors'])
+        except Exception as e:
+            print(f"Error rendering contact sheets: {str(e)}")
+            errors += 1
+        if self.contact_sheet_executor is not None:
+            self.contact_sheets_done.emit(output_dir, tiles, errors)
+
+    def on_contact_sheet_progress(self, done, total):
+        self.contact_sheet_button.setText(f"正在生成总览图 {done}/{total}")
+
+    def on_contact_sheets_done(self, output_dir, tiles, errors):
+        self.contact_sheet_button.setEnabled(True)
+        self.contact_sheet_button.setText("生成总览图")
+        if not tiles:
+            self.contact_sheet_button.setToolTip("当前文件夹中没有可以生成总览图的动画文件")
+            return
+        summary = f"上次生成: {tiles} 张总览图" + (f", {errors} 个图集无法加载" if errors else "")
+        self.contact_sheet_button.setToolTip(f"{summary}\n{output_dir}")
+        QDesktopServices.openUrl(QUrl.fromLocalFile(output_dir))
+
+    def set_search_root(self):
+        """把当前选中的文件夹设为搜索范围"""
+        self.name_search.set_root(self.folder_browser.file_path(self.folder_tree.currentIndex()))
+
+    def open_search_hit(self, hit):
+        """打开搜索结果所在的图集，并滚动到对应的动画序列（帧名命中时显示该帧）"""
+        plist_path = hit['plist_path']
+        if plist_path != self.current_plist_path:
+            if not os.path.exists(plist_path):
+                self.name_search.refresh()
+                return
+            self.folder_browser.reveal_path(os.path.dirname(plist_path))
+            self.on_folder_selected(self.folder_tree.currentIndex(), os.path.basename(plist_path))
+            if plist_path != self.current_plist_path:
+                return
+        
+        row = self.preview_model.row_for_name(hit['group'])
+        if row is None:
+            return
+        if hit['kind'] == 'frame':
+            frame_names = self.current_frames_dict.group_names(hit['group'])
+            if hit['name'] in frame_names:
+                self.jump_to_frame(hit['group'], frame_names.index(hit['name']))
+                return
+        self.preview_grid.highlight_row(row)
+        self.render_visible_previews()
+
+    def find_similar(self, row):
+        """在搜索范围（未设置时为当前文件夹）内查找与这个动画相似的动画"""
+        if self.current_plist_path is None:
+            return
+        from core.phash import group_code
+        entry = self.preview_model.entries[row]
+        try:
+            code = group_code(self.preview_model.get_frames(row), self.preview_model.sprite_sheet)
+        except Exception as e:
+            print(f"Error hashing animation: {str(e)}")
+            return
+        if self.similar_window is None:
+            from ui.similar_window import SimilarWindow
+            self.similar_window = SimilarWindow(parent=self)
+            self.similar_window.hit_activated.connect(self.open_search_hit)
+        root = self.name_search.index.root or os.path.dirname(self.current_plist_path)
+        self.similar_window.find(root, self.current_plist_path, entry['name'], code)
+        self.similar_window.show()
+        self.similar_window.raise_()
+
+    def on_preview_size_changed(self, size):
+        """预览网格单元格大小变化"""
+        self.preview_model.set_image_size(size)
+        self.render_visible_previews()
+
+    def render_visible_previews(self, *args):
+        """绘制当前可见的预览单元格"""
+        self.preview_model.render_rows(self.preview_grid.visible_rows(),
+                                       self.preview_grid.focus_rows())
+
+    def on_preview_activated(self, row):
+        """双击预览单元格打开大预览窗口"""
+        entry = self.preview_model.entries[row]
+        self.show_single_preview(entry['name'], self.preview_model.get_frames(row),
+                                 self.preview_model.sprite_sheet)
 
     def show_single_preview(self, anim_name, frames, sprite_sheet):
         """显示单个动画的预览窗口"""
@@ -274,6 +698,8 @@ class MainWindow(QMainWindow):
                 'fps': self.fps_spinbox.value()
             }
         )
+        # 关闭后删除窗口，否则它会作为主窗口的子对象一直保留缓存的帧
+        preview_window.setAttribute(Qt.WA_DeleteOnClose)
         preview_window.show()
 
     def toggle_animation(self):
@@ -288,6 +714,7 @@ class MainWindow(QMainWindow):
 
     def update_fps(self, value):
         """更新帧率"""
+        self.quality_governor.set_target_fps(value)
         if self.animation_timer.isActive():
             self.animation_timer.stop()
             interval = int(1000 / value)
@@ -295,26 +722,69 @@ class MainWindow(QMainWindow):
 
     def update_animation_frame(self):
         """更新动画帧"""
-        for window in self.preview_windows:
-            if not window['frames'] or not window['sprite_sheet']:
-                continue
-                
-            try:
-                frame_data = window['frames'][window['frame_index']]
-                
-                # 处理当前帧
-                frame_image = self.image_processor.process_frame(frame_data, window['sprite_sheet'])
-                if frame_image:
-                    # 转换为QPixmap并显示
-                    pixmap = self.image_processor.pil_to_pixmap(
-                        frame_image,
-                        window['label'].size()
-                    )
-                    if pixmap:
-                        window['label'].setPixmap(pixmap)
-                
-                # 更新帧引
-                window['frame_index'] = (window['frame_index'] + 1) % len(window['frames'])
-                
-            except Exception as e:
-                print(f"Error updating frame: {str(e)}")
\ No newline at end of file
+        self.animation_ticks += 1
+        started = time.perf_counter()
+        skipped_ticks = self.render_pool.skipped_ticks
+        with tracer.span('tick', 'ui', tick=self.animation_ticks):
+            self.preview_model.advance_frames(self.quality_governor.settings()['frame_step'],
+                                              self.preview_grid.focus_rows(),
+                                              self.animation_ticks)
+            self.render_visible_previews()
+        
+        # 耗时取GUI线程的处理时间和线程池完成上一批合成的时间中较大的一个
+        cost = max(time.perf_counter() - started, self.render_pool.take_batch_seconds())
+        dropped = self.render_pool.skipped_ticks > skipped_ticks
+        if self.quality_governor.record_tick(cost, dropped):
+            tracer.instant('quality_level', 'ui', level=self.quality_governor.level_name())
+            self.apply_quality()
+
+    def apply_quality(self):
+        """把画质调节器的当前等级应用到预览网格"""
+        self.preview_model.set_quality(self.quality_governor.settings())
+        self.update_quality_label()
+
+    def update_quality_label(self):
+        self.quality_label.setText(f"画质: {self.quality_governor.level_name()}")
+        if self.quality_governor.level:
+            self.quality_label.setStyleSheet("color: #d9534f;")
+        else:
+            self.quality_label.setStyleSheet("")
+
+    def hud_metrics(self):
+        """性能面板显示的统计"""
+        return {
+            'target_fps': self.fps_spinbox.value(),
+            'ticks': self.animation_ticks,
+            'dropped': self.render_pool.skipped_ticks,
+            'cache_hits': self.preview_model.cache_hits,
+            'cache_misses': self.preview_model.cache_misses,
+            'resident_bytes': self.preview_model.resident_bytes(),
+            'quality': self.quality_governor.level_name()
+        }
+
+    def paintEvent(self, event):
+        """记录窗口第一次绘制的时间"""
+        startup_profile.mark('first_paint')
+        super().paintEvent(event)
+
+    def on_first_frame(self, *args):
+        """记录第一帧动画显示的时间"""
+        startup_profile.mark('first_frame')
+        self.preview_model.dataChanged.disconnect(self.on_first_frame)
+
+    def closeEvent(self, event):
+        """窗口关闭事件"""
+        self.animation_timer.stop()
+        self.render_pool.shutdown()
+        self.name_search.shutdown()
+        self.folder_browser.shutdown()
+        if self.similar_window is not None:
+            self.similar_window.shutdown()
+        if self.contact_sheet_executor is not None:
+            executor, self.contact_sheet_executor = self.contact_sheet_executor, None
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.file_manager.safe_loader is not None:
+            self.file_manager.safe_loader.stop()
+        if self.warm_pool is not None:
+            self.warm_pool.shutdown()
+        super().closeEvent(event)
@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QListWidget,
+                             QListWidgetItem, QLabel, QPushButton)
+from PyQt5.QtCore import Qt, QEvent, pyqtSignal
+from core.name_index import NameIndex, HIT_GROUP
+
+# 结果列表最多显示的条数
+MAX_RESULTS = 200
+
+
+class NameSearch(QWidget):
+    """在搜索范围（一个目录树）内按帧名或动画序列名查找图集
+
+    索引在后台线程中建立，输入框获得焦点时按修改时间增量更新。
+    双击或回车选中结果时发出 hit_activated(命中信息字典)。
+    """
+
+    hit_activated = pyqtSignal(dict)
+    # 后台更新完成（变化的图集数），从索引线程发出
+    index_updated = pyqtSignal(int)
+
+    def __init__(self, file_manager, parent=None):
+        super().__init__(parent)
+        self.file_manager = file_manager
+        self.index = NameIndex()
+        self.executor = None
+        self.update_future = None
+        self.update_again = False
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索帧名或动画名")
+        self.search_edit.setClearButtonEnabled(True)
+        self.root_button = QPushButton("设为搜索范围")
+        self.root_button.setToolTip("在当前选中的文件夹及其所有子文件夹中搜索")
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #666666; font-size: 11px;")
+        self.result_list = QListWidget()
+        self.result_list.setStyleSheet("border: 1px solid #cccccc;")
+        self.result_list.hide()
+
+        search_row = QHBoxLayout()
+        search_row.setContentsMargins(0, 0, 0, 0)
+        search_row.addWidget(self.search_edit)
+        search_row.addWidget(self.root_button)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(search_row)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.result_list)
+
+        self.search_edit.textChanged.connect(self.run_query)
+        self.search_edit.returnPressed.connect(self.activate_first)
+        self.search_edit.installEventFilter(self)
+        self.result_list.itemActivated.connect(self.on_item_activated)
+        self.result_list.itemClicked.connect(self.on_item_activated)
+        self.index_updated.connect(self.on_index_updated)
+
+        self.index.set_root(self.file_manager.load_config().get('search_root'))
+        self.update_status()
+
+    def set_root(self, root):
+        """更换搜索范围并在后台重新建立索引"""
+        if not root or not os.path.isdir(root):
+            return
+        self.file_manager.save_config(search_root=root)
+        self.index.set_root(root)
+        self.update_status()
+        self.run_query()
+        self.refresh()
+
+    def refresh(self):
+        """在后台线程中增量更新索引（已经在更新时，完成后再更新一次）"""
+        if self.index.root is None:
+            return
+        if self.update_future is not None and not self.update_future.done():
+            self.update_again = True
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='name-index')
+        self.update_again = False
+        self.status_label.setText(self.status_text() + "（正在更新索引…）")
+        self.update_future = self.executor.submit(self.update_index)
+
+    def update_index(self):
+        try:
+            changed = self.index.update()
+        except Exception as e:
+            print(f"Error updating name index: {str(e)}")
+            changed = 0
+        self.index_updated.emit(changed)
+
+    def on_index_updated(self, changed):
+        if self.update_again:
+            self.refresh()
+            return
+        self.update_status()
+        if changed:
+            self.run_query()
+
+    def status_text(self):
+        if self.index.root is None:
+            return "未设置搜索范围"
+        stats = self.index.stats()
+        return (f"{os.path.basename(self.index.root) or self.index.root}: "
+                f"{stats['atlases']} 个图集, {stats['names']} 个名称")
+
+    def update_status(self):
+        self.status_label.setText(self.status_text())
+        self.status_label.setToolTip(self.index.root or "")
+
+    def run_query(self, *args):
+        """按输入框中的文字查找，结果显示在列表中"""
+        query = self.search_edit.text()
+        self.result_list.clear()
+        self.result_list.setVisible(bool(query.strip()))
+        if not query.strip():
+            return
+        hits = self.index.search(query, MAX_RESULTS)
+        if not hits:
+            item = QListWidgetItem("没有找到")
+            item.setFlags(Qt.NoItemFlags)
+            self.result_list.addItem(item)
+            return
+        for hit in hits:
+            atlas_name = os.path.basename(hit['plist_path'])
+            prefix = "[动画] " if hit['kind'] == HIT_GROUP else ""
+            item = QListWidgetItem(f"{prefix}{hit['name']}  —  {atlas_name}")
+            item.setToolTip(hit['plist_path'])
+            item.setData(Qt.UserRole, hit)
+            self.result_list.addItem(item)
+
+    def activate_first(self):
+        item = self.result_list.item(0)
+        if item is not None:
+            self.on_item_activated(item)
+
+    def on_item_activated(self, item):
+        hit = item.data(Qt.UserRole)
+        if hit:
+            self.hit_activated.emit(hit)
+
+    def eventFilter(self, obj, event):
+        # 开始输入前先检查有没有文件变化
+        if obj is self.search_edit and event.type() == QEvent.FocusIn:
+            self.refresh()
+        return super().eventFilter(obj, event)
+
+    def shutdown(self):
+        # 更换根目录会让进行中的扫描尽快结束
+        self.index.set_root(None)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
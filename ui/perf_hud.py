@@ -0,0 +1,118 @@
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont
+from core.perf_stats import perf_stats, HISTOGRAM_BOUNDS
+
+# 刷新间隔（毫秒）
+HUD_INTERVAL = 1000
+
+# 直方图用的字符，从低到高
+SPARK_CHARS = ' ▁▂▃▄▅▆▇█'
+
+# 按处理顺序显示的阶段，其他阶段排在后面
+STAGE_ORDER = ['parse', 'decode', 'composite', 'scale', 'convert', 'upload', 'set_pixmap']
+
+# 正在显示的性能面板数量，全部隐藏时关闭计时
+_visible_huds = 0
+
+
+def format_bytes(size):
+    """字节数转换为便于阅读的字符串"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def sparkline(histogram):
+    """把直方图画成一行字符"""
+    peak = max(histogram) or 1
+    return ''.join(SPARK_CHARS[(count * (len(SPARK_CHARS) - 1) + peak - 1) // peak]
+                   for count in histogram)
+
+
+class PerfHud(QLabel):
+    """性能面板：实际帧率、丢帧、缓存命中率、内存占用和各阶段耗时
+
+    metrics_callback 返回一个字典：
+        target_fps, ticks（累计的刷新次数）, dropped, cache_hits, cache_misses, resident_bytes,
+        quality（可选，当前画质等级）
+    面板显示时才打开 perf_stats，每秒读取一次统计；隐藏后定时器和计时都停止。
+    """
+
+    def __init__(self, metrics_callback, parent=None):
+        super().__init__(parent)
+        self.metrics_callback = metrics_callback
+        self.last_ticks = None
+        self.counted = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(HUD_INTERVAL)
+        self.timer.timeout.connect(self.refresh)
+
+        font = QFont("monospace")
+        font.setStyleHint(QFont.Monospace)
+        font.setPointSize(9)
+        self.setFont(font)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 180); color: #e0e0e0; padding: 6px;")
+
+    def showEvent(self, event):
+        global _visible_huds
+        if not self.counted:
+            self.counted = True
+            _visible_huds += 1
+        if not perf_stats.enabled:
+            perf_stats.reset()
+            perf_stats.enabled = True
+        self.last_ticks = None
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        global _visible_huds
+        self.timer.stop()
+        # 窗口关闭和面板隐藏都会触发，只减一次
+        if self.counted:
+            self.counted = False
+            _visible_huds -= 1
+        if _visible_huds == 0:
+            perf_stats.enabled = False
+        super().hideEvent(event)
+
+    def refresh(self):
+        """读取一次统计并更新显示"""
+        metrics = self.metrics_callback()
+        ticks = metrics.get('ticks', 0)
+        achieved = 0.0 if self.last_ticks is None else (ticks - self.last_ticks) * 1000 / HUD_INTERVAL
+        self.last_ticks = ticks
+
+        hits = metrics.get('cache_hits', 0)
+        misses = metrics.get('cache_misses', 0)
+        hit_rate = hits * 100 / (hits + misses) if hits + misses else 0.0
+
+        lines = [
+            f"帧率   {achieved:5.1f} / {metrics.get('target_fps', 0)} fps",
+            f"丢帧   {metrics.get('dropped', 0)}",
+            f"缓存   {hit_rate:5.1f}% ({hits}/{hits + misses})",
+            f"内存   {format_bytes(metrics.get('resident_bytes', 0))}",
+        ]
+        if 'quality' in metrics:
+            lines.append(f"画质   {metrics['quality']}")
+        lines += [
+            "",
+            # 中文字符占两列，这里的宽度按显示列数对齐
+            f"{'阶段':<10}{'次数':>4}{'平均ms':>6}{'最大ms':>6}  <{'/'.join(map(str, HISTOGRAM_BOUNDS))}+"
+        ]
+        stages = perf_stats.snapshot()
+        names = [n for n in STAGE_ORDER if n in stages] + sorted(n for n in stages if n not in STAGE_ORDER)
+        for name in names:
+            stage = stages[name]
+            lines.append(f"{name:<12}{stage['count']:>6}{stage['avg_ms']:>8.2f}{stage['max_ms']:>8.1f}"
+                         f"  {sparkline(stage['histogram'])}")
+        self.setText('\n'.join(lines))
+        # 作为覆盖层使用时没有布局管理大小
+        if self.parentWidget() is not None and self.parentWidget().layout() is None:
+            self.adjustSize()
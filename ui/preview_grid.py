@@ -0,0 +1,418 @@
+from PyQt5.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView, QMenu
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize, QRect, pyqtSignal
+from PyQt5.QtGui import QColor, QPen, QFont, QPixmap
+from core.perf_stats import perf_stats
+from core.tracing import tracer
+from core.quality_governor import FULL_QUALITY
+
+# 自定义数据角色
+PixmapRole = Qt.UserRole + 1
+InfoRole = Qt.UserRole + 2
+
+# 网格单元的布局参数
+CELL_MIN_WIDTH = 240
+CELL_MAX_WIDTH = 420
+CELL_SPACING = 20
+CELL_TEXT_HEIGHT = 40
+CELL_MARGIN = 5
+
+
+class AnimationGridModel(QAbstractListModel):
+    """动画网格数据模型，每个动画序列对应一行"""
+
+    def __init__(self, animation_merger, image_processor, render_pool, parent=None):
+        super().__init__(parent)
+        self.animation_merger = animation_merger
+        self.image_processor = image_processor
+        self.render_pool = render_pool
+        self.render_pool.results_ready.connect(self.apply_render_results)
+        self.entries = []
+        self.frames_dict = None
+        self.sprite_sheet = None
+        self.image_size = QSize()
+        # 每次更换动画或单元格大小时递增，用于丢弃过期的渲染结果
+        self.generation = 0
+        # 帧缓存命中统计
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # 非焦点单元格使用的画质（QualityGovernor的设置）
+        self.quality = FULL_QUALITY
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.entries):
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return entry['name']
+        if role == PixmapRole:
+            return entry['pixmap']
+        if role == InfoRole:
+            frames = self.get_frames(index.row())
+            if len(frames):
+                source_size = frames[0]['source_size']
+                return f"尺寸: {source_size[0]}x{source_size[1]} | 帧数: {len(frames)}"
+            return ""
+        return None
+
+    @tracer.traced('grid_rebuild', 'ui')
+    def set_animations(self, animation_groups, frames_dict, sprite_sheet):
+        """替换当前显示的动画序列，帧数据在首次绘制时才取出
+        
+        frames_dict为FrameTable，animation_groups为动画序列名到行号数组的映射
+        """
+        self.beginResetModel()
+        self.generation += 1
+        self.frames_dict = frames_dict
+        self.sprite_sheet = sprite_sheet
+        self.entries = [
+            {
+                'name': anim_name,
+                'rows': rows,
+                'frames': None,
+                'frame_index': 0,
+                'pixmap': None,
+                'cache': {}
+            }
+            for anim_name, rows in sorted(animation_groups.items())
+        ]
+        self.endResetModel()
+
+    @tracer.traced('grid_update', 'ui')
+    def update_animations(self, animation_groups, frames_dict, sprite_sheet, changed_frames):
+        """重新加载后更新动画序列，只清除发生变化的帧的缓存，并保留播放进度"""
+        old_entries = {entry['name']: entry for entry in self.entries}
+        old_table = self.frames_dict
+        self.beginResetModel()
+        self.generation += 1
+        self.frames_dict = frames_dict
+        self.sprite_sheet = sprite_sheet
+        entries = []
+        for anim_name, rows in sorted(animation_groups.items()):
+            entry = old_entries.get(anim_name)
+            frame_names = [frames_dict.names[row] for row in rows]
+            if entry is None:
+                entry = {
+                    'name': anim_name,
+                    'rows': rows,
+                    'frames': None,
+                    'frame_index': 0,
+                    'pixmap': None,
+                    'cache': {}
+                }
+            elif [old_table.names[row] for row in entry['rows']] != frame_names:
+                # 帧序列本身变了，整组重新读取
+                entry['rows'] = rows
+                entry['frames'] = None
+                entry['cache'] = {}
+                entry['pixmap'] = None
+                entry['frame_index'] %= max(1, len(rows))
+            else:
+                # 行号可能变化，帧数据从新的帧表中重新取出
+                entry['rows'] = rows
+                entry['frames'] = None
+                stale = {i for i, name in enumerate(frame_names) if name in changed_frames}
+                entry['cache'] = {key: pixmap for key, pixmap in entry['cache'].items()
+                                  if key[0] not in stale}
+            entries.append(entry)
+        self.entries = entries
+        self.endResetModel()
+
+    def clear(self):
+        """清空所有动画序列"""
+        self.set_animations({}, None, None)
+
+    def get_frames(self, row):
+        """获取指定行的帧数据（延迟取出）"""
+        entry = self.entries[row]
+        if entry['frames'] is None:
+            entry['frames'] = self.animation_merger.parse_animation_frames(
+                self.frames_dict, entry['rows'])
+        return entry['frames']
+
+    def set_image_size(self, size):
+        """设置单元格中预览图的大小，尺寸变化时清空缓存"""
+        if size == self.image_size:
+            return
+        self.image_size = QSize(size)
+        self.generation += 1
+        for entry in self.entries:
+            entry['cache'].clear()
+
+    def row_for_name(self, anim_name):
+        """动画序列所在的行，没有时返回None"""
+        for row, entry in enumerate(self.entries):
+            if entry['name'] == anim_name:
+                return row
+        return None
+
+    def set_frame_index(self, row, frame_index):
+        """设置某一行当前显示的帧"""
+        entry = self.entries[row]
+        if len(entry['rows']):
+            entry['frame_index'] = frame_index % len(entry['rows'])
+
+    def advance_frames(self, frame_step=1, focus_rows=(), tick=0):
+        """所有动画前进一帧
+        
+        frame_step大于1时，非焦点的单元格每frame_step次刷新才前进frame_step帧，
+        播放速度不变；不同单元格按行号错开刷新的时机，每次刷新的工作量保持平均。
+        """
+        for row, entry in enumerate(self.entries):
+            frame_count = len(entry['rows'])
+            if not frame_count:
+                continue
+            if frame_step <= 1 or row in focus_rows:
+                step = 1
+            elif (tick + row) % frame_step == 0:
+                step = frame_step
+            else:
+                continue
+            entry['frame_index'] = (entry['frame_index'] + step) % frame_count
+
+    def set_quality(self, quality):
+        """修改非焦点单元格的画质，丢弃其他画质的缓存（完整画质的缓存留给焦点单元格）"""
+        if quality == self.quality:
+            return
+        self.quality = quality
+        keep = {self.quality_key(FULL_QUALITY), self.quality_key(quality)}
+        for entry in self.entries:
+            entry['cache'] = {key: pixmap for key, pixmap in entry['cache'].items()
+                              if key[1] in keep}
+
+    @staticmethod
+    def quality_key(quality):
+        return (quality['resample'], quality['scale'])
+
+    def render_rows(self, rows, focus_rows=()):
+        """为可见行显示当前帧，未缓存的帧交给线程池合成
+        
+        focus_rows中的单元格（鼠标所在或高亮的）始终使用完整画质
+        """
+        if self.sprite_sheet is None or self.image_size.isEmpty():
+            return
+        self.apply_render_results()
+        changed = []
+        jobs = []
+        for row in rows:
+            if row < 0 or row >= len(self.entries):
+                continue
+            entry = self.entries[row]
+            frames = self.get_frames(row)
+            if not len(frames):
+                continue
+            frame_index = entry['frame_index'] % len(frames)
+            quality = FULL_QUALITY if row in focus_rows else self.quality
+            quality_key = self.quality_key(quality)
+            pixmap = entry['cache'].get((frame_index, quality_key))
+            if pixmap is None:
+                self.cache_misses += 1
+                key = (self.generation, row, frame_index, quality_key)
+                target_size = (max(1, int(self.image_size.width() * quality['scale'])),
+                               max(1, int(self.image_size.height() * quality['scale'])))
+                jobs.append((key, frames[frame_index], self.sprite_sheet, target_size,
+                             quality['resample']))
+            else:
+                self.cache_hits += 1
+                if pixmap is not entry['pixmap']:
+                    entry['pixmap'] = pixmap
+                    changed.append(row)
+        self.render_pool.submit(jobs)
+        self.emit_pixmaps_changed(changed)
+
+    def apply_render_results(self):
+        """在GUI线程中把线程池的结果转换为QPixmap"""
+        changed = []
+        keep = {self.quality_key(FULL_QUALITY), self.quality_key(self.quality)}
+        for (generation, row, frame_index, quality_key), q_image in self.render_pool.collect():
+            if generation != self.generation or q_image is None or quality_key not in keep:
+                continue
+            entry = self.entries[row]
+            with perf_stats.stage('upload'):
+                pixmap = QPixmap.fromImage(q_image)
+            # 降低分辨率的预览图按比例放大绘制，占据和完整画质相同的区域
+            pixmap.setDevicePixelRatio(quality_key[1])
+            entry['cache'][(frame_index, quality_key)] = pixmap
+            if entry['frame_index'] == frame_index:
+                entry['pixmap'] = pixmap
+                changed.append(row)
+        self.emit_pixmaps_changed(changed)
+
+    def resident_bytes(self):
+        """贴图和缓存的QPixmap占用的内存（字节）"""
+        total = 0
+        if self.sprite_sheet is not None:
+            total += self.sprite_sheet.width * self.sprite_sheet.height * 4
+        for entry in self.entries:
+            for pixmap in entry['cache'].values():
+                total += pixmap.width() * pixmap.height() * pixmap.depth() // 8
+        return total
+
+    def emit_pixmaps_changed(self, rows):
+        """合并为一次连续区域的刷新"""
+        if rows:
+            with perf_stats.stage('set_pixmap'):
+                self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)),
+                                      [PixmapRole])
+
+
+class AnimationGridDelegate(QStyledItemDelegate):
+    """绘制网格单元：预览图、名称和信息"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cell_size = QSize(CELL_MIN_WIDTH, CELL_MIN_WIDTH + CELL_TEXT_HEIGHT)
+        self.border_pen = QPen(QColor('#cccccc'))
+        self.info_color = QColor('#666666')
+        # 从图集检查窗口跳转过来的单元格，边框高亮显示
+        self.highlighted_row = None
+
+    def image_rect(self, cell_rect):
+        """计算单元格内预览图的区域"""
+        return QRect(cell_rect.x() + CELL_MARGIN,
+                     cell_rect.y() + CELL_MARGIN,
+                     cell_rect.width() - CELL_MARGIN * 2,
+                     cell_rect.height() - CELL_MARGIN * 2 - CELL_TEXT_HEIGHT)
+
+    def sizeHint(self, option, index):
+        return self.cell_size
+
+    def paint(self, painter, option, index):
+        painter.save()
+        cell_rect = option.rect
+        image_rect = self.image_rect(cell_rect)
+
+        # 边框
+        if option.state & QStyle.State_MouseOver or index.row() == self.highlighted_row:
+            painter.setPen(QPen(option.palette.highlight().color()))
+        else:
+            painter.setPen(self.border_pen)
+        painter.drawRect(image_rect.adjusted(0, 0, -1, -1))
+
+        # 预览图居中绘制
+        pixmap = index.data(PixmapRole)
+        if pixmap is not None and not pixmap.isNull():
+            pixmap_width = int(pixmap.width() / pixmap.devicePixelRatio())
+            pixmap_height = int(pixmap.height() / pixmap.devicePixelRatio())
+            x = image_rect.x() + (image_rect.width() - pixmap_width) // 2
+            y = image_rect.y() + (image_rect.height() - pixmap_height) // 2
+            painter.drawPixmap(QRect(x, y, pixmap_width, pixmap_height), pixmap)
+
+        # 名称
+        text_top = image_rect.bottom() + CELL_MARGIN
+        name_rect = QRect(cell_rect.x(), text_top, cell_rect.width(), CELL_TEXT_HEIGHT // 2)
+        painter.setPen(option.palette.text().color())
+        painter.drawText(name_rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+
+        # 信息
+        info_rect = name_rect.translated(0, CELL_TEXT_HEIGHT // 2)
+        font = QFont(painter.font())
+        font.setPixelSize(10)
+        painter.setFont(font)
+        painter.setPen(self.info_color)
+        painter.drawText(info_rect, Qt.AlignCenter, index.data(InfoRole))
+
+        painter.restore()
+
+
+class PreviewGridView(QListView):
+    """只绘制可见单元格的预览网格，列数和单元格大小随窗口宽度变化"""
+
+    animation_activated = pyqtSignal(int)
+    image_size_changed = pyqtSignal(QSize)
+    # 右键菜单中的"查找相似"
+    similar_requested = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setMouseTracking(True)
+        # 鼠标所在的单元格，始终以完整画质播放
+        self.hovered_row = None
+
+        self.grid_delegate = AnimationGridDelegate(self)
+        self.setItemDelegate(self.grid_delegate)
+        self.doubleClicked.connect(lambda index: self.animation_activated.emit(index.row()))
+
+    def columns(self):
+        """当前的列数"""
+        return max(1, self.viewport().width() // max(1, self.gridSize().width()))
+
+    def image_size(self):
+        """单元格中预览图的大小"""
+        cell_rect = QRect(0, 0, self.grid_delegate.cell_size.width(),
+                          self.grid_delegate.cell_size.height())
+        return self.grid_delegate.image_rect(cell_rect).size()
+
+    def update_cell_size(self):
+        """根据视口宽度计算列数和单元格大小"""
+        width = self.viewport().width()
+        cols = max(1, (width - CELL_SPACING) // (CELL_MIN_WIDTH + CELL_SPACING))
+        cell_width = (width - CELL_SPACING) // cols - CELL_SPACING
+        cell_width = max(CELL_MIN_WIDTH // 2, min(CELL_MAX_WIDTH, cell_width))
+        cell_size = QSize(cell_width, cell_width + CELL_TEXT_HEIGHT)
+        if cell_size == self.grid_delegate.cell_size and not self.gridSize().isEmpty():
+            return
+        self.grid_delegate.cell_size = cell_size
+        self.setGridSize(QSize(cell_width + CELL_SPACING, cell_size.height() + CELL_SPACING))
+        self.image_size_changed.emit(self.image_size())
+
+    def highlight_row(self, row):
+        """滚动到指定行并高亮显示，row为None时取消高亮"""
+        self.grid_delegate.highlighted_row = row
+        if row is not None and self.model() is not None:
+            self.scrollTo(self.model().index(row), QAbstractItemView.PositionAtCenter)
+        self.viewport().update()
+
+    def focus_rows(self):
+        """鼠标所在和高亮的单元格"""
+        return {row for row in (self.hovered_row, self.grid_delegate.highlighted_row)
+                if row is not None}
+
+    def mouseMoveEvent(self, event):
+        index = self.indexAt(event.pos())
+        self.hovered_row = index.row() if index.isValid() else None
+        super().mouseMoveEvent(event)
+
+    def leaveEvent(self, event):
+        self.hovered_row = None
+        super().leaveEvent(event)
+
+    def contextMenuEvent(self, event):
+        index = self.indexAt(event.pos())
+        if not index.isValid():
+            return
+        menu = QMenu(self)
+        similar_action = menu.addAction("查找相似")
+        if menu.exec_(event.globalPos()) is similar_action:
+            self.similar_requested.emit(index.row())
+
+    def visible_rows(self):
+        """计算当前可见的行号范围"""
+        model = self.model()
+        if model is None or model.rowCount() == 0:
+            return range(0)
+        grid_height = max(1, self.gridSize().height())
+        top = self.verticalScrollBar().value()
+        first_line = top // grid_height
+        last_line = (top + self.viewport().height()) // grid_height
+        cols = self.columns()
+        first = first_line * cols
+        last = min(model.rowCount(), (last_line + 1) * cols)
+        return range(first, last)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_cell_size()
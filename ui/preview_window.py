@@ -1,7 +1,29 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                            QLabel, QPushButton, QSpinBox)
-from PyQt5.QtCore import Qt, QTimer
+                            QLabel, QPushButton, QSpinBox, QSlider, QComboBox)
+from PyQt5.QtCore import Qt, QTimer, QElapsedTimer
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QShortcut
+from collections import deque
 from core.image_processor import ImageProcessor
+from ui.image_convert import pil_to_pixmap
+from ui.perf_hud import PerfHud
+from ui.frame_canvas import FrameCanvas
+from core.tracing import tracer
+
+# 播放方向
+PLAY_FORWARD = 'forward'
+PLAY_REVERSE = 'reverse'
+PLAY_PING_PONG = 'ping_pong'
+
+PLAY_MODES = [
+    (PLAY_FORWARD, "正向"),
+    (PLAY_REVERSE, "反向"),
+    (PLAY_PING_PONG, "往返")
+]
+
+# 每次空闲时最多用于后台生成高质量帧的时间（毫秒），避免拖动时间轴卡顿
+UPGRADE_BUDGET_MS = 8
+
 
 class PreviewWindow(QMainWindow):
     def __init__(self, parent=None, animation_data=None):
@@ -11,18 +33,24 @@ class PreviewWindow(QMainWindow):
         
         # 初始化变量
         self.current_frame_index = 0
+        self.frame_count = len(self.animation_data['frames'])
+        self.play_direction = 1
+        self.animation_ticks = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.animation_timer = QTimer()
         self.animation_timer.timeout.connect(self.update_frame)
         
         self.setup_ui()
         self.setup_animation()
-        
+    
     def setup_ui(self):
         """设置预览窗口UI"""
         # 设置窗口标题和大小
         self.setWindowTitle(f"预览 - {self.animation_data['name']}")
         window_size = 500
-        self.setFixedSize(window_size, window_size + 100)
+        self.resize(window_size, window_size + 170)
+        self.setMinimumSize(window_size, 400)
         
         # 创建中央部件
         central_widget = QWidget()
@@ -30,22 +58,64 @@ class PreviewWindow(QMainWindow):
         layout = QVBoxLayout(central_widget)
         layout.setContentsMargins(20, 20, 20, 20)
         
-        # 创建预览标签
-        self.preview_label = QLabel()
-        self.preview_label.setFixedSize(window_size - 40, window_size - 40)
-        self.preview_label.setAlignment(Qt.AlignCenter)
-        self.preview_label.setStyleSheet("border: 1px solid #cccccc;")
-        layout.addWidget(self.preview_label, alignment=Qt.AlignCenter)
+        # 创建预览画布（滚轮缩放，拖动平移，双击在适应窗口和1:1之间切换）
+        self.canvas = FrameCanvas(self.image_processor)
+        self.canvas.fit_mode_changed.connect(self.on_fit_mode_changed)
+        self.canvas.zoom_changed.connect(self.update_zoom_label)
+        self.canvas.resized.connect(self.on_canvas_resized)
+        layout.addWidget(self.canvas, stretch=1)
+        
+        # 性能面板覆盖在预览区域左上角（默认隐藏）
+        self.perf_hud = PerfHud(self.hud_metrics, self.canvas)
+        self.perf_hud.move(0, 0)
+        self.perf_hud.hide()
+        
+        # 时间轴
+        timeline_widget = QWidget()
+        timeline_layout = QHBoxLayout(timeline_widget)
+        timeline_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.timeline_slider = QSlider(Qt.Horizontal)
+        self.timeline_slider.setRange(0, max(self.frame_count - 1, 0))
+        self.timeline_slider.setPageStep(10)
+        self.timeline_slider.setFocusPolicy(Qt.NoFocus)
+        self.timeline_slider.valueChanged.connect(self.show_frame)
+        self.timeline_slider.sliderPressed.connect(self.pause_animation)
+        
+        self.frame_label = QLabel()
+        self.frame_label.setMinimumWidth(70)
+        self.frame_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        
+        timeline_layout.addWidget(self.timeline_slider)
+        timeline_layout.addWidget(self.frame_label)
+        layout.addWidget(timeline_widget)
         
         # 创建控制区域
         control_widget = QWidget()
         control_layout = QHBoxLayout(control_widget)
-        control_layout.setContentsMargins(50, 10, 50, 10)
+        control_layout.setContentsMargins(0, 0, 0, 0)
+        
+        # 单帧步进按钮
+        self.prev_button = QPushButton("<")
+        self.prev_button.setToolTip("上一帧 (←)")
+        self.prev_button.setFixedWidth(30)
+        self.prev_button.clicked.connect(lambda: self.step_frame(-1))
+        self.next_button = QPushButton(">")
+        self.next_button.setToolTip("下一帧 (→)")
+        self.next_button.setFixedWidth(30)
+        self.next_button.clicked.connect(lambda: self.step_frame(1))
         
         # 播放按钮
         self.play_button = QPushButton("暂停")
+        self.play_button.setToolTip("播放/暂停 (空格)")
         self.play_button.clicked.connect(self.toggle_animation)
         
+        # 播放方向
+        self.mode_combo = QComboBox()
+        for mode, text in PLAY_MODES:
+            self.mode_combo.addItem(text, mode)
+        self.mode_combo.currentIndexChanged.connect(self.update_play_mode)
+        
         # 帧率控制
         fps_label = QLabel("帧率:")
         self.fps_spinbox = QSpinBox()
@@ -53,11 +123,62 @@ class PreviewWindow(QMainWindow):
         self.fps_spinbox.setValue(self.animation_data['fps'])
         self.fps_spinbox.valueChanged.connect(self.update_fps)
         
+        # 性能面板开关
+        self.perf_button = QPushButton("性能")
+        self.perf_button.setCheckable(True)
+        self.perf_button.setToolTip("显示性能面板 (F3)")
+        self.perf_button.toggled.connect(self.toggle_perf_hud)
+        self.perf_shortcut = QShortcut(QKeySequence(Qt.Key_F3), self)
+        self.perf_shortcut.activated.connect(self.perf_button.toggle)
+        
+        control_layout.addWidget(self.prev_button)
         control_layout.addWidget(self.play_button)
+        control_layout.addWidget(self.next_button)
+        control_layout.addWidget(self.mode_combo)
         control_layout.addWidget(fps_label)
         control_layout.addWidget(self.fps_spinbox)
+        control_layout.addWidget(self.perf_button)
         layout.addWidget(control_widget)
         
+        # 缩放控制
+        zoom_widget = QWidget()
+        zoom_layout = QHBoxLayout(zoom_widget)
+        zoom_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.zoom_label = QLabel()
+        self.zoom_label.setMinimumWidth(60)
+        self.fit_button = QPushButton("适应")
+        self.fit_button.setToolTip("适应窗口 (0)")
+        self.fit_button.clicked.connect(lambda: self.canvas.set_fit_mode(True))
+        self.actual_size_button = QPushButton("1:1")
+        self.actual_size_button.setToolTip("原始大小 (1)")
+        self.actual_size_button.clicked.connect(lambda: self.canvas.set_zoom(1.0))
+        
+        zoom_layout.addWidget(QLabel("缩放:"))
+        zoom_layout.addWidget(self.zoom_label)
+        zoom_layout.addStretch()
+        zoom_layout.addWidget(self.fit_button)
+        zoom_layout.addWidget(self.actual_size_button)
+        layout.addWidget(zoom_widget)
+        
+        # 键盘控制：左右方向键单帧步进，Home/End跳到首尾，空格播放/暂停，+/-缩放
+        self.shortcuts = []
+        for key, handler in [(Qt.Key_Left, lambda: self.step_frame(-1)),
+                             (Qt.Key_Right, lambda: self.step_frame(1)),
+                             (Qt.Key_Comma, lambda: self.step_frame(-1)),
+                             (Qt.Key_Period, lambda: self.step_frame(1)),
+                             (Qt.Key_Home, lambda: self.seek(0)),
+                             (Qt.Key_End, lambda: self.seek(self.frame_count - 1)),
+                             (Qt.Key_Space, self.toggle_animation),
+                             (Qt.Key_Plus, lambda: self.canvas.zoom_by(1)),
+                             (Qt.Key_Equal, lambda: self.canvas.zoom_by(1)),
+                             (Qt.Key_Minus, lambda: self.canvas.zoom_by(-1)),
+                             (Qt.Key_0, lambda: self.canvas.set_fit_mode(True)),
+                             (Qt.Key_1, lambda: self.canvas.set_zoom(1.0))]:
+            shortcut = QShortcut(QKeySequence(key), self)
+            shortcut.activated.connect(handler)
+            self.shortcuts.append(shortcut)
+        
         # 创建信息标签
         self.info_label = QLabel()
         self.info_label.setAlignment(Qt.AlignCenter)
@@ -65,59 +186,226 @@ class PreviewWindow(QMainWindow):
         layout.addWidget(self.info_label)
         
         # 更新信息标签
-        if self.animation_data['frames']:
+        if self.frame_count:
             first_frame = self.animation_data['frames'][0]
             source_size = first_frame['source_size']
-            frame_count = len(self.animation_data['frames'])
-            info_text = f"尺寸: {source_size[0]}x{source_size[1]} | 帧数: {frame_count}"
+            info_text = f"尺寸: {source_size[0]}x{source_size[1]} | 帧数: {self.frame_count}"
             self.info_label.setText(info_text)
     
     def setup_animation(self):
-        """设置动画播放"""
-        # 预先缓存所有帧
-        self.cached_frames = []
-        for frame_data in self.animation_data['frames']:
-            try:
-                # 处理帧
-                frame_image = self.image_processor.process_frame(
-                    frame_data,
-                    self.animation_data['sprite_sheet']
-                )
-                
-                if frame_image:
-                    # 转换为QPixmap
-                    pixmap = self.image_processor.pil_to_pixmap(
-                        frame_image,
-                        self.preview_label.size()
-                    )
-                    if pixmap:
-                        self.cached_frames.append(pixmap)
-                
-            except Exception as e:
-                print(f"Error caching frame: {str(e)}")
-                self.cached_frames.append(None)
-        
-        # 显示第一帧
-        if self.cached_frames:
-            self.preview_label.setPixmap(self.cached_frames[0])
+        """设置动画播放
+        
+        帧在第一次显示时才生成：先直接从图集中最近邻采样出画布大小的草图显示，
+        高质量的帧在空闲时补上，之后跳转到任意帧都直接从缓存取。
+        """
+        # 高质量帧缓存和草图缓存，按帧序号索引
+        self.cached_frames = [None] * self.frame_count
+        self.draft_frames = {}
+        # 缓存帧对应的画布大小，窗口第一次显示、画布有了实际大小之后才设置
+        self.cache_size = None
+        
+        # 等待生成高质量帧的队列（每帧一次），当前显示的帧优先生成
+        self.upgrade_queue = deque(range(self.frame_count))
+        self.upgrade_first = None
+        self.upgrade_timer = QTimer(self)
+        self.upgrade_timer.setInterval(0)
+        self.upgrade_timer.timeout.connect(self.process_upgrades)
+        
+        # 显示第一帧（缓存帧在画布大小确定后生成）
+        if self.frame_count:
+            self.show_frame(0)
         
         # 开始播放动画
         interval = int(1000 / self.fps_spinbox.value())
         self.animation_timer.start(interval)
     
+    def render_frame(self, index):
+        """合成一帧并平滑缩放到画布大小"""
+        try:
+            frame_image = self.image_processor.process_frame(
+                self.animation_data['frames'][index],
+                self.animation_data['sprite_sheet']
+            )
+            return pil_to_pixmap(frame_image, self.cache_size)
+        except Exception as e:
+            print(f"Error caching frame: {str(e)}")
+            return None
+    
+    def render_draft(self, index):
+        """直接从图集中最近邻采样出画布大小的草图，耗时只和画布大小有关，不完整合成这一帧"""
+        try:
+            frame_data = self.animation_data['frames'][index]
+            source_w, source_h = (max(int(v), 1) for v in frame_data['source_size'])
+            zoom = min(self.cache_size.width() / source_w, self.cache_size.height() / source_h)
+            output_size = (max(1, round(source_w * zoom)), max(1, round(source_h * zoom)))
+            frame_image = self.image_processor.process_region(
+                frame_data, self.animation_data['sprite_sheet'],
+                (0, 0, source_w, source_h), output_size, zoom)
+            return pil_to_pixmap(frame_image)
+        except Exception as e:
+            print(f"Error drawing draft frame: {str(e)}")
+            return None
+    
+    def frame_pixmap(self, index):
+        """取出一帧用于显示，没有缓存时立即生成低质量草图"""
+        pixmap = self.cached_frames[index]
+        if pixmap is not None:
+            self.cache_hits += 1
+            return pixmap
+        pixmap = self.draft_frames.get(index)
+        if pixmap is None:
+            self.cache_misses += 1
+            pixmap = self.render_draft(index)
+            if pixmap is not None:
+                self.draft_frames[index] = pixmap
+        # 优先为当前帧生成高质量版本（它仍在队列中，生成后出队时会被跳过）
+        self.upgrade_first = index
+        if not self.upgrade_timer.isActive():
+            self.upgrade_timer.start()
+        return pixmap
+    
+    def next_upgrade(self):
+        """下一个需要生成高质量版本的帧，没有时返回None"""
+        if self.upgrade_first is not None:
+            index, self.upgrade_first = self.upgrade_first, None
+            if self.cached_frames[index] is None:
+                return index
+        while self.upgrade_queue:
+            index = self.upgrade_queue.popleft()
+            if self.cached_frames[index] is None:
+                return index
+        return None
+    
+    def process_upgrades(self):
+        """空闲时生成高质量帧，替换草图"""
+        elapsed = QElapsedTimer()
+        elapsed.start()
+        while elapsed.elapsed() < UPGRADE_BUDGET_MS:
+            index = self.next_upgrade()
+            if index is None:
+                self.upgrade_timer.stop()
+                return
+            pixmap = self.render_frame(index)
+            self.cached_frames[index] = pixmap
+            self.draft_frames.pop(index, None)
+            if pixmap is not None and index == self.current_frame_index and self.canvas.fit_mode:
+                self.canvas.set_frame(index, self.animation_data['frames'][index],
+                                      self.animation_data['sprite_sheet'], pixmap)
+    
+    def show_frame(self, index):
+        """显示指定帧（时间轴的valueChanged也连接到这里）"""
+        if not 0 <= index < self.frame_count:
+            return
+        self.current_frame_index = index
+        # 缩放后画布只合成可见区域，不需要适应窗口大小的缓存帧；画布大小确定前也不生成
+        pixmap = None
+        if self.canvas.fit_mode and self.cache_size is not None:
+            pixmap = self.frame_pixmap(index)
+        self.canvas.set_frame(index, self.animation_data['frames'][index],
+                              self.animation_data['sprite_sheet'], pixmap)
+        self.frame_label.setText(f"{index + 1}/{self.frame_count}")
+        if self.timeline_slider.value() != index:
+            self.timeline_slider.blockSignals(True)
+            self.timeline_slider.setValue(index)
+            self.timeline_slider.blockSignals(False)
+    
+    def on_fit_mode_changed(self, fit_mode):
+        """回到适应窗口模式时取出当前帧的缓存"""
+        if fit_mode:
+            self.show_frame(self.current_frame_index)
+    
+    def on_canvas_resized(self):
+        """画布第一次有了实际大小或大小变化后，重新生成适应窗口大小的缓存帧"""
+        if self.canvas.size() == self.cache_size:
+            return
+        self.cache_size = self.canvas.size()
+        self.cached_frames = [None] * self.frame_count
+        self.draft_frames.clear()
+        self.upgrade_queue = deque(range(self.frame_count))
+        self.upgrade_first = None
+        if self.frame_count:
+            self.show_frame(self.current_frame_index)
+            self.upgrade_timer.start()
+    
+    def update_zoom_label(self, zoom):
+        """显示当前缩放比例"""
+        prefix = "适应 " if self.canvas.fit_mode else ""
+        self.zoom_label.setText(f"{prefix}{zoom * 100:.0f}%")
+    
+    def seek(self, index):
+        """暂停并跳转到指定帧"""
+        self.pause_animation()
+        self.show_frame(max(0, min(index, self.frame_count - 1)))
+    
+    def step_frame(self, step):
+        """暂停并前后移动若干帧（首尾循环）"""
+        if not self.frame_count:
+            return
+        self.pause_animation()
+        self.show_frame((self.current_frame_index + step) % self.frame_count)
+    
+    def next_frame_index(self):
+        """按播放方向计算下一帧"""
+        if self.frame_count < 2:
+            return 0
+        mode = self.mode_combo.currentData()
+        if mode == PLAY_FORWARD:
+            return (self.current_frame_index + 1) % self.frame_count
+        if mode == PLAY_REVERSE:
+            return (self.current_frame_index - 1) % self.frame_count
+        # 往返播放，在首尾帧掉头
+        next_index = self.current_frame_index + self.play_direction
+        if not 0 <= next_index < self.frame_count:
+            self.play_direction = -self.play_direction
+            next_index = self.current_frame_index + self.play_direction
+        return next_index
+    
+    @tracer.traced('preview_tick', 'ui')
     def update_frame(self):
         """更新当前帧"""
-        if self.cached_frames and self.current_frame_index < len(self.cached_frames):
-            pixmap = self.cached_frames[self.current_frame_index]
-            if pixmap:
-                self.preview_label.setPixmap(pixmap)
-            self.current_frame_index = (self.current_frame_index + 1) % len(self.cached_frames)
+        self.animation_ticks += 1
+        if self.frame_count:
+            self.show_frame(self.next_frame_index())
     
-    def toggle_animation(self):
-        """切换动画播放状态"""
+    def update_play_mode(self, *args):
+        """切换播放方向"""
+        self.play_direction = -1 if self.mode_combo.currentData() == PLAY_REVERSE else 1
+    
+    def toggle_perf_hud(self, visible):
+        """显示或隐藏性能面板"""
+        if visible:
+            self.perf_hud.adjustSize()
+            self.perf_hud.raise_()
+        self.perf_hud.setVisible(visible)
+    
+    def hud_metrics(self):
+        """性能面板显示的统计"""
+        resident_bytes = sum(p.width() * p.height() * p.depth() // 8
+                             for p in self.cached_frames if p)
+        resident_bytes += sum(p.width() * p.height() * p.depth() // 8
+                              for p in self.draft_frames.values())
+        sprite_sheet = self.animation_data['sprite_sheet']
+        if sprite_sheet is not None:
+            resident_bytes += sprite_sheet.width * sprite_sheet.height * 4
+        return {
+            'target_fps': self.fps_spinbox.value(),
+            'ticks': self.animation_ticks,
+            'dropped': 0,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'resident_bytes': resident_bytes
+        }
+    
+    def pause_animation(self):
+        """暂停播放"""
         if self.animation_timer.isActive():
             self.animation_timer.stop()
             self.play_button.setText("播放")
+    
+    def toggle_animation(self):
+        """切换动画播放状态"""
+        if self.animation_timer.isActive():
+            self.pause_animation()
         else:
             interval = int(1000 / self.fps_spinbox.value())
             self.animation_timer.start(interval)
@@ -133,4 +421,6 @@ class PreviewWindow(QMainWindow):
     def closeEvent(self, event):
         """窗口关闭事件"""
         self.animation_timer.stop()
-        super().closeEvent(event)
\ No newline at end of file
+        self.upgrade_timer.stop()
+        self.perf_hud.hide()
+        super().closeEvent(event)
@@ -0,0 +1,109 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+from ui.image_convert import pil_to_qimage
+from core.tracing import tracer
+
+
+@tracer.traced('render_cell', 'render')
+def render_cell(image_processor, frame_data, sprite_sheet, target_size, resample='bilinear'):
+    """在工作线程中合成并缩放一个网格单元，返回QImage"""
+    frame_image = image_processor.process_frame(frame_data, sprite_sheet)
+    if frame_image is None:
+        return None
+    frame_image = image_processor.scale_image(frame_image, target_size, resample)
+    return pil_to_qimage(frame_image)
+
+
+class RenderPool(QObject):
+    """网格单元的并行合成阶段
+
+    Pillow的裁剪、粘贴和缩放会释放GIL，所以每次刷新时未缓存的单元格
+    在线程池中并行合成。工作线程只产出QImage，QPixmap在GUI线程中创建。
+    上一批任务还没完成时跳过本次提交，而不是阻塞GUI线程。
+    """
+
+    results_ready = pyqtSignal()
+
+    def __init__(self, image_processor, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.image_processor = image_processor
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix='render')
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.skipped_ticks = 0
+        # 最近一批任务从提交到全部完成的时间（秒），由画质调节器读取
+        self.batch_started = None
+        self.last_batch_seconds = 0.0
+
+    def busy(self):
+        """上一批任务是否还在进行"""
+        with self.lock:
+            return bool(self.pending)
+
+    def submit(self, jobs):
+        """提交一批合成任务
+
+        jobs: [(key, frame_data, sprite_sheet, (宽, 高), 缩放方式), ...]
+        如果工作线程还没完成上一批任务，则跳过本批并返回False
+        """
+        if not jobs:
+            return True
+        if self.busy():
+            self.skipped_ticks += 1
+            return False
+        tracer.instant('submit_jobs', 'render', jobs=len(jobs))
+        futures = []
+        with self.lock:
+            self.batch_started = time.perf_counter()
+            for key, frame_data, sprite_sheet, target_size, resample in jobs:
+                future = self.executor.submit(render_cell, self.image_processor,
+                                              frame_data, sprite_sheet, target_size, resample)
+                self.pending[future] = key
+                futures.append(future)
+        # 添加回调放在锁外，已完成的任务会立即回调
+        for future in futures:
+            future.add_done_callback(self.on_job_done)
+        return True
+
+    def on_job_done(self, future):
+        """工作线程完成任务后通知GUI线程（跨线程信号自动排队）"""
+        with self.lock:
+            if self.batch_started is not None and all(f.done() for f in self.pending):
+                self.last_batch_seconds = time.perf_counter() - self.batch_started
+                self.batch_started = None
+        self.results_ready.emit()
+
+    def take_batch_seconds(self):
+        """取出最近一批任务的耗时，之后没有新任务时返回0"""
+        with self.lock:
+            seconds = self.last_batch_seconds
+            self.last_batch_seconds = 0.0
+            return seconds
+
+    def collect(self):
+        """取出所有已完成的结果 [(key, QImage), ...]"""
+        results = []
+        with self.lock:
+            for future in [f for f in self.pending if f.done()]:
+                key = self.pending.pop(future)
+                if future.cancelled():
+                    # 关闭时取消的任务
+                    continue
+                try:
+                    q_image = future.result()
+                except Exception as e:
+                    print(f"Error rendering frame: {str(e)}")
+                    q_image = None
+                results.append((key, q_image))
+        return results
+
+    def shutdown(self):
+        """停止线程池，丢弃未开始的任务"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            self.pending.clear()
@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QListWidget, QListWidgetItem
+from PyQt5.QtCore import Qt, pyqtSignal
+from core.phash import SimilarityIndex
+
+
+class SimilarWindow(QMainWindow):
+    """查找相似动画的结果窗口
+
+    索引在后台线程中按文件标记增量更新，完成后重新查询；
+    双击结果时发出 hit_activated(命中信息字典)，与名称搜索的结果格式相同。
+    """
+
+    hit_activated = pyqtSignal(dict)
+    # 后台更新的进度（已处理数, 总数）和完成（变化的图集数），从索引线程发出
+    progress_changed = pyqtSignal(int, int)
+    index_updated = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.index = SimilarityIndex()
+        self.executor = None
+        self.update_future = None
+        self.update_again = False
+        # 当前查询 (plist路径, 序列名, 特征码)
+        self.query = None
+        self.setup_ui()
+
+        self.progress_changed.connect(self.on_progress)
+        self.index_updated.connect(self.on_index_updated)
+
+    def setup_ui(self):
+        """设置窗口UI"""
+        self.resize(520, 600)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QVBoxLayout(central_widget)
+        layout.setContentsMargins(10, 10, 10, 10)
+
+        self.query_label = QLabel()
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #666666;")
+        self.result_list = QListWidget()
+        self.result_list.setStyleSheet("border: 1px solid #cccccc;")
+        self.result_list.setToolTip("双击打开")
+        self.result_list.itemActivated.connect(self.on_item_activated)
+
+        layout.addWidget(self.query_label)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.result_list, stretch=1)
+
+    def find(self, root, plist_path, group_name, code):
+        """在root下查找与指定序列相似的动画，先用已有的索引显示结果，更新完成后再刷新"""
+        self.index.set_root(root)
+        self.query = (plist_path, group_name, code)
+        self.setWindowTitle(f"相似动画 - {group_name}")
+        self.query_label.setText(f"{group_name}  —  {os.path.basename(plist_path)}")
+        self.show_results()
+        self.refresh()
+
+    def refresh(self):
+        """在后台线程中增量更新索引（已经在更新时，完成后再更新一次）"""
+        if self.update_future is not None and not self.update_future.done():
+            # 进行中的更新在根目录改变后会提前结束，新的根目录要再更新一次
+            self.update_again = True
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similarity')
+        self.update_again = False
+        self.update_future = self.executor.submit(self.update_index)
+
+    def update_index(self):
+        try:
+            changed = self.index.update(self.progress_changed.emit)
+        except Exception as e:
+            print(f"Error updating similarity index: {str(e)}")
+            changed = 0
+        self.index_updated.emit(changed)
+
+    def on_progress(self, done, total):
+        if done < total:
+            self.status_label.setText(f"正在建立索引: {done}/{total} 个图集")
+
+    def on_index_updated(self, changed):
+        if self.update_again:
+            self.refresh()
+            return
+        self.show_results()
+
+    def show_results(self):
+        """用当前的索引查询并显示结果（不包括查询的序列本身）"""
+        if self.query is None:
+            return
+        plist_path, group_name, code = self.query
+        stats = self.index.stats()
+        self.status_label.setText(f"{self.index.root}: {stats['atlases']} 个图集, {stats['animations']} 个动画")
+        self.status_label.setToolTip(self.index.root or "")
+        self.result_list.clear()
+        for result in self.index.search(code):
+            if result['plist_path'] == os.path.realpath(plist_path) and result['group'] == group_name:
+                continue
+            item = QListWidgetItem(f"{result['group']}  —  {os.path.basename(result['plist_path'])}"
+                                   f"  ({result['similarity']:.0%})")
+            item.setToolTip(f"{result['plist_path']}\n距离: {result['distance']}")
+            item.setData(Qt.UserRole, {
+                'kind': 'group',
+                'name': result['group'],
+                'group': result['group'],
+                'plist_path': result['plist_path']
+            })
+            self.result_list.addItem(item)
+        if self.result_list.count() == 0:
+            item = QListWidgetItem("没有找到相似的动画")
+            item.setFlags(Qt.NoItemFlags)
+            self.result_list.addItem(item)
+
+    def on_item_activated(self, item):
+        hit = item.data(Qt.UserRole)
+        if hit:
+            self.hit_activated.emit(hit)
+
+    def shutdown(self):
+        # 更换根目录会让进行中的更新尽快结束
+        self.index.root = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)